@@ -0,0 +1,103 @@
+"""
+Transcription Backend Benchmark
+================================
+Transcribes one audio file with several backends and compares speed,
+text similarity and segment timing against the first (reference) one.
+Run before switching WHISPER_BACKEND; tests/test_backend_parity.py holds
+the pass/fail version on a short speech sample (a local fixture, the
+downloaded openai-whisper JFK clip, or espeak output when offline).
+
+Usage:
+    python benchmarks/bench_backends.py call.wav --model-size base
+"""
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from audio_buffer import AudioBuffer  # noqa: E402
+from transcription_backends import get_available_backends, get_backend  # noqa: E402
+
+
+def compare_backends(
+    filepath: str,
+    model_size: str = "base",
+    backends: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Transcribe the same audio with several backends and compare them.
+
+    Used to check that a faster backend stays in line with the reference
+    openai-whisper output before switching WHISPER_BACKEND.
+
+    Args:
+        filepath: Path to a fixture audio file
+        model_size: Size of the Whisper model to use for every backend
+        backends: Backend names; the first one is the reference
+
+    Returns:
+        Dictionary with per-backend timing, text and segment count, plus
+        text similarity (0-1) and mean segment start offset against the
+        reference.
+    """
+    backends = backends or ["openai-whisper", "faster-whisper"]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with AudioBuffer.from_file(filepath) as audio:
+        for name in backends:
+            engine = get_backend(name)
+            model = engine.load_model(model_size)
+
+            start = time.perf_counter()
+            output = engine.transcribe(model, audio.samples)
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                "seconds": round(elapsed, 2),
+                "realtime_factor": round(elapsed / audio.duration, 3),
+                "text": output["text"],
+                "segments": output["segments"],
+            }
+
+    reference = results[backends[0]]
+    ref_words = reference["text"].lower().split()
+    comparison: Dict[str, Any] = {}
+    for name in backends[1:]:
+        words = results[name]["text"].lower().split()
+        starts = zip(
+            (seg["start"] for seg in reference["segments"]),
+            (seg["start"] for seg in results[name]["segments"])
+        )
+        offsets = [abs(a - b) for a, b in starts]
+        comparison[name] = {
+            "text_similarity": round(difflib.SequenceMatcher(None, ref_words, words).ratio(), 4),
+            "mean_start_offset_s": round(sum(offsets) / len(offsets), 3) if offsets else None,
+            "speedup": round(reference["seconds"] / results[name]["seconds"], 2) if results[name]["seconds"] else None,
+        }
+
+    for result in results.values():
+        result["segment_count"] = len(result.pop("segments"))
+
+    return {"reference": backends[0], "results": results, "comparison": comparison}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare transcription backends on one file")
+    parser.add_argument("audio", help="Audio file to transcribe")
+    parser.add_argument("--model-size", default="base", help="Whisper model size for every backend")
+    parser.add_argument(
+        "--backends", nargs="+", default=None,
+        help=f"Backends to compare, reference first (available: {get_available_backends()})"
+    )
+    args = parser.parse_args()
+    print(json.dumps(compare_backends(args.audio, args.model_size, args.backends), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Keyword Extraction Benchmark
+=============================
+Compares full KeyBERT extraction with the pruned, chunk-pooled fast path
+on one transcript repeated to several lengths.
+
+Usage:
+    python benchmarks/bench_keywords.py transcript.txt --words 500 2000 8000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from embedding_service import clear_cache as clear_embedding_cache  # noqa: E402
+from topic_extractor import extract_keywords  # noqa: E402
+
+
+def benchmark_keyword_extraction(
+    text: str,
+    word_counts: Tuple[int, ...] = (500, 2000, 8000, 20000),
+    top_n: int = 10,
+) -> List[Dict]:
+    """
+    Compare full KeyBERT extraction with the pruned fast path.
+
+    The sample text is repeated/truncated to each word count, so pass a
+    real transcript for meaningful keyword overlap.
+
+    Returns:
+        One dict per length with timings, speedup, candidate counts and the
+        share of full-path top keywords the fast path also returns.
+    """
+    words = text.split()
+    if not words:
+        return []
+
+    results = []
+    for count in word_counts:
+        sample = " ".join((words * (count // len(words) + 1))[:count])
+
+        started = time.perf_counter()
+        full = extract_keywords(sample, top_n=top_n, fast=False, method="keybert", update_index=False)
+        full_seconds = time.perf_counter() - started
+
+        # Cold embedding cache, so repeated samples don't flatter the fast path
+        clear_embedding_cache()
+        started = time.perf_counter()
+        fast = extract_keywords(sample, top_n=top_n, fast=True, method="keybert", update_index=False)
+        fast_seconds = time.perf_counter() - started
+
+        full_top = set(full["top_keywords"])
+        overlap = len(full_top & set(fast["top_keywords"])) / len(full_top) if full_top else None
+        results.append({
+            "words": count,
+            "full_seconds": round(full_seconds, 3),
+            "fast_seconds": round(fast_seconds, 3),
+            "speedup": round(full_seconds / fast_seconds, 2) if fast_seconds else None,
+            "keyword_overlap": round(overlap, 4) if overlap is not None else None,
+            **fast.get("stats", {}),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark KeyBERT keyword extraction paths")
+    parser.add_argument("transcript", help="Plain-text transcript used as the sample")
+    parser.add_argument("--words", type=int, nargs="+", default=[500, 2000, 8000, 20000],
+                        help="Sample lengths in words")
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.transcript, "r", encoding="utf-8") as f:
+        text = f.read()
+    print(json.dumps(benchmark_keyword_extraction(text, tuple(args.words), args.top_n), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Quantization Benchmark
+=======================
+Compares fp32 and int8 (QUANTIZE_MODELS=1) inference for Whisper and the
+emotion classifier.
+
+Usage:
+    python benchmarks/bench_quantization.py --audio call.wav --texts utterances.txt
+"""
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+def _timed(fn: Callable[[], Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    output = fn()
+    return {"output": output, "seconds": time.perf_counter() - start}
+
+
+def benchmark_whisper_quantization(filepath: str, model_size: str = "base") -> Dict[str, Any]:
+    """
+    Compare fp32 and int8 Whisper on one audio file.
+
+    Returns:
+        Timings, speedup, int8 model load time (from the quantized cache
+        after the first run) and word-level similarity of the two
+        transcripts (1.0 means identical text).
+    """
+    from audio_buffer import AudioBuffer
+    from transcription_backends import OpenAIWhisperBackend
+
+    fp32_backend = OpenAIWhisperBackend(quantize=False)
+    int8_backend = OpenAIWhisperBackend(quantize=True)
+    fp32_model = fp32_backend.load_model(model_size)
+    int8_load = _timed(lambda: int8_backend.load_model(model_size))
+    int8_model = int8_load["output"]
+
+    with AudioBuffer.from_file(filepath) as audio:
+        fp32 = _timed(lambda: fp32_backend.transcribe(fp32_model, audio.samples))
+        int8 = _timed(lambda: int8_backend.transcribe(int8_model, audio.samples))
+
+    fp32_words = fp32["output"]["text"].lower().split()
+    int8_words = int8["output"]["text"].lower().split()
+
+    return {
+        "fp32_seconds": round(fp32["seconds"], 2),
+        "int8_seconds": round(int8["seconds"], 2),
+        "speedup": round(fp32["seconds"] / int8["seconds"], 2) if int8["seconds"] else None,
+        "int8_load_seconds": round(int8_load["seconds"], 2),
+        "text_similarity": round(difflib.SequenceMatcher(None, fp32_words, int8_words).ratio(), 4),
+    }
+
+
+def benchmark_emotion_quantization(texts: List[str]) -> Dict[str, Any]:
+    """
+    Compare fp32 and int8 emotion classification on a list of texts.
+
+    Returns:
+        Timings, speedup, int8 pipeline load time, the share of texts whose
+        top emotion matches, and the mean absolute difference of per-label
+        scores.
+    """
+    from emotion_detector import _build_pipeline
+
+    fp32_pipe = _build_pipeline(quantize=False)
+    int8_load = _timed(lambda: _build_pipeline(quantize=True))
+    int8_pipe = int8_load["output"]
+
+    fp32 = _timed(lambda: fp32_pipe(texts))
+    int8 = _timed(lambda: int8_pipe(texts))
+
+    matches = 0
+    diffs: List[float] = []
+    for fp32_scores, int8_scores in zip(fp32["output"], int8["output"]):
+        fp32_map = {r["label"]: r["score"] for r in fp32_scores}
+        int8_map = {r["label"]: r["score"] for r in int8_scores}
+        if max(fp32_map, key=fp32_map.get) == max(int8_map, key=int8_map.get):
+            matches += 1
+        diffs.extend(abs(fp32_map[label] - int8_map.get(label, 0.0)) for label in fp32_map)
+
+    return {
+        "fp32_seconds": round(fp32["seconds"], 3),
+        "int8_seconds": round(int8["seconds"], 3),
+        "speedup": round(fp32["seconds"] / int8["seconds"], 2) if int8["seconds"] else None,
+        "int8_load_seconds": round(int8_load["seconds"], 3),
+        "top_label_agreement": round(matches / len(texts), 4) if texts else None,
+        "mean_abs_score_diff": round(sum(diffs) / len(diffs), 4) if diffs else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark int8 dynamic quantization")
+    parser.add_argument("--audio", help="Audio file for the Whisper comparison")
+    parser.add_argument("--model-size", default="base", help="Whisper model size")
+    parser.add_argument("--texts", help="Text file, one utterance per line, for the emotion comparison")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    if args.audio:
+        results["whisper"] = benchmark_whisper_quantization(args.audio, args.model_size)
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        results["emotion"] = benchmark_emotion_quantization(texts)
+    if not results:
+        parser.error("pass --audio and/or --texts")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ import tempfile
 # Import your modules
 from main import process_audio, validate_audio_file
 from report_generator import generate_pdf_report
+from result_memo import get_memo_stats, seed_from_file
+from rate_limiter import get_rate_limiter
+from gemini_module import get_response_cache_stats
 
 # Configure logging
 logging.basicConfig(
@@ -35,6 +38,14 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'call-analyzer-secret-key-change-in-production')
     
+    # Pre-compute results for common utterances (RESULT_MEMO_SEED_FILE)
+    seed_file = os.environ.get('RESULT_MEMO_SEED_FILE')
+    if seed_file:
+        try:
+            seed_from_file(seed_file)
+        except Exception as e:
+            logger.warning(f"Result memo seeding from {seed_file} failed: {e}")
+    
     # Allowed file extensions
     ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'flac', 'ogg', 'aac'}
     
@@ -124,9 +135,12 @@ def create_app():
             # Validate the saved file
             validate_audio_file(temp_file_path)
             
-            # Process the audio file
+            # Process the audio file (optional 'language' field pins Whisper's language,
+            # 'use_cache=0' bypasses cached transcription and LLM results)
             logger.info(f"Processing audio file: {secure_name}")
-            result = process_audio(temp_file_path)
+            language = request.form.get('language') or None
+            use_cache = request.form.get('use_cache', '1').lower() not in ('0', 'false', 'no')
+            result = process_audio(temp_file_path, language=language, use_cache=use_cache)
             
             # Check if processing was successful
             if 'error' in result:
@@ -192,12 +206,26 @@ def create_app():
             return jsonify({
                 'status': 'healthy',
                 'service': 'Call Analyzer',
-                'version': '2.1.0'
+                'version': '2.1.0',
+                'result_memo': get_memo_stats()
             })
         except Exception as e:
             logger.error(f"Health check failed: {e}")
             return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
     
+    @app.route('/metrics')
+    def metrics():
+        """Limiter, breaker and cache state for monitoring and alerting."""
+        try:
+            return jsonify({
+                'gemini_rate_limiter': get_rate_limiter().snapshot(),
+                'llm_cache': get_response_cache_stats(),
+                'result_memo': get_memo_stats()
+            })
+        except Exception as e:
+            logger.error(f"Metrics collection failed: {e}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.errorhandler(404)
     def not_found_error(error):
         """Handle 404 errors."""
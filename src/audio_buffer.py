@@ -0,0 +1,184 @@
+"""
+Shared Audio Buffer Module
+===========================
+Decodes an upload once into a 16 kHz mono float32 NumPy buffer that every
+audio stage (transcription, chunking, VAD, ...) reads from.
+
+ffmpeg writes raw PCM straight to a temp file. Short calls are loaded
+into memory and the file is removed; long calls stay memory-mapped from
+the temp file, so the PCM never has to sit fully in RAM and worker
+processes can map the same file instead of receiving pickled copies.
+"""
+
+import logging
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# float32 mono
+_BYTES_PER_SAMPLE = 4
+
+# Calls at least this long stay memory-mapped instead of being read into RAM
+DEFAULT_MMAP_THRESHOLD_SECONDS = 600.0
+
+
+class AudioSlice:
+    """
+    Picklable reference to a range of an AudioBuffer.
+
+    For memory-mapped buffers only the temp file path and offsets are
+    pickled, so a worker process can map the samples itself.
+    """
+
+    def __init__(self, start: int, end: int, path: Optional[str] = None, samples=None):
+        self.start = start
+        self.end = end
+        self.path = path
+        self.samples = samples
+
+    def load(self):
+        """Return the samples as a NumPy array (a memory map when file-backed)."""
+        if self.path is None:
+            return self.samples
+
+        import numpy as np
+        return np.memmap(
+            self.path,
+            dtype=np.float32,
+            mode="c",
+            offset=self.start * _BYTES_PER_SAMPLE,
+            shape=(self.end - self.start,)
+        )
+
+
+class AudioBuffer:
+    """16 kHz mono float32 PCM decoded once and shared across pipeline stages."""
+
+    def __init__(self, samples, path: Optional[str] = None):
+        """
+        Args:
+            samples: 1-D float32 array (in-memory or np.memmap).
+            path: Backing temp file when samples are memory-mapped; it is
+                  deleted when the buffer is closed.
+        """
+        self.samples = samples
+        self.path = path
+
+    @classmethod
+    def from_file(cls, filepath: str, mmap_threshold_seconds: Optional[float] = None) -> "AudioBuffer":
+        """
+        Decode an audio file with ffmpeg.
+
+        Args:
+            filepath: Path to any audio format ffmpeg can read.
+            mmap_threshold_seconds: Keep audio at least this long memory-mapped
+                                    (default AUDIO_MMAP_THRESHOLD_SECONDS or 600).
+
+        Raises:
+            RuntimeError: If ffmpeg is missing or fails to decode the file.
+            ValueError: If the file decodes to no audio.
+        """
+        import numpy as np
+
+        if mmap_threshold_seconds is None:
+            mmap_threshold_seconds = float(
+                os.environ.get("AUDIO_MMAP_THRESHOLD_SECONDS", DEFAULT_MMAP_THRESHOLD_SECONDS)
+            )
+
+        fd, pcm_path = tempfile.mkstemp(prefix="call-analyzer-", suffix=".f32")
+        os.close(fd)
+
+        cmd = [
+            "ffmpeg", "-nostdin", "-threads", "0", "-y",
+            "-i", filepath,
+            "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(SAMPLE_RATE),
+            "-loglevel", "error",
+            pcm_path
+        ]
+
+        try:
+            subprocess.run(cmd, capture_output=True, check=True)
+        except FileNotFoundError:
+            _remove_quietly(pcm_path)
+            raise RuntimeError("ffmpeg is not installed or not on PATH")
+        except subprocess.CalledProcessError as e:
+            _remove_quietly(pcm_path)
+            raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace').strip()}")
+
+        n_samples = os.path.getsize(pcm_path) // _BYTES_PER_SAMPLE
+        if n_samples == 0:
+            _remove_quietly(pcm_path)
+            raise ValueError("Audio file contains no decodable audio")
+
+        duration = n_samples / SAMPLE_RATE
+        if duration >= mmap_threshold_seconds:
+            # Copy-on-write map: stages see a writable array, the file is never modified
+            samples = np.memmap(pcm_path, dtype=np.float32, mode="c", shape=(n_samples,))
+            logger.info(f"Decoded {duration:.0f}s of audio (memory-mapped)")
+            return cls(samples, path=pcm_path)
+
+        samples = np.fromfile(pcm_path, dtype=np.float32)
+        _remove_quietly(pcm_path)
+        logger.info(f"Decoded {duration:.0f}s of audio")
+        return cls(samples)
+
+    @classmethod
+    def allocate(cls, n_samples: int, file_backed: bool = False) -> "AudioBuffer":
+        """
+        Create a zero-filled buffer for derived audio (e.g. silence-trimmed).
+
+        Args:
+            n_samples: Buffer length in samples.
+            file_backed: Memory-map a new temp file instead of allocating RAM.
+        """
+        import numpy as np
+
+        if not file_backed:
+            return cls(np.zeros(n_samples, dtype=np.float32))
+
+        fd, pcm_path = tempfile.mkstemp(prefix="call-analyzer-", suffix=".f32")
+        os.close(fd)
+        samples = np.memmap(pcm_path, dtype=np.float32, mode="w+", shape=(max(n_samples, 1),))[:n_samples]
+        return cls(samples, path=pcm_path)
+
+    @property
+    def duration(self) -> float:
+        """Length of the audio in seconds."""
+        return len(self.samples) / SAMPLE_RATE
+
+    def view(self, start_seconds: float = 0.0, end_seconds: Optional[float] = None):
+        """Return a zero-copy view of the samples between two times."""
+        start = max(0, int(start_seconds * SAMPLE_RATE))
+        end = len(self.samples) if end_seconds is None else int(end_seconds * SAMPLE_RATE)
+        return self.samples[start:end]
+
+    def share(self, start: int, end: int) -> AudioSlice:
+        """Return a picklable reference to samples[start:end] for worker processes."""
+        if self.path is not None:
+            return AudioSlice(start, end, path=self.path)
+        return AudioSlice(start, end, samples=self.samples[start:end])
+
+    def close(self) -> None:
+        """Release the samples and delete the backing temp file, if any."""
+        self.samples = None
+        if self.path is not None:
+            _remove_quietly(self.path)
+            self.path = None
+
+    def __enter__(self) -> "AudioBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
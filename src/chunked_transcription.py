@@ -0,0 +1,258 @@
+"""
+Chunked Transcription Module
+=============================
+Splits long recordings at silence boundaries and transcribes the chunks
+in parallel across a process pool, then stitches the segments back into
+a single timeline.
+
+Used by whisper_module for long calls, where a single-threaded
+`model.transcribe()` pass would otherwise run past the gunicorn timeout.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from audio_buffer import SAMPLE_RATE, AudioBuffer, AudioSlice
+from transcription_backends import LANGUAGE_DETECTION_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+# Default target chunk length and search radius for a quiet cut point
+DEFAULT_CHUNK_SECONDS = 300.0
+_FRAME_SECONDS = 0.02
+_SMOOTHING_SECONDS = 0.5
+
+# Shared process pools by worker count, created lazily and reused across
+# requests; a request never shuts down a pool another request is using
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def default_worker_count() -> int:
+    """Worker processes to use when WHISPER_CHUNK_WORKERS is not set."""
+    env_value = os.environ.get("WHISPER_CHUNK_WORKERS")
+    if env_value:
+        return max(1, int(env_value))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def find_chunk_boundaries(audio, chunk_seconds: float = DEFAULT_CHUNK_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Split audio into roughly chunk_seconds long pieces, cutting at the
+    quietest point near each target boundary.
+
+    Args:
+        audio: 1-D float32 array of 16 kHz samples.
+        chunk_seconds: Target chunk duration.
+
+    Returns:
+        List of (start_sample, end_sample) pairs covering the whole audio.
+    """
+    import numpy as np
+
+    total = len(audio)
+    chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk_samples:
+        return [(0, total)]
+
+    # Frame energy without materializing a full squared copy of the audio
+    frame_len = int(_FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = total // frame_len
+    frames = np.asarray(audio[:n_frames * frame_len]).reshape(n_frames, frame_len)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+
+    # Smooth so we cut inside a sustained pause, not a single quiet frame
+    smooth_frames = max(1, int(_SMOOTHING_SECONDS / _FRAME_SECONDS))
+    kernel = np.ones(smooth_frames, dtype=np.float32) / smooth_frames
+    energy = np.convolve(energy, kernel, mode="same")
+
+    search_frames = int(min(30.0, chunk_seconds / 4) / _FRAME_SECONDS)
+    chunk_frames = chunk_samples // frame_len
+
+    boundaries: List[Tuple[int, int]] = []
+    start_frame = 0
+    while n_frames - start_frame > chunk_frames + search_frames:
+        target = start_frame + chunk_frames
+        lo = max(start_frame + 1, target - search_frames)
+        hi = min(n_frames, target + search_frames)
+        cut = lo + int(np.argmin(energy[lo:hi]))
+        boundaries.append((start_frame * frame_len, cut * frame_len))
+        start_frame = cut
+
+    boundaries.append((start_frame * frame_len, total))
+    return boundaries
+
+
+def stitch_segments(chunk_results: List[Tuple[float, List[Dict]]]) -> List[Dict]:
+    """
+    Merge per-chunk segments into one timeline.
+
+    Args:
+        chunk_results: (offset_seconds, segments) per chunk, in order.
+                       Segment times are relative to the chunk start.
+
+    Returns:
+        Segments with absolute start/end times. Chunks do not overlap, so
+        every segment is kept; words that repeat across a seam ("yes" |
+        "yes I agree") are real speech.
+    """
+    stitched: List[Dict] = []
+
+    for offset, segments in chunk_results:
+        for index, seg in enumerate(segments):
+            text = seg["text"].strip()
+            start = seg["start"] + offset
+            end = seg["end"] + offset
+
+            if index == 0 and stitched:
+                # Keep the timeline monotonic across the seam
+                start = max(start, stitched[-1]["end"])
+
+            if not text:
+                continue
+
+            stitched.append({
+                "start": round(start, 2),
+                "end": round(max(end, start), 2),
+                "text": text
+            })
+
+    return stitched
+
+
+def _init_worker(threads_per_worker: int) -> None:
+    """Process pool initializer: avoid oversubscribing the CPU with inference threads."""
+    os.environ.setdefault("WHISPER_CPU_THREADS", str(threads_per_worker))
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+
+def _detect_language(audio_slice: AudioSlice, model_size: str, backend_name: Optional[str]) -> str:
+    """Worker entry point: detect the language with the worker's cached model."""
+    from transcription_backends import get_backend
+    from whisper_module import _load_model
+
+    backend = get_backend(backend_name)
+    model = _load_model(model_size, backend)
+    return backend.detect_language(model, audio_slice.load())
+
+
+def _transcribe_chunk(
+    audio_slice: AudioSlice,
+    model_size: str,
+    decode_options: Dict[str, Any],
+    backend_name: Optional[str]
+) -> Dict[str, Any]:
+    """Worker entry point: transcribe one chunk with a per-process cached model."""
+    from transcription_backends import get_backend
+    from whisper_module import _load_model
+
+    backend = get_backend(backend_name)
+    model = _load_model(model_size, backend)
+    result = backend.transcribe(model, audio_slice.load(), **decode_options)
+    return {"segments": result["segments"], "language": result["language"]}
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool with max_workers workers."""
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            threads = max(1, (os.cpu_count() or 1) // max_workers)
+            # spawn, not fork: the parent is a threaded gunicorn worker
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,)
+            )
+            _pools[max_workers] = pool
+            logger.info(f"Started chunk transcription pool with {max_workers} workers")
+
+        return pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next request starts a fresh one."""
+    with _pool_lock:
+        for workers, candidate in list(_pools.items()):
+            if candidate is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def transcribe_chunked(
+    audio: AudioBuffer,
+    model_size: str,
+    decode_options: Optional[Dict[str, Any]] = None,
+    chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+    max_workers: Optional[int] = None,
+    backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Transcribe long audio by splitting it at silences and running the
+    chunks in parallel.
+
+    Without a 'language' decode option, one worker detects it from the
+    start of the audio and every chunk is decoded in that language; the
+    parent never loads a model of its own.
+
+    Args:
+        audio: Decoded audio. Memory-mapped buffers are shared with the
+               workers by file path rather than pickled.
+        model_size: Whisper model size loaded in each worker.
+        decode_options: Extra keyword arguments for model.transcribe().
+        chunk_seconds: Target chunk duration.
+        max_workers: Number of worker processes.
+        backend: Transcription backend name used in the workers.
+
+    Returns:
+        Dictionary with 'text', 'segments' and 'language', in the same
+        shape as a single-pass transcription.
+    """
+    decode_options = dict(decode_options or {})
+    max_workers = max_workers or default_worker_count()
+
+    boundaries = find_chunk_boundaries(audio.samples, chunk_seconds)
+    logger.info(
+        f"Transcribing {audio.duration:.0f}s of audio in "
+        f"{len(boundaries)} chunks with {max_workers} workers"
+    )
+
+    pool = _get_pool(max_workers)
+    try:
+        if not decode_options.get("language"):
+            # Same window the single-pass path detects on, so both agree
+            detection_slice = audio.share(0, min(len(audio.samples), LANGUAGE_DETECTION_SAMPLES))
+            decode_options["language"] = pool.submit(
+                _detect_language, detection_slice, model_size, backend
+            ).result()
+            logger.info(f"Detected language: {decode_options['language']}")
+
+        futures = [
+            pool.submit(_transcribe_chunk, audio.share(start, end), model_size, decode_options, backend)
+            for start, end in boundaries
+        ]
+        chunk_outputs = [future.result() for future in futures]
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise RuntimeError("Chunk transcription worker crashed")
+
+    segments = stitch_segments([
+        (start / SAMPLE_RATE, output["segments"])
+        for (start, _end), output in zip(boundaries, chunk_outputs)
+    ])
+
+    return {
+        "text": " ".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": decode_options["language"]
+    }
@@ -0,0 +1,241 @@
+"""
+Disk Cache Module
+==================
+A small persistent key/value store for memoizing expensive results
+(e.g. Whisper transcriptions) across requests and gunicorn workers.
+
+Entries are JSON files sharded into sub-directories by key prefix.
+Writes go to a temporary file that is atomically renamed into place,
+so concurrent workers never observe a partially written entry. The
+total size is bounded with LRU eviction based on file modification
+time, which is refreshed on every cache hit. Caches created with a TTL
+store each value with its expiry time and treat expired entries as misses.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rescan the cache directory at least this often, even when our own
+# size estimate looks fine (other workers write to the same directory).
+_RESCAN_EVERY_N_WRITES = 64
+
+# After eviction the cache is trimmed to this fraction of max_bytes so
+# that we don't rescan and evict again on the very next write.
+_EVICTION_TARGET_RATIO = 0.9
+
+# Temp files older than this are leftovers from crashed writers.
+_STALE_TMP_SECONDS = 3600
+
+
+def default_cache_dir(name: str) -> str:
+    """
+    Return the directory used for a named cache.
+
+    The root can be overridden with the CALL_ANALYZER_CACHE_DIR
+    environment variable; it defaults to a folder in the system temp dir.
+    """
+    root = os.environ.get(
+        "CALL_ANALYZER_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "call-analyzer-cache")
+    )
+    return os.path.join(root, name)
+
+
+class DiskCache:
+    """Size-bounded, multi-process safe JSON cache stored on disk."""
+
+    def __init__(self, directory: str, max_bytes: int, name: str = "cache",
+                 ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            directory: Folder where cache entries are stored.
+            max_bytes: Maximum total size of all entries before LRU eviction.
+            name: Human-readable name used in logs and stats.
+            ttl_seconds: Entries expire this long after being written
+                         (None keeps them until evicted).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._approx_bytes: Optional[int] = None
+        self._writes_since_scan = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable hex key from JSON-serializable parts."""
+        hasher = hashlib.sha256()
+        for part in parts:
+            hasher.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Returns:
+            The stored value, or None on a miss or unreadable entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable {self.name} cache entry {key}: {e}")
+            self._remove(path)
+            with self._lock:
+                self._misses += 1
+            return None
+
+        if self.ttl_seconds is not None:
+            # mtime tracks recency, so the expiry is stored in the entry itself
+            if not isinstance(value, dict) or time.time() >= value.get("expires_at", 0):
+                self._remove(path)
+                with self._lock:
+                    self._misses += 1
+                    self._expirations += 1
+                return None
+            value = value.get("value")
+
+        # Touch the entry so LRU eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value. Failures are logged, not raised."""
+        path = self._path(key)
+        if self.ttl_seconds is not None:
+            value = {"expires_at": time.time() + self.ttl_seconds, "value": value}
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            shard_dir = os.path.dirname(path)
+            os.makedirs(shard_dir, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=shard_dir, prefix=".tmp-", suffix=".json")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # Atomic on POSIX: readers see either the old entry or the new one
+                os.replace(tmp_path, path)
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write {self.name} cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            self._writes_since_scan += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(data)
+            needs_scan = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or self._writes_since_scan >= _RESCAN_EVERY_N_WRITES
+            )
+
+        if needs_scan:
+            self._evict_if_needed()
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """Return (mtime, size, path) for every entry, removing stale temp files."""
+        entries: List[Tuple[float, int, str]] = []
+        now = time.time()
+        for root, _dirs, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # Removed by another worker meanwhile
+                if filename.startswith(".tmp-"):
+                    if now - st.st_mtime > _STALE_TMP_SECONDS:
+                        self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        """Delete least recently used entries until the cache fits its budget."""
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        if total > self.max_bytes:
+            target = int(self.max_bytes * _EVICTION_TARGET_RATIO)
+            for _mtime, size, path in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+                evicted += 1
+            logger.info(f"Evicted {evicted} entries from {self.name} cache")
+
+        with self._lock:
+            self._approx_bytes = total
+            self._writes_since_scan = 0
+            self._evictions += evicted
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        for _mtime, _size, path in self._scan():
+            self._remove(path)
+        with self._lock:
+            self._approx_bytes = 0
+            self._writes_since_scan = 0
+        logger.info(f"{self.name} cache cleared")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this process plus the approximate size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "writes": self._writes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "approx_bytes": self._approx_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,286 @@
+"""
+Embedding Service Module
+=========================
+One sentence-embedding model per process, shared by every stage.
+
+KeyBERT used to load its own copy of all-MiniLM-L6-v2 and embed the
+transcript and candidate phrases privately. Now the model lives here, and
+compute_call_embeddings() encodes the document and the keyword candidates
+once per call, in a single batched pass, for keyword extraction to
+consume.
+
+Vectors are cached per text in a bounded LRU, so phrases that recur across
+calls ("thank you", common candidates) are only encoded once.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_ID = "all-MiniLM-L6-v2"
+
+DEFAULT_CACHE_SIZE = 20000
+DEFAULT_BATCH_SIZE = 64
+
+# The model reads at most 256 word pieces, so documents are encoded in chunks
+DEFAULT_DOC_CHUNK_WORDS = 200
+
+# Upper bound on keyword candidates embedded per call
+DEFAULT_MAX_CANDIDATES = 1000
+
+_model = None
+_model_lock = threading.Lock()
+
+_cache: "OrderedDict[str, Any]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+
+def get_model():
+    """Load and cache the sentence-transformers model."""
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise RuntimeError(
+                    "sentence-transformers is not installed. "
+                    "Install it with: pip install sentence-transformers"
+                )
+            logger.info(f"Loading embedding model ({EMBEDDING_MODEL_ID})...")
+            _model = SentenceTransformer(EMBEDDING_MODEL_ID)
+            logger.info("Embedding model loaded successfully")
+    return _model
+
+
+def _cache_size() -> int:
+    return int(os.environ.get("EMBEDDING_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+
+
+def encode(texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Embed texts, reusing cached vectors.
+
+    Only texts not in the cache are sent to the model, together in one
+    batched call; duplicates within texts are encoded once.
+
+    Returns:
+        float32 array of shape (len(texts), dim).
+    """
+    global _cache_hits, _cache_misses
+    import numpy as np
+
+    vectors: Dict[str, Any] = {}
+    with _cache_lock:
+        for text in texts:
+            if text in vectors:
+                continue
+            vector = _cache.get(text)
+            if vector is not None:
+                _cache.move_to_end(text)
+                vectors[text] = vector
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        _cache_hits += len(texts) - len(missing)
+        _cache_misses += len(missing)
+
+    if missing:
+        encoded = get_model().encode(missing, batch_size=batch_size, convert_to_numpy=True)
+        encoded = np.asarray(encoded, dtype=np.float32)
+        # Cached vectors are shared between callers
+        encoded.setflags(write=False)
+
+        limit = _cache_size()
+        with _cache_lock:
+            for text, vector in zip(missing, encoded):
+                vectors[text] = vector
+                _cache[text] = vector
+                _cache.move_to_end(text)
+            while len(_cache) > limit:
+                _cache.popitem(last=False)
+
+    if not texts:
+        return np.zeros((0, get_model().get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.stack([vectors[text] for text in texts])
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counts for the embedding cache."""
+    with _cache_lock:
+        lookups = _cache_hits + _cache_misses
+        return {
+            "entries": len(_cache),
+            "max_entries": _cache_size(),
+            "hits": _cache_hits,
+            "misses": _cache_misses,
+            "hit_rate": round(_cache_hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def clear_cache() -> None:
+    """Drop cached vectors (the model stays loaded)."""
+    global _cache_hits, _cache_misses
+    with _cache_lock:
+        _cache.clear()
+        _cache_hits = 0
+        _cache_misses = 0
+
+
+def select_candidates(
+    units: List[str],
+    keyphrase_length: Tuple[int, int] = (1, 2),
+    max_candidates: Optional[int] = None,
+    min_count: int = 2,
+    max_df_ratio: float = 0.9,
+    stop_words: Optional[str] = "english"
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Pick keyword candidates for a transcript split into units (turns or chunks).
+
+    Short transcripts keep every candidate, exactly as KeyBERT would. When
+    there are more than max_candidates, n-grams seen fewer than min_count
+    times, and (with 10+ units) n-grams spread over more than max_df_ratio
+    of units, are dropped, and the most frequent survivors are kept.
+
+    Returns:
+        (candidates in CountVectorizer vocabulary order, which is the order
+        KeyBERT expects word embeddings in; candidate counts per stage).
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    if max_candidates is None:
+        max_candidates = int(os.environ.get("KEYWORD_MAX_CANDIDATES", DEFAULT_MAX_CANDIDATES))
+
+    try:
+        vectorizer = CountVectorizer(ngram_range=keyphrase_length, stop_words=stop_words)
+        counts = vectorizer.fit_transform(units)
+    except ValueError:
+        return [], {"total": 0, "filtered": 0, "embedded": 0}
+
+    vocab = vectorizer.get_feature_names_out()
+    stats = {"total": len(vocab), "filtered": len(vocab), "embedded": len(vocab)}
+    if len(vocab) <= max_candidates:
+        return list(vocab), stats
+
+    freq = np.asarray(counts.sum(axis=0)).ravel()
+    keep = freq >= min_count
+    if len(units) >= 10:
+        df = np.asarray((counts > 0).sum(axis=0)).ravel()
+        keep &= df <= max_df_ratio * len(units)
+    if not keep.any():
+        keep[:] = True
+    stats["filtered"] = int(keep.sum())
+
+    indices = np.flatnonzero(keep)
+    if len(indices) > max_candidates:
+        # Most frequent first; stable sort keeps ties in vocabulary order
+        order = np.argsort(-freq[indices], kind="stable")[:max_candidates]
+        indices = np.sort(indices[order])
+    stats["embedded"] = int(len(indices))
+    return [vocab[i] for i in indices], stats
+
+
+def chunk_text(text: str, chunk_words: Optional[int] = None) -> List[str]:
+    """Split text into chunks of about chunk_words words."""
+    if chunk_words is None:
+        chunk_words = int(os.environ.get("EMBEDDING_DOC_CHUNK_WORDS", DEFAULT_DOC_CHUNK_WORDS))
+    words = text.split()
+    return [
+        " ".join(words[start:start + chunk_words])
+        for start in range(0, len(words), chunk_words)
+    ] or [text]
+
+
+def _pool_chunks(chunk_vectors, chunks: List[str]):
+    """Length-weighted mean of chunk embeddings, as a (1, dim) array."""
+    import numpy as np
+
+    weights = np.array([len(chunk.split()) or 1 for chunk in chunks], dtype=np.float32)
+    return (weights @ chunk_vectors / weights.sum())[None, :].astype(np.float32)
+
+
+class CallEmbeddings:
+    """Embeddings computed once for one call's transcript."""
+
+    def __init__(
+        self,
+        doc_embedding,
+        candidates: List[str],
+        candidate_embeddings,
+        keyphrase_length: Tuple[int, int],
+        stats: Optional[Dict[str, Any]] = None
+    ):
+        self.doc_embedding = doc_embedding
+        self.candidates = candidates
+        self.candidate_embeddings = candidate_embeddings
+        self.keyphrase_length = keyphrase_length
+        self.stats = stats or {}
+
+
+def compute_call_embeddings(
+    text: str,
+    turns: Optional[List[Dict]] = None,
+    keyphrase_length: Tuple[int, int] = (1, 2),
+    max_candidates: Optional[int] = None
+) -> CallEmbeddings:
+    """
+    Embed a transcript and its keyword candidates in one pass.
+
+    The model only reads the first 256 word pieces of an input, so the
+    document is encoded as ~200-word chunks whose embeddings are mean
+    pooled. Keyword candidates are pruned with select_candidates().
+
+    Args:
+        text: Full transcript text.
+        turns: Diarized turns; non-empty 'text' values serve as units for
+               candidate document frequency (they are not embedded).
+        keyphrase_length: N-gram range used for keyword candidates.
+        max_candidates: Cap on embedded candidates (default
+                        KEYWORD_MAX_CANDIDATES).
+
+    Returns:
+        CallEmbeddings with a (1, dim) document embedding, (n_candidates, dim)
+        candidate embeddings and stats
+        (candidate counts, document chunks, encode time).
+    """
+    turn_texts = [turn.get("text", "") for turn in turns or [] if turn.get("text", "").strip()]
+    chunks = chunk_text(text)
+    candidates, candidate_counts = select_candidates(
+        turn_texts or chunks, keyphrase_length, max_candidates=max_candidates
+    )
+
+    started = time.perf_counter()
+    vectors = encode(chunks + candidates)
+    encode_seconds = time.perf_counter() - started
+
+    n_chunks = len(chunks)
+    stats = {
+        "candidates_total": candidate_counts["total"],
+        "candidates_filtered": candidate_counts["filtered"],
+        "candidates_embedded": candidate_counts["embedded"],
+        "doc_chunks": n_chunks,
+        "encode_seconds": round(encode_seconds, 3),
+    }
+
+    logger.info(
+        f"Embedded transcript ({n_chunks} chunks) and "
+        f"{len(candidates)}/{candidate_counts['total']} keyword candidates in {encode_seconds:.2f}s"
+    )
+    return CallEmbeddings(
+        doc_embedding=_pool_chunks(vectors[:n_chunks], chunks),
+        candidates=candidates,
+        candidate_embeddings=vectors[n_chunks:],
+        keyphrase_length=keyphrase_length,
+        stats=stats,
+    )
@@ -5,33 +5,93 @@ Uses a pre-trained HuggingFace transformer model to classify text
 into emotions: anger, disgust, fear, joy, neutral, sadness, surprise.
 
 Model: j-hartmann/emotion-english-distilroberta-base
+Engines: transformers pipeline (torch) or ONNX Runtime (emotion_onnx)
 """
 
+import copy
 import logging
-from typing import Dict, List, Any
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from micro_batcher import MicroBatcher
+from quantization import is_quantization_enabled, load_quantized
+from result_memo import get_memo, normalize_text
 
 logger = logging.getLogger(__name__)
 
+EMOTION_MODEL_ID = "j-hartmann/emotion-english-distilroberta-base"
+
 # Global pipeline cache
 _emotion_pipeline = None
 
+# Cross-request batching service shared by all threads in this worker
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_BATCH_MAX_WAIT_MS = 10
+
+# Long turns are scored as overlapping token windows instead of being cut
+# at 512 characters; the cap keeps one huge monologue from exploding latency
+DEFAULT_WINDOW_STRIDE_TOKENS = 64
+DEFAULT_MAX_WINDOWS_PER_TURN = 8
+
+
+def _build_pipeline(quantize: Optional[bool] = None):
+    """
+    Create the emotion classification pipeline.
+
+    Args:
+        quantize: Use int8 dynamic quantization for the model's Linear
+                  layers. Defaults to the QUANTIZE_MODELS env var.
+    """
+    import transformers
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if quantize is None:
+        quantize = is_quantization_enabled()
+
+    model = EMOTION_MODEL_ID
+    tokenizer = None
+    if quantize:
+        model = load_quantized(
+            f"emotion-distilroberta-{transformers.__version__}",
+            lambda: AutoModelForSequenceClassification.from_pretrained(EMOTION_MODEL_ID),
+            build_empty=lambda: AutoModelForSequenceClassification.from_config(
+                AutoConfig.from_pretrained(EMOTION_MODEL_ID)
+            )
+        )
+        tokenizer = AutoTokenizer.from_pretrained(EMOTION_MODEL_ID)
+
+    return pipeline(
+        "text-classification",
+        model=model,
+        tokenizer=tokenizer,
+        top_k=None,  # Return all emotion scores
+        truncation=True
+    )
+
 
 def _load_pipeline():
-    """Load and cache the emotion classification pipeline."""
+    """
+    Load and cache the emotion classification pipeline.
+
+    EMOTION_ENGINE selects the engine: "transformers" (default, torch) or
+    "onnx" (ONNX Runtime, see emotion_onnx), which return identical results.
+    """
     global _emotion_pipeline
 
     if _emotion_pipeline is not None:
         return _emotion_pipeline
 
     try:
-        from transformers import pipeline
-        logger.info("Loading emotion detection model (first run may download ~300MB)...")
-        _emotion_pipeline = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            top_k=None,  # Return all emotion scores
-            truncation=True
-        )
+        engine = os.environ.get("EMOTION_ENGINE", "transformers")
+        logger.info(f"Loading emotion detection model with {engine} (first run may download ~300MB)...")
+        if engine == "onnx":
+            from emotion_onnx import load_onnx_classifier
+            _emotion_pipeline = load_onnx_classifier(EMOTION_MODEL_ID)
+        else:
+            _emotion_pipeline = _build_pipeline()
         logger.info("Emotion detection model loaded successfully")
         return _emotion_pipeline
     except ImportError:
@@ -44,68 +104,305 @@ def _load_pipeline():
         raise RuntimeError(f"Failed to load emotion model: {str(e)}")
 
 
+def _format_scores(results: List[Dict]) -> Dict[str, Any]:
+    """Turn the pipeline's label/score list into an emotion result dict."""
+    sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
+    primary = sorted_results[0]
+    return {
+        "primary_emotion": primary["label"],
+        "confidence": round(primary["score"], 4),
+        "all_scores": {
+            r["label"]: round(r["score"], 4) for r in sorted_results
+        }
+    }
+
+
+def _classify_texts(texts: List[str], batch_size: int) -> List[Any]:
+    """
+    Classify texts in batched pipeline calls.
+
+    Texts are sorted by length so each batch pads to similar lengths, and
+    results are returned in the original order. If batched inference fails,
+    texts are retried one at a time so a single bad input only fails its
+    own result (returned as an Exception).
+    """
+    if not texts:
+        return []
+
+    pipe = _load_pipeline()
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    results: List[Any] = [None] * len(texts)
+
+    try:
+        outputs = pipe([texts[i] for i in order], batch_size=batch_size)
+        for i, scores in zip(order, outputs):
+            results[i] = _format_scores(scores)
+        return results
+    except Exception as e:
+        logger.warning(f"Batched emotion inference failed, retrying per text: {e}")
+
+    for i, text in enumerate(texts):
+        try:
+            results[i] = _format_scores(pipe(text)[0])
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _default_batch_size() -> int:
+    return int(os.environ.get("EMOTION_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+
+def _get_batcher() -> Optional[MicroBatcher]:
+    """
+    Return the shared micro-batcher, or None if disabled (EMOTION_MICROBATCH=0).
+
+    Batch size and maximum wait come from EMOTION_BATCH_SIZE and
+    EMOTION_BATCH_MAX_WAIT_MS.
+    """
+    global _batcher
+
+    if os.environ.get("EMOTION_MICROBATCH", "1") == "0":
+        return None
+
+    with _batcher_lock:
+        if _batcher is None:
+            batch_size = _default_batch_size()
+            _batcher = MicroBatcher(
+                lambda texts: _classify_texts(texts, batch_size),
+                max_batch_size=batch_size,
+                max_wait=float(os.environ.get("EMOTION_BATCH_MAX_WAIT_MS", DEFAULT_BATCH_MAX_WAIT_MS)) / 1000,
+                name="emotion-batcher"
+            )
+        return _batcher
+
+
+def _run_classification(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    token_counts: Optional[List[int]] = None
+) -> List[Any]:
+    """
+    Classify texts through the shared micro-batcher, or directly in
+    length-sorted batches when micro-batching is disabled.
+
+    The batcher cuts batches in submission order, so the call's texts are
+    submitted sorted by length (token_counts when known, characters
+    otherwise); each batch then pads to similar lengths.
+
+    Returns:
+        One result per text, in the original order: an emotion dict, or
+        the Exception for that text.
+    """
+    batcher = _get_batcher()
+    if batcher is None:
+        return _classify_texts(texts, batch_size or _default_batch_size())
+
+    counts = token_counts or [0] * len(texts)
+    order = sorted(range(len(texts)), key=lambda i: (counts[i], len(texts[i])))
+    futures = batcher.submit([texts[i] for i in order])
+
+    results: List[Any] = [None] * len(texts)
+    for i, future in zip(order, futures):
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _split_windows(text: str, max_windows: int) -> Tuple[List[Tuple[str, int]], bool]:
+    """
+    Split text into overlapping windows that each fit the model.
+
+    Returns:
+        ([(window_text, token_count), ...], whether max_windows cut it short)
+    """
+    tokenizer = _load_pipeline().tokenizer
+    window_tokens = min(getattr(tokenizer, "model_max_length", 512), 512) - 2
+    try:
+        offsets = tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True, truncation=False
+        )["offset_mapping"]
+    except (NotImplementedError, KeyError, TypeError):
+        # Slow tokenizers have no offsets; fall back to the old character cut
+        return [(text[:512], 1)], len(text) > 512
+
+    if len(offsets) <= window_tokens:
+        return [(text, max(len(offsets), 1))], False
+
+    step = window_tokens - DEFAULT_WINDOW_STRIDE_TOKENS
+    windows: List[Tuple[str, int]] = []
+    for start in range(0, len(offsets), step):
+        end = min(len(offsets), start + window_tokens)
+        windows.append((text[offsets[start][0]:offsets[end - 1][1]], end - start))
+        if end == len(offsets):
+            return windows, False
+        if len(windows) == max_windows:
+            return windows, True
+    return windows, False
+
+
+def _aggregate_windows(window_results: List[Any], weights: List[int]) -> Dict[str, Any]:
+    """Combine per-window scores into one result, weighted by window length."""
+    totals: Dict[str, float] = {}
+    weight_sum = 0
+    for result, weight in zip(window_results, weights):
+        if isinstance(result, Exception):
+            continue
+        weight_sum += weight
+        for label, score in result["all_scores"].items():
+            totals[label] = totals.get(label, 0.0) + score * weight
+
+    if not weight_sum:
+        errors = [r for r in window_results if isinstance(r, Exception)]
+        raise errors[0] if errors else RuntimeError("No windows were classified")
+
+    return _format_scores([
+        {"label": label, "score": total / weight_sum} for label, total in totals.items()
+    ])
+
+
+def _memo_model_id() -> str:
+    """Memo namespace for the active model; int8 scores differ slightly from fp32."""
+    return f"{EMOTION_MODEL_ID}:int8" if is_quantization_enabled() else EMOTION_MODEL_ID
+
+
+def _classify_long_texts(texts: List[str], batch_size: Optional[int] = None) -> List[Any]:
+    """
+    Classify texts of any length.
+
+    Every text is split into token windows, windows from all texts go
+    through the model together, and scores are aggregated back per text.
+
+    Returns:
+        One result per text: an emotion dict, or the Exception for that text.
+    """
+    max_windows = int(os.environ.get("EMOTION_MAX_WINDOWS_PER_TURN", DEFAULT_MAX_WINDOWS_PER_TURN))
+
+    # Short repeated turns ("okay", "yeah") come straight from the memo
+    memo = get_memo()
+    model_id = _memo_model_id()
+    results: List[Any] = [memo.get(model_id, text) for text in texts]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if not misses:
+        return results
+
+    # Repeats within this call are classified once
+    first_seen: Dict[str, int] = {}
+    duplicates: List[Tuple[int, int]] = []
+    unique_misses: List[int] = []
+    for i in misses:
+        key = normalize_text(texts[i])
+        if key in first_seen:
+            duplicates.append((i, first_seen[key]))
+        else:
+            first_seen[key] = i
+            unique_misses.append(i)
+    misses = unique_misses
+
+    spans: List[Tuple[int, int, bool]] = []
+    window_texts: List[str] = []
+    window_weights: List[int] = []
+    for i in misses:
+        windows, capped = _split_windows(texts[i], max_windows)
+        spans.append((len(window_texts), len(window_texts) + len(windows), capped))
+        window_texts.extend(window for window, _ in windows)
+        window_weights.extend(weight for _, weight in windows)
+
+    window_results = _run_classification(window_texts, batch_size, window_weights)
+
+    for i, (start, end, capped) in zip(misses, spans):
+        try:
+            if end - start == 1 and not capped:
+                result = window_results[start]
+                if isinstance(result, Exception):
+                    raise result
+            else:
+                result = _aggregate_windows(window_results[start:end], window_weights[start:end])
+                result["windows"] = end - start
+                if capped:
+                    logger.warning(f"Emotion window cap ({max_windows}) reached; rest of the turn was not scored")
+                    result["window_cap_reached"] = True
+            memo.put(model_id, texts[i], result)
+            results[i] = result
+        except Exception as e:
+            results[i] = e
+
+    for i, source in duplicates:
+        result = results[source]
+        results[i] = result if isinstance(result, Exception) else copy.deepcopy(result)
+    return results
+
+
+def get_batching_stats() -> Dict[str, Any]:
+    """Return queue depth and batch occupancy of the emotion micro-batcher."""
+    batcher = _get_batcher()
+    if batcher is None:
+        return {"name": "emotion-batcher", "enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+def _error_result(error: Exception) -> Dict[str, Any]:
+    return {
+        "primary_emotion": "unknown",
+        "confidence": 0.0,
+        "all_scores": {},
+        "error": str(error)
+    }
+
+
 def detect_emotions(text: str) -> Dict[str, Any]:
     """
     Detect emotions in a single piece of text.
 
     Args:
-        text: The text to analyze.
+        text: The text to analyze. Long text is scored in sliding windows.
 
     Returns:
-        Dict with 'primary_emotion', 'confidence', and 'all_scores'.
+        Dict with 'primary_emotion', 'confidence', and 'all_scores'
+        (plus 'windows' / 'window_cap_reached' for long text).
     """
     try:
-        pipe = _load_pipeline()
-        # Truncate very long text to avoid token limit issues
-        truncated = text[:512]
-        results = pipe(truncated)[0]  # list of {label, score} dicts
-
-        # Sort by score descending
-        sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
-        primary = sorted_results[0]
-
-        return {
-            "primary_emotion": primary["label"],
-            "confidence": round(primary["score"], 4),
-            "all_scores": {
-                r["label"]: round(r["score"], 4) for r in sorted_results
-            }
-        }
+        _load_pipeline()
+        result = _classify_long_texts([text])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
     except Exception as e:
         logger.error(f"Emotion detection failed: {e}")
-        return {
-            "primary_emotion": "unknown",
-            "confidence": 0.0,
-            "all_scores": {},
-            "error": str(e)
-        }
+        return _error_result(e)
 
 
-def detect_emotions_per_turn(turns: List[Dict]) -> List[Dict]:
+def detect_emotions_per_turn(turns: List[Dict], batch_size: Optional[int] = None) -> List[Dict]:
     """
     Detect emotions for each speaker turn from diarization.
 
+    All non-empty turns are classified together in length-sorted batches
+    instead of one pipeline call per turn. Turns longer than the model's
+    512-token limit are scored as overlapping windows whose scores are
+    averaged, weighted by window length, up to EMOTION_MAX_WINDOWS_PER_TURN
+    windows per turn.
+
     Args:
         turns: List of diarized turn dicts, each with 'speaker', 'text',
                'start', 'end'.
+        batch_size: Texts per forward pass when micro-batching is disabled
+                    (default EMOTION_BATCH_SIZE).
 
     Returns:
         The same list of turns, each augmented with an 'emotion' key
         containing the detection result.
     """
     try:
-        pipe = _load_pipeline()
+        _load_pipeline()
     except Exception as e:
         logger.error(f"Cannot load emotion pipeline: {e}")
         for turn in turns:
-            turn["emotion"] = {
-                "primary_emotion": "unknown",
-                "confidence": 0.0,
-                "all_scores": {},
-                "error": str(e)
-            }
+            turn["emotion"] = _error_result(e)
         return turns
 
+    pending = []
     for i, turn in enumerate(turns):
         text = turn.get("text", "")
         if not text.strip():
@@ -115,28 +412,16 @@ def detect_emotions_per_turn(turns: List[Dict]) -> List[Dict]:
                 "all_scores": {"neutral": 1.0}
             }
             continue
+        pending.append((i, text))
 
-        try:
-            truncated = text[:512]
-            results = pipe(truncated)[0]
-            sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
-            primary = sorted_results[0]
+    results = _classify_long_texts([text for _, text in pending], batch_size)
 
-            turn["emotion"] = {
-                "primary_emotion": primary["label"],
-                "confidence": round(primary["score"], 4),
-                "all_scores": {
-                    r["label"]: round(r["score"], 4) for r in sorted_results
-                }
-            }
-        except Exception as e:
-            logger.error(f"Emotion detection failed for turn {i}: {e}")
-            turn["emotion"] = {
-                "primary_emotion": "unknown",
-                "confidence": 0.0,
-                "all_scores": {},
-                "error": str(e)
-            }
+    for (i, _), result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger.error(f"Emotion detection failed for turn {i}: {result}")
+            turns[i]["emotion"] = _error_result(result)
+        else:
+            turns[i]["emotion"] = result
 
     logger.info(f"Emotion detection completed for {len(turns)} turns")
     return turns
@@ -0,0 +1,211 @@
+"""
+ONNX Runtime Emotion Engine
+============================
+Runs the emotion classifier with ONNX Runtime instead of torch.
+
+The HuggingFace model is exported to ONNX once (this step still needs
+torch + transformers) and cached on disk together with its tokenizer and
+label names. Afterwards a worker only needs onnxruntime and tokenizers,
+which start much faster and use less CPU than the torch pipeline.
+
+OnnxEmotionClassifier is call-compatible with the transformers
+text-classification pipeline used in emotion_detector (top_k=None), so
+the rest of the module does not care which engine is active.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Union
+
+from disk_cache import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+_MAX_LENGTH = 512
+
+
+def _export_dir(model_id: str) -> str:
+    return os.path.join(default_cache_dir("onnx"), model_id.replace("/", "--"))
+
+
+def export_onnx_model(model_id: str, target_dir: str) -> None:
+    """
+    Export a sequence-classification model, its tokenizer and labels.
+
+    The export is written to a temp directory and renamed into place, so
+    concurrent workers never load a half-written model.
+    """
+    try:
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    except ImportError:
+        raise RuntimeError(
+            "Exporting the ONNX model needs transformers and torch. "
+            "Install them with: pip install transformers torch"
+        )
+
+    logger.info(f"Exporting '{model_id}' to ONNX (one-time)...")
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForSequenceClassification.from_pretrained(model_id)
+    model.config.return_dict = False
+    model.eval()
+
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        dummy = tokenizer(["export sample"], return_tensors="pt")
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            os.path.join(tmp_dir, "model.onnx"),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=14,
+        )
+        tokenizer.save_pretrained(tmp_dir)
+        labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+        with open(os.path.join(tmp_dir, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump(labels, f)
+
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # Another worker finished the same export first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"ONNX model cached at {target_dir}")
+
+
+class _TokenizerAdapter:
+    """Minimal transformers-style tokenizer interface over `tokenizers`."""
+
+    model_max_length = _MAX_LENGTH
+
+    def __init__(self, tokenizer: Any):
+        self._tokenizer = tokenizer
+
+    def __call__(self, text: str, add_special_tokens: bool = True, **_kwargs: Any) -> Dict[str, Any]:
+        encoding = self._tokenizer.encode(text, add_special_tokens=add_special_tokens)
+        return {"input_ids": encoding.ids, "offset_mapping": encoding.offsets}
+
+
+def _pad_token(model_dir: str) -> str:
+    """Pad token from the saved tokenizer config (RoBERTa uses "<pad>", id 1)."""
+    for name in ("tokenizer_config.json", "special_tokens_map.json"):
+        try:
+            with open(os.path.join(model_dir, name), "r", encoding="utf-8") as f:
+                pad_token = json.load(f).get("pad_token")
+        except (OSError, ValueError):
+            continue
+        if isinstance(pad_token, dict):
+            pad_token = pad_token.get("content")
+        if pad_token:
+            return pad_token
+    raise RuntimeError(f"No pad token in the tokenizer config under {model_dir}")
+
+
+class OnnxEmotionClassifier:
+    """ONNX Runtime drop-in for the emotion text-classification pipeline."""
+
+    def __init__(self, model_dir: str, intra_op_threads: int = 0):
+        """
+        Args:
+            model_dir: Directory written by export_onnx_model().
+            intra_op_threads: ONNX Runtime intra-op threads (0 = runtime default).
+        """
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError(
+                "onnxruntime is not installed. "
+                "Install it with: pip install onnxruntime tokenizers"
+            )
+
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+
+        # Untruncated copy for window offsets; padded/truncated copy for inference
+        self.tokenizer = _TokenizerAdapter(Tokenizer.from_file(tokenizer_path))
+        self._batch_tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._batch_tokenizer.enable_truncation(max_length=_MAX_LENGTH)
+        # Pad with the model's own pad token; the tokenizers default (id 0,
+        # "[PAD]") is "<s>" in RoBERTa and changes the scores
+        pad_token = _pad_token(model_dir)
+        pad_id = self._batch_tokenizer.token_to_id(pad_token)
+        if pad_id is None:
+            raise RuntimeError(f"Pad token '{pad_token}' is not in the tokenizer vocabulary")
+        self._batch_tokenizer.enable_padding(pad_id=pad_id, pad_token=pad_token)
+
+        with open(os.path.join(model_dir, "labels.json"), "r", encoding="utf-8") as f:
+            self.labels: List[str] = json.load(f)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        self._session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def __call__(self, inputs: Union[str, List[str]], batch_size: Optional[int] = None) -> List[Any]:
+        """
+        Score texts for every emotion label.
+
+        Mirrors the pipeline's return shape: a single string gives
+        [[{label, score}, ...]], a list gives one label/score list per text.
+        """
+        import numpy as np
+
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+        batch_size = batch_size or len(texts) or 1
+
+        outputs: List[List[Dict[str, Any]]] = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self._batch_tokenizer.encode_batch(texts[start:start + batch_size])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            }
+            logits = self._session.run(None, feeds)[0]
+
+            # Softmax, as the pipeline applies for single-label models
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                outputs.append([
+                    {"label": label, "score": float(score)}
+                    for label, score in zip(self.labels, row)
+                ])
+
+        return [outputs[0]] if single else outputs
+
+
+def load_onnx_classifier(model_id: str, intra_op_threads: Optional[int] = None) -> OnnxEmotionClassifier:
+    """
+    Return an ONNX classifier for model_id, exporting it on first use.
+
+    Args:
+        model_id: HuggingFace model id.
+        intra_op_threads: Defaults to the EMOTION_ONNX_THREADS env var (0 = auto).
+    """
+    if intra_op_threads is None:
+        intra_op_threads = int(os.environ.get("EMOTION_ONNX_THREADS", "0"))
+
+    model_dir = _export_dir(model_id)
+    if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+        export_onnx_model(model_id, model_dir)
+
+    return OnnxEmotionClassifier(model_dir, intra_op_threads=intra_op_threads)
@@ -1,10 +1,19 @@
 import os
+import re
+import functools
+import json
 import time
 import logging
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from disk_cache import DiskCache, default_cache_dir
+from transcript_compactor import CHARS_PER_TOKEN, estimate_tokens
+from rate_limiter import CircuitOpenError, RateLimitTimeout, get_rate_limiter, parse_retry_after
+
 # Load environment variables
 load_dotenv()
 
@@ -22,23 +31,71 @@ except Exception as e:
     logger.error(f"Failed to configure Gemini API: {e}")
     raise
 
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-exp'
+
 # Global model cache
 _gemini_model: Optional[genai.GenerativeModel] = None
+_gemini_model_lock = threading.Lock()
+
+# Persistent response cache shared by all workers, created on first use
+_response_cache: Optional[DiskCache] = None
+_response_cache_lock = threading.Lock()
+DEFAULT_LLM_CACHE_MB = 64
+DEFAULT_LLM_CACHE_TTL_HOURS = 24
+
+# Upper bound on Gemini calls one analysis runs at the same time
+DEFAULT_MAX_CONCURRENCY = 3
+
+# Transcripts over this many (estimated) tokens are analyzed map-reduce style,
+# in chunks of DEFAULT_CHUNK_TOKENS; ~7500 tokens is the old 30,000-char limit
+DEFAULT_MAX_PROMPT_TOKENS = 7500
+DEFAULT_CHUNK_TOKENS = 4000
+DEFAULT_MAP_CONCURRENCY = 4
 
 def get_gemini_model() -> genai.GenerativeModel:
     """Get cached Gemini model or create if not cached."""
     global _gemini_model
     
-    if _gemini_model is None:
-        try:
-            _gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            logger.info("Gemini model initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini model: {e}")
-            raise RuntimeError(f"Failed to initialize Gemini model: {str(e)}")
+    with _gemini_model_lock:
+        if _gemini_model is None:
+            try:
+                _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+                logger.info("Gemini model initialized")
+            except Exception as e:
+                logger.error(f"Failed to initialize Gemini model: {e}")
+                raise RuntimeError(f"Failed to initialize Gemini model: {str(e)}")
     
     return _gemini_model
 
+def _get_response_cache() -> Optional[DiskCache]:
+    """
+    Return the shared LLM response cache, or None if it is disabled.
+    
+    Controlled by LLM_CACHE_ENABLED (default "1"), LLM_CACHE_MAX_MB
+    (default 64) and LLM_CACHE_TTL_HOURS (default 24).
+    """
+    global _response_cache
+    
+    if os.environ.get("LLM_CACHE_ENABLED", "1") == "0":
+        return None
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            max_mb = int(os.environ.get("LLM_CACHE_MAX_MB", DEFAULT_LLM_CACHE_MB))
+            ttl_hours = float(os.environ.get("LLM_CACHE_TTL_HOURS", DEFAULT_LLM_CACHE_TTL_HOURS))
+            _response_cache = DiskCache(
+                default_cache_dir("llm"),
+                max_bytes=max_mb * 1024 * 1024,
+                name="llm",
+                ttl_seconds=ttl_hours * 3600
+            )
+        return _response_cache
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Return statistics for the LLM response cache."""
+    cache = _get_response_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
 def validate_transcript(transcript: str) -> None:
     """Validate transcript input."""
     if not transcript:
@@ -51,19 +108,36 @@ def validate_transcript(transcript: str) -> None:
     if len(transcript) < 10:
         raise ValueError("Transcript too short for meaningful analysis")
     
-    # Check for reasonable length (Gemini has token limits)
-    max_length = 30000  # Approximate character limit
-    if len(transcript) > max_length:
+    # Check for reasonable length (analyze_transcript chunks longer transcripts)
+    max_tokens = int(os.environ.get("GEMINI_MAX_PROMPT_TOKENS", DEFAULT_MAX_PROMPT_TOKENS))
+    if estimate_tokens(transcript) > max_tokens:
         logger.warning(f"Transcript is very long ({len(transcript)} chars), may be truncated")
 
-def generate_text_with_retry(prompt: str, max_retries: int = 3, delay: float = 1.0) -> str:
+def _is_transient_error(error_msg: str) -> bool:
+    """Throttling, server and timeout errors count toward the circuit breaker."""
+    markers = ("429", "RESOURCE_EXHAUSTED", "RESOURCEEXHAUSTED", "QUOTA", "RATE LIMIT",
+               "500", "502", "503", "504", "UNAVAILABLE", "DEADLINE", "TIMEOUT", "TIMED OUT")
+    upper = error_msg.upper()
+    return any(marker in upper for marker in markers)
+
+def generate_text_with_retry(prompt: str, max_retries: int = 3, delay: float = 1.0,
+                             response_schema: Optional[Dict[str, Any]] = None,
+                             use_cache: bool = True,
+                             cache_if: Optional[Callable[[str], bool]] = None) -> str:
     """
     Generate text using Gemini API with retry logic.
     
+    Responses are cached on disk, keyed by model name, generation config
+    and prompt, so re-running the same analysis skips the API.
+    
     Args:
         prompt: The prompt to send to the model
         max_retries: Maximum number of retry attempts
         delay: Delay between retries in seconds
+        response_schema: Request JSON output matching this schema
+        use_cache: Read and write the response cache
+        cache_if: Only cache responses for which this returns True (e.g.
+                  JSON that parses), so a bad answer is not replayed
         
     Returns:
         Generated text response
@@ -71,39 +145,76 @@ def generate_text_with_retry(prompt: str, max_retries: int = 3, delay: float = 1
     Raises:
         RuntimeError: If all retries fail
     """
+    # Configure generation parameters
+    config_params: Dict[str, Any] = {
+        "temperature": 0.3,
+        "top_p": 0.8,
+        "top_k": 40,
+        "max_output_tokens": 1000,
+    }
+    if response_schema is not None:
+        # One JSON answer carries several analyses, so allow more tokens
+        config_params.update(
+            max_output_tokens=2048,
+            response_mime_type="application/json",
+            response_schema=response_schema,
+        )
+    
+    cache = _get_response_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = DiskCache.make_key(GEMINI_MODEL_NAME, config_params, prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("LLM response cache hit")
+            return cached
+    
     model = get_gemini_model()
+    generation_config = genai.types.GenerationConfig(**config_params)
+    limiter = get_rate_limiter()
     
     for attempt in range(max_retries + 1):
         try:
             logger.debug(f"Generating text (attempt {attempt + 1}/{max_retries + 1})")
             
-            # Configure generation parameters
-            generation_config = genai.types.GenerationConfig(
-                temperature=0.3,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=1000,
-            )
+            # Shared across workers; fails fast while Gemini is unhealthy
+            limiter.acquire()
             
             response = model.generate_content(
                 prompt,
                 generation_config=generation_config
             )
+            limiter.record_success()
             
             if not response or not response.text:
                 raise ValueError("Empty response from Gemini API")
             
-            return response.text.strip()
+            text = response.text.strip()
+            if cache is not None and (cache_if is None or cache_if(text)):
+                cache.set(cache_key, text)
+            return text
+            
+        except (CircuitOpenError, RateLimitTimeout) as e:
+            logger.warning(f"Gemini call not attempted: {e}")
+            raise RuntimeError(str(e))
             
         except Exception as e:
             error_msg = str(e)
             logger.warning(f"API call failed (attempt {attempt + 1}): {error_msg}")
             
+            if _is_transient_error(error_msg):
+                limiter.record_failure(parse_retry_after(e))
+            else:
+                # Gemini answered; it is not unhealthy (this also settles a
+                # half-open probe instead of leaving the breaker stuck)
+                limiter.record_success()
+            
             # Don't retry on certain errors
             if "API_KEY" in error_msg.upper() or "PERMISSION" in error_msg.upper():
                 raise RuntimeError(f"API authentication error: {error_msg}")
             
             if attempt < max_retries:
+                # The limiter already holds every worker back until a Retry-After hint
                 sleep_time = delay * (2 ** attempt)  # Exponential backoff
                 logger.info(f"Retrying in {sleep_time} seconds...")
                 time.sleep(sleep_time)
@@ -112,12 +223,55 @@ def generate_text_with_retry(prompt: str, max_retries: int = 3, delay: float = 1
     
     raise RuntimeError("Failed to generate text: Max retries exceeded")
 
-def summarize_transcript(transcript: str) -> str:
+def run_concurrently(
+    calls: Dict[str, Tuple[Callable[..., Any], tuple]],
+    max_workers: Optional[int] = None
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run independent LLM calls in parallel threads.
+    
+    Each call is isolated: an exception is returned in place of that
+    call's result instead of being raised, so one failure never cancels
+    the others.
+    
+    Args:
+        calls: Mapping of name -> (function, args)
+        max_workers: Maximum concurrent calls (default GEMINI_MAX_CONCURRENCY)
+        
+    Returns:
+        (results, latencies): results maps each name to its return value or
+        exception; latencies maps each name to its wall time in seconds,
+        plus 'total' for the whole fan-out
+    """
+    if max_workers is None:
+        max_workers = int(os.environ.get("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+    
+    latencies: Dict[str, float] = {}
+    
+    def timed(name: str, func: Callable[..., Any], args: tuple) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as e:
+            return e
+        finally:
+            latencies[name] = round(time.perf_counter() - started, 3)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))), thread_name_prefix="gemini") as executor:
+        futures = {name: executor.submit(timed, name, func, args) for name, (func, args) in calls.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    latencies["total"] = round(time.perf_counter() - started, 3)
+    
+    return results, latencies
+
+def summarize_transcript(transcript: str, use_cache: bool = True) -> str:
     """
     Generate a summary of the call transcript.
     
     Args:
         transcript: The call transcript to summarize
+        use_cache: Use the LLM response cache
         
     Returns:
         Summary text
@@ -142,19 +296,20 @@ def summarize_transcript(transcript: str) -> str:
         Summary:
         """
         
-        return generate_text_with_retry(prompt)
+        return generate_text_with_retry(prompt, use_cache=use_cache)
         
     except Exception as e:
         error_msg = f"Summary generation failed: {str(e)}"
         logger.error(error_msg)
         return f"Unable to generate summary: {str(e)}"
 
-def analyze_sentiment(transcript: str) -> str:
+def analyze_sentiment(transcript: str, use_cache: bool = True) -> str:
     """
     Analyze the sentiment of the call transcript.
     
     Args:
         transcript: The call transcript to analyze
+        use_cache: Use the LLM response cache
         
     Returns:
         Sentiment analysis text
@@ -179,19 +334,20 @@ def analyze_sentiment(transcript: str) -> str:
         Sentiment Analysis:
         """
         
-        return generate_text_with_retry(prompt)
+        return generate_text_with_retry(prompt, use_cache=use_cache)
         
     except Exception as e:
         error_msg = f"Sentiment analysis failed: {str(e)}"
         logger.error(error_msg)
         return f"Unable to analyze sentiment: {str(e)}"
 
-def suggest_counsellor_response(transcript: str) -> str:
+def suggest_counsellor_response(transcript: str, use_cache: bool = True) -> str:
     """
     Suggest improved counsellor responses.
     
     Args:
         transcript: The call transcript to analyze
+        use_cache: Use the LLM response cache
         
     Returns:
         Suggestions text
@@ -220,18 +376,288 @@ def suggest_counsellor_response(transcript: str) -> str:
         Counsellor Response Suggestions:
         """
         
-        return generate_text_with_retry(prompt)
+        return generate_text_with_retry(prompt, use_cache=use_cache)
         
     except Exception as e:
         error_msg = f"Suggestion generation failed: {str(e)}"
         logger.error(error_msg)
         return f"Unable to generate suggestions: {str(e)}"
 
+ANALYSIS_MODES = ("combined", "separate")
+
+# Fields of the combined analysis, each also available as a separate prompt
+ANALYSIS_FIELDS = ("summary", "sentiment", "suggestions")
+
+_ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {field: {"type": "STRING"} for field in ANALYSIS_FIELDS},
+    "required": list(ANALYSIS_FIELDS),
+}
+
+_FAILURE_LABELS = {
+    "summary": "Summary generation failed",
+    "sentiment": "Gemini sentiment analysis failed",
+    "suggestions": "Suggestion generation failed",
+}
+
+def _separate_call(field: str) -> Callable[[str], str]:
+    return {
+        "summary": summarize_transcript,
+        "sentiment": analyze_sentiment,
+        "suggestions": suggest_counsellor_response,
+    }[field]
+
+def _combined_prompt(transcript: str) -> str:
+    return f"""
+        You are an expert in call analysis, emotional intelligence and student counselling.
+        Analyze the following call transcript between a student and a counsellor and
+        answer with a JSON object with exactly these string fields:
+        
+        "summary": A concise 3-5 sentence summary in a professional tone, covering the
+        key topics discussed, the student's main concerns, the advice or actions the
+        counsellor suggested, and any follow-up items or next steps.
+        
+        "sentiment": A 3-5 sentence sentiment analysis with specific examples from the
+        conversation, covering the overall emotional tone of the student's responses,
+        key emotions present (frustration, sadness, hope, anxiety, etc.), notable
+        changes in sentiment, and the counsellor's emotional approach and effectiveness.
+        
+        "suggestions": 3-5 numbered points, each 1-2 sentences, with specific
+        improvements or alternative responses the counsellor could have used: more
+        empathetic responses, better questioning techniques, clearer guidance or action
+        items, improved emotional support, and more effective communication.
+
+        Transcript:
+        {transcript}
+        """
+
+def parse_analysis_json(text: str) -> Dict[str, str]:
+    """
+    Extract the valid fields of a combined analysis response.
+    
+    A field is valid when it is a non-empty string; a list of strings
+    (sometimes returned for suggestions) is joined into numbered lines.
+    Invalid JSON or a non-object yields no fields.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):] if "{" in text else text
+    
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    
+    fields: Dict[str, str] = {}
+    for field in ANALYSIS_FIELDS:
+        value = data.get(field)
+        if isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+            value = "\n".join(f"{i}. {item.strip()}" for i, item in enumerate(value, 1))
+        if isinstance(value, str) and value.strip():
+            fields[field] = value.strip()
+    return fields
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    """Split an oversized piece of text on word boundaries."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces: List[str] = []
+    current: List[str] = []
+    length = 0
+    for word in text.split():
+        if current and length + len(word) + 1 > max_chars:
+            pieces.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def chunk_by_tokens(units: List[str], max_tokens: int) -> List[str]:
+    """
+    Group consecutive units (e.g. speaker turns) into token-budgeted chunks.
+    
+    Chunks break only between units; a single unit over the budget is
+    split on word boundaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        pieces = [unit] if estimate_tokens(unit) <= max_tokens else _split_words(unit, max_tokens)
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def _map_prompt(chunk: str, index: int, total: int) -> str:
+    return f"""
+        You are an expert in call analysis. The text below is part {index} of {total} of a long
+        call transcript between a student and a counsellor. Write concise notes on this part
+        that a later summary, sentiment analysis and coaching review can be built from:
+        
+        1. Topics discussed, concerns raised, advice given and any follow-up items
+        2. The student's emotions and any shifts in them, with short quotes
+        3. The counsellor's approach, including notably strong or weak responses
+        
+        Use at most 200 words.
+
+        Transcript part:
+        {chunk}
+        
+        Notes:
+        """
+
+def _reduce_long_transcript(
+    transcript: str,
+    turns: Optional[List[Dict]],
+    use_cache: bool,
+    latencies: Dict[str, float]
+) -> Tuple[str, int, int]:
+    """
+    Condense a transcript over the prompt budget into per-chunk notes.
+    
+    Chunks are analyzed concurrently (map); the joined notes then stand in
+    for the transcript in the regular prompts (reduce). Notes that are
+    still over budget are condensed again.
+    
+    Returns:
+        (text to analyze, number of transcript chunks; 0 if the transcript
+        fit the budget and is returned unchanged, number of chunk analyses
+        that failed and are missing from the notes)
+    """
+    max_prompt_tokens = int(os.environ.get("GEMINI_MAX_PROMPT_TOKENS", DEFAULT_MAX_PROMPT_TOKENS))
+    if estimate_tokens(transcript) <= max_prompt_tokens:
+        return transcript, 0, 0
+    
+    chunk_tokens = min(int(os.environ.get("GEMINI_CHUNK_TOKENS", DEFAULT_CHUNK_TOKENS)), max_prompt_tokens)
+    concurrency = int(os.environ.get("GEMINI_MAP_CONCURRENCY", DEFAULT_MAP_CONCURRENCY))
+    
+    if turns:
+        units = [f"{turn['speaker']}: {turn['text']}" for turn in turns if turn.get("text", "").strip()]
+    else:
+        units = re.split(r"(?<=[.!?])\s+", transcript)
+    
+    first_level_chunks = 0
+    failed_chunks = 0
+    text = transcript
+    started = time.perf_counter()
+    while estimate_tokens(text) > max_prompt_tokens:
+        chunks = chunk_by_tokens(units, chunk_tokens)
+        if len(chunks) < 2:
+            break
+        first_level_chunks = first_level_chunks or len(chunks)
+        logger.info(f"Transcript over the prompt budget; analyzing {len(chunks)} chunks with concurrency {concurrency}")
+        
+        notes, _ = run_concurrently({
+            str(i): (functools.partial(generate_text_with_retry, use_cache=use_cache), (_map_prompt(chunk, i, len(chunks)),))
+            for i, chunk in enumerate(chunks, 1)
+        }, max_workers=concurrency)
+        
+        units = []
+        for i, note in notes.items():
+            if isinstance(note, Exception):
+                logger.error(f"Chunk {i}/{len(chunks)} analysis failed: {note}")
+                failed_chunks += 1
+            else:
+                units.append(f"Notes on part {i} of {len(chunks)}:\n{note}")
+        if not units:
+            # Nothing to reduce; analyze the original transcript as before
+            return transcript, 0, failed_chunks
+        text = "\n\n".join(units)
+    
+    latencies["map"] = round(time.perf_counter() - started, 3)
+    return text, first_level_chunks, failed_chunks
+
+def analyze_transcript(transcript: str, mode: Optional[str] = None,
+                       use_cache: bool = True,
+                       turns: Optional[List[Dict]] = None) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Produce the summary, sentiment analysis and counsellor suggestions.
+    
+    In "combined" mode the transcript is sent once and the model answers
+    with JSON holding all three fields; only fields that are missing or
+    malformed are then requested with their separate prompts. "separate"
+    mode runs the three prompts concurrently.
+    
+    Transcripts over GEMINI_MAX_PROMPT_TOKENS are first split on turn
+    boundaries into GEMINI_CHUNK_TOKENS chunks whose notes are generated
+    concurrently, and the prompts run over those notes instead.
+    
+    Args:
+        transcript: The call transcript to analyze
+        mode: "combined" or "separate" (default GEMINI_ANALYSIS_MODE, combined)
+        use_cache: Use the LLM response cache
+        turns: Diarized turns used as chunk boundaries for long transcripts
+        
+    Returns:
+        (results, metadata): results maps each of ANALYSIS_FIELDS to text;
+        metadata has 'mode', 'fallback_fields', 'chunks', 'failed_chunks'
+        (map analyses whose notes are missing) and 'llm_latency_s'
+    """
+    mode = mode or os.environ.get("GEMINI_ANALYSIS_MODE", "combined")
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{mode}'. Available: {', '.join(ANALYSIS_MODES)}")
+    
+    results: Dict[str, Any] = {}
+    latencies: Dict[str, float] = {}
+    started = time.perf_counter()
+    
+    text, chunks, failed_chunks = _reduce_long_transcript(transcript, turns, use_cache, latencies)
+    
+    if mode == "combined":
+        combined_started = time.perf_counter()
+        try:
+            validate_transcript(text)
+            response = generate_text_with_retry(
+                _combined_prompt(text), response_schema=_ANALYSIS_SCHEMA, use_cache=use_cache,
+                cache_if=lambda answer: len(parse_analysis_json(answer)) == len(ANALYSIS_FIELDS)
+            )
+            results = parse_analysis_json(response)
+            if len(results) < len(ANALYSIS_FIELDS):
+                logger.warning(f"Combined analysis missing or malformed fields: "
+                               f"{[f for f in ANALYSIS_FIELDS if f not in results]}")
+        except Exception as e:
+            logger.error(f"Combined analysis failed: {e}")
+        latencies["combined"] = round(time.perf_counter() - combined_started, 3)
+    
+    missing = [field for field in ANALYSIS_FIELDS if field not in results]
+    if missing:
+        fallback_results, fallback_latencies = run_concurrently(
+            {field: (_separate_call(field), (text, use_cache)) for field in missing}
+        )
+        fallback_latencies.pop("total")
+        latencies.update(fallback_latencies)
+        for field, result in fallback_results.items():
+            if isinstance(result, Exception):
+                logger.error(f"{_FAILURE_LABELS[field]}: {result}")
+                result = f"{_FAILURE_LABELS[field]}: {str(result)}"
+            results[field] = result
+    
+    latencies["total"] = round(time.perf_counter() - started, 3)
+    metadata = {
+        "mode": mode,
+        "fallback_fields": missing if mode == "combined" else [],
+        "chunks": chunks,
+        "failed_chunks": failed_chunks,
+        "llm_latency_s": latencies,
+    }
+    return results, metadata
+
 def test_api_connection() -> bool:
     """Test if the Gemini API is working properly."""
     try:
         test_prompt = "Respond with 'API test successful'"
-        response = generate_text_with_retry(test_prompt, max_retries=1)
+        response = generate_text_with_retry(test_prompt, max_retries=1, use_cache=False)
         return "successful" in response.lower()
     except Exception as e:
         logger.error(f"API connection test failed: {e}")
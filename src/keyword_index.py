@@ -0,0 +1,134 @@
+"""
+Keyword Index Module
+=====================
+Corpus-level document-frequency index for the TF-IDF keyword path.
+
+Every processed transcript adds its distinct unigrams and bigrams to a
+small SQLite database, so the fallback keyword extractor can weigh terms
+by how rare they are across calls instead of by raw frequency alone.
+Tables are WITHOUT ROWID (the term is the key), transcripts are counted
+once per content hash, and WAL mode lets gunicorn workers share the file.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from disk_cache import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's bound-parameter limit
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS documents (digest TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+
+class KeywordIndex:
+    """Persistent, incrementally updated document-frequency table."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file (created if missing).
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_document(self, terms: Iterable[str], text: str) -> bool:
+        """
+        Count a transcript's distinct terms once.
+
+        Args:
+            terms: Terms occurring in the transcript.
+            text: The transcript; its hash stops reprocessed calls from
+                  being counted twice.
+
+        Returns:
+            True if the document was new and the index was updated.
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        rows = [(term,) for term in set(terms)]
+
+        with self._lock, self._conn:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO documents (digest) VALUES (?)", (digest,)
+            ).rowcount
+            if not inserted:
+                return False
+            self._conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 1) "
+                "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                rows
+            )
+        return True
+
+    def document_frequencies(self, terms: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+        """
+        Look up document frequencies.
+
+        Returns:
+            (number of indexed documents, {term: df} for terms seen before).
+        """
+        terms = list(set(terms))
+        frequencies: Dict[str, int] = {}
+
+        with self._lock:
+            n_docs = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            for start in range(0, len(terms), _QUERY_CHUNK):
+                chunk = terms[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                frequencies.update(self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({placeholders})", chunk
+                ).fetchall())
+        return n_docs, frequencies
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+                "terms": self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[KeywordIndex] = None
+_index_lock = threading.Lock()
+
+
+def is_index_enabled() -> bool:
+    return os.environ.get("KEYWORD_INDEX_ENABLED", "1") == "1"
+
+
+def get_index() -> KeywordIndex:
+    """Return this process's index on KEYWORD_INDEX_PATH (or the cache dir)."""
+    global _index
+
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            path = os.environ.get("KEYWORD_INDEX_PATH") or os.path.join(
+                default_cache_dir("keywords"), "df_index.sqlite3"
+            )
+            _index = KeywordIndex(path)
+            logger.info(f"Keyword document-frequency index at {path}")
+    return _index
@@ -2,13 +2,15 @@ import os
 import json
 import argparse
 import logging
-from typing import Dict
-from gemini_module import summarize_transcript, analyze_sentiment, suggest_counsellor_response
+from typing import Dict, Optional
+from gemini_module import analyze_transcript
 from whisper_module import transcribe_audio_with_segments
-from sentiment_analyzer import EnhancedSentimentAnalyzer
+from audio_buffer import AudioBuffer
+from sentiment_analyzer import EnhancedSentimentAnalyzer, build_sentiment_timeline
 from diarization import diarize_from_segments, format_diarized_transcript
 from emotion_detector import detect_emotions_per_turn, get_emotion_summary
 from topic_extractor import extract_keywords
+from transcript_compactor import compact_transcript
 
 
 # Configure logging
@@ -41,12 +43,16 @@ def validate_audio_file(filepath: str) -> None:
     if file_ext not in valid_extensions:
         raise ValueError(f"Unsupported file format. Supported: {valid_extensions}")
 
-def process_audio(filepath: str) -> Dict[str, str]:
+def process_audio(filepath: str, language: Optional[str] = None, use_cache: bool = True) -> Dict[str, str]:
     """
     Process audio file through transcription and AI analysis pipeline.
     
     Args:
         filepath: Path to the audio file to process
+        language: Language code to pin transcription to (e.g. "en"), or
+                  None/"auto" to use the deployment default
+        use_cache: Reuse cached transcription and LLM results; False
+                   recomputes everything for this request
         
     Returns:
         Dictionary containing transcript, summary, sentiment, and suggestions
@@ -57,9 +63,13 @@ def process_audio(filepath: str) -> Dict[str, str]:
         # Step 1: Validate input
         validate_audio_file(filepath)
         
-        # Step 2: Transcribe audio using Whisper (with timestamps)
+        # Step 2: Decode once, then transcribe using Whisper (with timestamps).
+        # Audio stages share zero-copy views of this buffer.
         logger.info("Starting transcription...")
-        transcription_result = transcribe_audio_with_segments(filepath)
+        with AudioBuffer.from_file(filepath) as audio:
+            transcription_result = transcribe_audio_with_segments(
+                filepath, use_cache=use_cache, audio=audio, language=language
+            )
         transcript = transcription_result["text"]
         segments = transcription_result["segments"]
         detected_language = transcription_result.get("language", "unknown")
@@ -86,11 +96,11 @@ def process_audio(filepath: str) -> Dict[str, str]:
             logger.error(f"Emotion detection failed: {e}")
             emotion_summary = {"error": str(e)}
         
-        # Step 2.8: Keyword Extraction (KeyBERT)
+        # Step 2.9: Keyword Extraction (KeyBERT; embeddings are only computed if it runs)
         logger.info("Starting keyword extraction...")
         keywords_result = {}
         try:
-            keywords_result = extract_keywords(transcript)
+            keywords_result = extract_keywords(transcript, turns=diarized_turns)
             logger.info(f"Keyword extraction completed. {len(keywords_result.get('keywords', []))} keywords found via {keywords_result.get('method', 'unknown')}.")
         except Exception as e:
             logger.error(f"Keyword extraction failed: {e}")
@@ -101,29 +111,37 @@ def process_audio(filepath: str) -> Dict[str, str]:
         sentiment_analyzer = EnhancedSentimentAnalyzer()
         detailed_sentiment = sentiment_analyzer.analyze_sentiment(transcript)
         
-        # Step 4: AI Analysis with error handling
-        summary = ""
-        gemini_sentiment = ""
-        suggestions = ""
-        
-        try:
-            logger.info("Starting AI analysis...")
-            summary = summarize_transcript(transcript)
-        except Exception as e:
-            logger.error(f"Summary generation failed: {e}")
-            summary = f"Summary generation failed: {str(e)}"
-        
-        try:
-            gemini_sentiment = analyze_sentiment(transcript)
-        except Exception as e:
-            logger.error(f"Gemini sentiment analysis failed: {e}")
-            gemini_sentiment = f"Gemini sentiment analysis failed: {str(e)}"
-        
+        # Step 3.5: Per-turn sentiment timeline
+        sentiment_timeline = {}
         try:
-            suggestions = suggest_counsellor_response(transcript)
+            sentiment_timeline = build_sentiment_timeline(diarized_turns, analyzer=sentiment_analyzer)
         except Exception as e:
-            logger.error(f"Suggestion generation failed: {e}")
-            suggestions = f"Suggestion generation failed: {str(e)}"
+            logger.error(f"Sentiment timeline failed: {e}")
+            sentiment_timeline = {"error": str(e)}
+        
+        # Step 3.8: Compact the transcript for the LLM prompts (fillers, repeats, Whisper loops)
+        llm_transcript, llm_turns, compaction_stats = transcript, diarized_turns, None
+        if os.environ.get("TRANSCRIPT_COMPACTION", "1") == "1":
+            try:
+                compacted = compact_transcript(
+                    transcript, diarized_turns,
+                    speaker_labels=os.environ.get("TRANSCRIPT_SPEAKER_LABELS", "none")
+                )
+                if compacted["text"].strip():
+                    llm_transcript = compacted["text"]
+                    llm_turns = compacted["turns"] or diarized_turns
+                    compaction_stats = compacted["stats"]
+            except Exception as e:
+                logger.error(f"Transcript compaction failed: {e}")
+        
+        # Step 4: AI Analysis (one combined Gemini call by default)
+        logger.info("Starting AI analysis...")
+        llm_results, llm_metadata = analyze_transcript(llm_transcript, use_cache=use_cache, turns=llm_turns)
+        logger.info(f"AI analysis completed in {llm_metadata['llm_latency_s']['total']:.1f}s ({llm_metadata['mode']} mode)")
+        
+        summary = llm_results["summary"]
+        gemini_sentiment = llm_results["sentiment"]
+        suggestions = llm_results["suggestions"]
         
         response = {
             "transcript": transcript,
@@ -133,11 +151,21 @@ def process_audio(filepath: str) -> Dict[str, str]:
             "summary": summary,
             "sentiment": {
                 "gemini_analysis": gemini_sentiment,
-                "detailed_scores": detailed_sentiment
+                "detailed_scores": detailed_sentiment,
+                "timeline": sentiment_timeline
             },
             "suggestion": suggestions,
             "emotions": emotion_summary,
-            "keywords": keywords_result
+            "keywords": keywords_result,
+            "metadata": {
+                "vad": transcription_result.get("vad"),
+                "compaction": compaction_stats,
+                "llm_mode": llm_metadata["mode"],
+                "llm_fallback_fields": llm_metadata["fallback_fields"],
+                "llm_chunks": llm_metadata["chunks"],
+                "llm_failed_chunks": llm_metadata["failed_chunks"],
+                "llm_latency_s": llm_metadata["llm_latency_s"]
+            }
         }
         
         logger.info("Audio processing completed successfully")
@@ -164,6 +192,8 @@ if __name__ == "__main__":
         description="Process an audio file and output the summary, sentiment, and response suggestions"
     )
     parser.add_argument("audio_file", help="Path to the audio file to analyze")
+    parser.add_argument("--language", "-l", help="Pin the transcription language (e.g. 'en'), or 'auto'")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached transcription and LLM results")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
     args = parser.parse_args()
@@ -172,7 +202,7 @@ if __name__ == "__main__":
         logging.getLogger().setLevel(logging.DEBUG)
     
     try:
-        result = process_audio(args.audio_file)
+        result = process_audio(args.audio_file, language=args.language, use_cache=not args.no_cache)
         
         if "error" in result:
             print(f"Error: {result['error']}")
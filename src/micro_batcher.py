@@ -0,0 +1,141 @@
+"""
+Micro-Batching Module
+======================
+Collects inference requests from concurrent threads into shared batches.
+
+Each gunicorn thread submits its items and blocks on futures; a single
+background thread flushes a batch as soon as it is full or the oldest
+pending item has waited max_wait seconds, runs it through the model in
+one forward pass, and hands each caller its own results.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Thread-safe request coalescer in front of a batch inference function."""
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.01,
+        name: str = "batcher"
+    ):
+        """
+        Args:
+            process_batch: Runs a list of items and returns one result per
+                           item, in order. A result that is an Exception is
+                           raised to that item's caller only.
+            max_batch_size: Flush as soon as this many items are pending.
+            max_wait: Flush when the oldest pending item has waited this
+                      long (seconds), even if the batch is not full.
+            name: Name used in logs, the worker thread name and stats.
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+
+        self._queue: Deque[Tuple[Any, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self._batches = 0
+        self._items = 0
+        self._full_batches = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+
+    def submit(self, items: List[Any]) -> List[Future]:
+        """Queue items for inference and return one future per item."""
+        now = time.monotonic()
+        futures: List[Future] = [Future() for _ in items]
+
+        with self._cond:
+            self._ensure_worker()
+            for item, future in zip(items, futures):
+                self._queue.append((item, future, now))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+
+        return futures
+
+    def map(self, items: List[Any]) -> List[Any]:
+        """Submit items and wait for all results (raises the first failure)."""
+        return [future.result() for future in self.submit(items)]
+
+    def _ensure_worker(self) -> None:
+        """Start the flush thread on first use. Caller holds the condition."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-flush", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> List[Tuple[Any, Future, float]]:
+        """Block until a batch is due, then pop it from the queue."""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            size = min(self.max_batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+
+            try:
+                results = self.process_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name} returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                results = [e] * len(batch)
+
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            with self._cond:
+                self._batches += 1
+                self._items += len(batch)
+                self._total_wait += sum(started - enqueued for _, _, enqueued in batch)
+                if len(batch) == self.max_batch_size:
+                    self._full_batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and batch occupancy metrics."""
+        with self._cond:
+            mean_size = self._items / self._batches if self._batches else 0.0
+            return {
+                "name": self.name,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "full_batches": self._full_batches,
+                "mean_batch_size": round(mean_size, 2),
+                "mean_occupancy": round(mean_size / self.max_batch_size, 4),
+                "mean_wait_ms": round(1000 * self._total_wait / self._items, 2) if self._items else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+            }
@@ -0,0 +1,171 @@
+"""
+Model Registry Module
+======================
+Thread-safe in-process cache for heavyweight models.
+
+Holds several models at once within a memory budget, evicts the least
+recently used one when the budget is exceeded, and makes sure only one
+thread loads a given model while any other thread asking for it waits.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_model_bytes(model: Any) -> Optional[int]:
+    """Sum tensor sizes in a torch module's state dict, or None if not torch."""
+    try:
+        state = model.state_dict()
+    except (AttributeError, TypeError):
+        return None
+
+    total = 0
+    for value in state.values():
+        # Dynamically quantized layers store (weight, bias) packed in a tuple
+        tensors = value if isinstance(value, (tuple, list)) else (value,)
+        for tensor in tensors:
+            if hasattr(tensor, "numel") and hasattr(tensor, "element_size"):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class _LoadInProgress:
+    """Handle shared by a loading thread and the threads waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class ModelRegistry:
+    """LRU model cache with a memory budget and single-flight loading."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[str], Any],
+        memory_budget_bytes: int,
+        fallback_sizes: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            name: Name used in logs and stats.
+            loader: Function that loads a model for a given key.
+            memory_budget_bytes: Total resident size allowed before eviction.
+            fallback_sizes: Size estimates (bytes) per key for models whose
+                            size can't be measured from a torch state dict.
+        """
+        self.name = name
+        self.memory_budget_bytes = memory_budget_bytes
+        self._loader = loader
+        self._fallback_sizes = fallback_sizes or {}
+
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loading: Dict[str, _LoadInProgress] = {}
+
+    def get(self, key: str) -> Any:
+        """
+        Return the model for key, loading it if needed.
+
+        Raises:
+            Whatever the loader raised, in the loading thread and in
+            every thread that was waiting for that load.
+        """
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                entry["hits"] += 1
+                return entry["model"]
+
+            pending = self._loading.get(key)
+            is_loader = pending is None
+            if is_loader:
+                pending = _LoadInProgress()
+                self._loading[key] = pending
+
+        if not is_loader:
+            logger.info(f"Waiting for {self.name} '{key}' model to finish loading")
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return self.get(key)
+
+        try:
+            start = time.perf_counter()
+            model = self._loader(key)
+            load_time = time.perf_counter() - start
+        except BaseException as e:
+            pending.error = e
+            with self._lock:
+                del self._loading[key]
+            pending.done.set()
+            raise
+
+        resident = estimate_model_bytes(model)
+        if resident is None:
+            resident = self._fallback_sizes.get(key, 0)
+
+        with self._lock:
+            self._models[key] = {
+                "model": model,
+                "load_time_s": round(load_time, 3),
+                "resident_bytes": resident,
+                "hits": 0,
+            }
+            del self._loading[key]
+            self._evict_over_budget(keep=key)
+        pending.done.set()
+
+        logger.info(
+            f"Loaded {self.name} '{key}' model in {load_time:.1f}s "
+            f"({resident / (1024 * 1024):.0f} MB)"
+        )
+        return model
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Drop least recently used models until within budget. Caller holds the lock."""
+        total = sum(entry["resident_bytes"] for entry in self._models.values())
+        for key in list(self._models.keys()):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._models.pop(key)["resident_bytes"]
+            logger.info(f"Evicted {self.name} '{key}' model to stay within memory budget")
+
+    def evict(self, key: str) -> None:
+        """Remove a single model from the registry."""
+        with self._lock:
+            self._models.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every model from the registry."""
+        with self._lock:
+            self._models.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return load time and resident size for each cached model."""
+        with self._lock:
+            models = {
+                key: {
+                    "load_time_s": entry["load_time_s"],
+                    "resident_mb": round(entry["resident_bytes"] / (1024 * 1024), 1),
+                    "hits": entry["hits"],
+                }
+                for key, entry in self._models.items()
+            }
+            resident = sum(entry["resident_bytes"] for entry in self._models.values())
+            return {
+                "name": self.name,
+                "models": models,
+                "resident_mb": round(resident / (1024 * 1024), 1),
+                "budget_mb": round(self.memory_budget_bytes / (1024 * 1024), 1),
+                "loading": sorted(self._loading.keys()),
+            }
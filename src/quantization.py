@@ -0,0 +1,173 @@
+"""
+Dynamic Quantization Module
+============================
+Opt-in int8 inference for the CPU models (Whisper, emotion classifier).
+
+PyTorch dynamic quantization converts every Linear layer to int8 weights
+with activations quantized on the fly. The quantized weights are saved to
+the cache directory as a state_dict the first time; later worker starts
+build the architecture with its parameters on the meta device (no fp32
+weights are loaded or allocated), swap in empty int8 layers and load the
+cached weights with weights_only=True, so a file planted in the cache can
+never run code when it is loaded.
+
+Enable with QUANTIZE_MODELS=1.
+"""
+
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from disk_cache import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Serializes meta-device builds; the patched register_parameter is global
+_meta_build_lock = threading.Lock()
+
+
+def is_quantization_enabled() -> bool:
+    """Whether quantized inference is switched on (QUANTIZE_MODELS=1)."""
+    return os.environ.get("QUANTIZE_MODELS", "0") == "1"
+
+
+def _as_plain_linear(model: Any) -> None:
+    """
+    Convert subclasses of nn.Linear (Whisper defines its own) to plain
+    nn.Linear, since torch only quantizes exact Linear types.
+    """
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+
+
+def quantize_linear_layers(model: Any) -> Any:
+    """Apply int8 dynamic quantization to all Linear layers of a torch model."""
+    import torch
+
+    _as_plain_linear(model)
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _quantized_skeleton(model: Any) -> Any:
+    """
+    Replace every Linear layer with an empty int8 dynamic Linear of the same
+    shape, ready for load_state_dict() with cached quantized weights.
+    """
+    import torch
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+
+    _as_plain_linear(model)
+    model.eval()
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child) is torch.nn.Linear:
+                setattr(parent, name, DynamicLinear(
+                    child.in_features, child.out_features,
+                    bias_=child.bias is not None, dtype=torch.qint8
+                ))
+    return model
+
+
+@contextlib.contextmanager
+def _parameters_on_meta() -> Iterator[None]:
+    """
+    Create module parameters on the meta device while building a model.
+
+    Parameters take no memory and skip their random init; buffers stay
+    real, since non-persistent ones (attention masks, position ids) are
+    not in a state_dict and could never be loaded afterwards. Only the
+    calling thread is affected.
+    """
+    import torch
+
+    owner = threading.get_ident()
+    register = torch.nn.Module.register_parameter
+
+    def register_on_meta(module: Any, name: str, param: Any) -> None:
+        register(module, name, param)
+        if param is not None and threading.get_ident() == owner:
+            param_cls = type(module._parameters[name])
+            module._parameters[name] = param_cls(param.to("meta"), requires_grad=param.requires_grad)
+
+    with _meta_build_lock:
+        torch.nn.Module.register_parameter = register_on_meta
+        try:
+            yield
+        finally:
+            torch.nn.Module.register_parameter = register
+
+
+def _load_weights(model: Any, state_dict: Any) -> Any:
+    """Load a cached state_dict into a skeleton, replacing any meta tensors."""
+    model.load_state_dict(state_dict, assign=True)
+    missing = [
+        name for name, tensor in list(model.named_parameters()) + list(model.named_buffers())
+        if tensor.is_meta
+    ]
+    if missing:
+        raise RuntimeError(f"No cached weights for {', '.join(missing[:3])}")
+    return model.eval()
+
+
+def load_quantized(cache_name: str, build_fp32: Callable[[], Any],
+                   build_empty: Optional[Callable[[], Any]] = None) -> Any:
+    """
+    Return a quantized model, from the on-disk cache when available.
+
+    Args:
+        cache_name: Unique name for this model (include versions that
+                    affect the weights or the pickled classes).
+        build_fp32: Function that loads the original fp32 model.
+        build_empty: Function that builds the same architecture without
+                     loading its weights (e.g. from the model config). It
+                     runs with parameters on the meta device, so a cached
+                     model starts without touching the fp32 checkpoint;
+                     without it (or if it fails) build_fp32 is used.
+    """
+    import torch
+
+    cache_dir = default_cache_dir("quantized")
+    path = os.path.join(cache_dir, f"{cache_name}-torch{torch.__version__}.state.pt")
+
+    if os.path.exists(path):
+        try:
+            # Tensors only: the cache dir may be shared, so never unpickle objects from it
+            state_dict = torch.load(path, weights_only=True)
+            model = None
+            if build_empty is not None:
+                try:
+                    with _parameters_on_meta():
+                        skeleton = build_empty()
+                    model = _load_weights(_quantized_skeleton(skeleton), state_dict)
+                except Exception as e:
+                    logger.warning(f"Building '{cache_name}' without fp32 weights failed, loading them: {e}")
+            if model is None:
+                model = _load_weights(_quantized_skeleton(build_fp32()), state_dict)
+            logger.info(f"Loaded quantized weights from {path}")
+            return model
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable quantized weights {path}: {e}")
+
+    start = time.perf_counter()
+    model = quantize_linear_layers(build_fp32())
+    logger.info(f"Quantized '{cache_name}' in {time.perf_counter() - start:.1f}s")
+
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-", suffix=".pt")
+        os.close(fd)
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Failed to cache quantized model '{cache_name}': {e}")
+
+    return model
+
@@ -0,0 +1,267 @@
+"""
+Rate Limiter Module
+====================
+Token-bucket rate limiter and circuit breaker shared by all workers.
+
+Every gunicorn worker and thread calling Gemini goes through the same
+limiter state, kept in a small JSON file whose read-modify-write cycle is
+serialized with fcntl.flock. Callers take a token before each request,
+so bursts are smoothed across the whole host instead of per thread.
+
+When the API keeps failing (throttling or server errors) the breaker
+opens and calls fail immediately instead of piling up retries. After a
+recovery period a single probe call is let through; its outcome closes or
+re-opens the breaker. Retry-After hints from throttling errors block the
+bucket for every worker until the hinted time.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from disk_cache import default_cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: state is only shared between threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_PER_MINUTE = 60
+DEFAULT_BURST = 10
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_SECONDS = 30.0
+
+# Callers give up instead of holding a request slot longer than this
+DEFAULT_MAX_WAIT_SECONDS = 10.0
+
+_RETRY_AFTER_RE = re.compile(
+    r"retry(?:[_ -]?after|[_ -]?delay| in)\D{0,20}?(\d+(?:\.\d+)?)\s*(ms|s|sec|seconds)?",
+    re.IGNORECASE
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when no request slot frees up within the caller's wait budget."""
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract a Retry-After hint (in seconds) from an API error, if present.
+
+    Looks at a Retry-After response header, then at retry_delay details
+    and "retry in/after N s" phrases in the error message.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("Retry-After")
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+
+    match = _RETRY_AFTER_RE.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000.0 if (match.group(2) or "").lower() == "ms" else seconds
+    return None
+
+
+class SharedRateLimiter:
+    """Token bucket + circuit breaker whose state lives in a shared file."""
+
+    def __init__(
+        self,
+        path: str,
+        rate_per_minute: float = DEFAULT_RATE_PER_MINUTE,
+        burst: int = DEFAULT_BURST,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_seconds: float = DEFAULT_RECOVERY_SECONDS
+    ):
+        """
+        Args:
+            path: JSON state file shared by all processes (created if missing).
+            rate_per_minute: Sustained request rate across all workers.
+            burst: Bucket capacity (requests allowed back to back).
+            failure_threshold: Consecutive transient failures that open the breaker.
+            recovery_seconds: How long the breaker stays open before a probe.
+        """
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self._thread_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _initial_state(self) -> Dict[str, Any]:
+        return {
+            "tokens": float(self.burst),
+            "updated": time.time(),
+            "blocked_until": 0.0,
+            "breaker": "closed",
+            "failures": 0,
+            "opened_at": 0.0,
+            "probe_started": 0.0,
+        }
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Any]]:
+        """Yield the shared state under an exclusive lock and write it back."""
+        with self._thread_lock, open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        state = json.load(f)
+                except (OSError, ValueError):
+                    state = self._initial_state()
+
+                yield state
+
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".tmp-")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, Any], now: float) -> None:
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(float(self.burst), state["tokens"] + elapsed * self.rate)
+        state["updated"] = now
+
+    def acquire(self, max_wait: Optional[float] = None) -> None:
+        """
+        Take one request slot, waiting for the bucket if needed.
+
+        Args:
+            max_wait: Longest the caller may wait (default
+                      GEMINI_LIMITER_MAX_WAIT_SECONDS).
+
+        Raises:
+            CircuitOpenError: The breaker is open (or a probe is in flight).
+            RateLimitTimeout: No slot would free up within max_wait.
+        """
+        if max_wait is None:
+            max_wait = float(os.environ.get("GEMINI_LIMITER_MAX_WAIT_SECONDS", DEFAULT_MAX_WAIT_SECONDS))
+        deadline = time.time() + max_wait
+
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                self._refill(state, now)
+
+                if state["breaker"] == "open" and now - state["opened_at"] < self.recovery_seconds:
+                    raise CircuitOpenError(
+                        f"Gemini circuit breaker is open; retry in "
+                        f"{self.recovery_seconds - (now - state['opened_at']):.0f}s"
+                    )
+                if state["breaker"] == "half_open" and now - state["probe_started"] < self.recovery_seconds:
+                    raise CircuitOpenError("Gemini circuit breaker is half-open; probe call in flight")
+
+                if now < state["blocked_until"]:
+                    wait = state["blocked_until"] - now
+                elif state["tokens"] >= 1.0:
+                    state["tokens"] -= 1.0
+                    if state["breaker"] != "closed":
+                        # Recovery period over (or the previous probe never
+                        # reported back): the caller that gets a slot is the probe
+                        state["breaker"] = "half_open"
+                        state["probe_started"] = now
+                    return
+                else:
+                    wait = (1.0 - state["tokens"]) / self.rate
+
+            if time.time() + wait > deadline:
+                raise RateLimitTimeout(f"Gemini rate limit: no request slot within {max_wait:.0f}s")
+            time.sleep(wait)
+
+    def record_success(self) -> None:
+        """
+        The API answered (even with a non-transient error such as a bad
+        request): close the breaker and reset the failure count.
+        """
+        with self._locked_state() as state:
+            if state["breaker"] != "closed":
+                logger.info("Gemini circuit breaker closed")
+            state["breaker"] = "closed"
+            state["failures"] = 0
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        """
+        Count a transient failure (throttling, server error, timeout).
+
+        Args:
+            retry_after: Seconds the API asked us to wait; blocks the bucket
+                         for every worker until then.
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            if retry_after:
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+
+            state["failures"] += 1
+            if state["breaker"] == "half_open" or (
+                state["breaker"] == "closed" and state["failures"] >= self.failure_threshold
+            ):
+                state["breaker"] = "open"
+                state["opened_at"] = now
+                logger.warning(
+                    f"Gemini circuit breaker opened after {state['failures']} failures; "
+                    f"failing fast for {self.recovery_seconds:.0f}s"
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current limiter and breaker state for monitoring."""
+        with self._locked_state() as state:
+            now = time.time()
+            self._refill(state, now)
+            return {
+                "breaker": state["breaker"],
+                "consecutive_failures": state["failures"],
+                "open_for_seconds": round(now - state["opened_at"], 1) if state["breaker"] != "closed" else 0.0,
+                "tokens": round(state["tokens"], 2),
+                "burst": self.burst,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "blocked_for_seconds": round(max(0.0, state["blocked_until"] - now), 1),
+            }
+
+
+_limiter: Optional[SharedRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> SharedRateLimiter:
+    """Return the Gemini limiter configured from GEMINI_* environment variables."""
+    global _limiter
+
+    with _limiter_lock:
+        if _limiter is None:
+            path = os.environ.get("GEMINI_LIMITER_STATE_FILE") or os.path.join(
+                default_cache_dir("gemini"), "rate_limiter.json"
+            )
+            _limiter = SharedRateLimiter(
+                path,
+                rate_per_minute=float(os.environ.get("GEMINI_RATE_PER_MINUTE", DEFAULT_RATE_PER_MINUTE)),
+                burst=int(os.environ.get("GEMINI_BURST", DEFAULT_BURST)),
+                failure_threshold=int(os.environ.get("GEMINI_BREAKER_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+                recovery_seconds=float(os.environ.get("GEMINI_BREAKER_RECOVERY_SECONDS", DEFAULT_RECOVERY_SECONDS)),
+            )
+        return _limiter
@@ -0,0 +1,168 @@
+"""
+Result Memoization Module
+==========================
+Process-wide LRU memo for per-text analysis results.
+
+Counselling transcripts repeat the same short turns ("okay", "yeah",
+"thank you", "mm-hmm") over and over. Emotion and sentiment results for
+those are memoized by (model id, normalized text), so repeats skip the
+transformer and VADER entirely.
+
+Normalization only unifies Unicode form and whitespace: case and
+punctuation are kept because both models react to them (e.g. VADER
+boosts "OKAY!" over "okay"). Results that refer back to the text itself,
+such as character offsets, are memoized with exact=True instead.
+"""
+
+import copy
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10000
+
+# Only short texts are memoized; long turns are practically never repeated
+DEFAULT_MAX_CHARS = 200
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for memo keys without changing what the models see."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class ResultMemo:
+    """Thread-safe bounded LRU keyed by (model id, normalized text)."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_chars: int = DEFAULT_MAX_CHARS):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def _key(self, model_id: str, text: str, exact: bool = False) -> Optional[Tuple[str, str]]:
+        normalized = text if exact else normalize_text(text)
+        if not normalized.strip() or len(normalized) > self.max_chars:
+            return None
+        return (model_id, normalized)
+
+    def get(self, model_id: str, text: str, exact: bool = False) -> Optional[Any]:
+        """
+        Return a copy of the memoized result, or None.
+
+        With exact=True the text is used as is, without normalization.
+        """
+        key = self._key(model_id, text, exact)
+        if key is None:
+            return None
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses[model_id] = self._misses.get(model_id, 0) + 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits[model_id] = self._hits.get(model_id, 0) + 1
+
+        # Callers attach results to turns and may modify them
+        return copy.deepcopy(value)
+
+    def put(self, model_id: str, text: str, value: Any, exact: bool = False) -> None:
+        """Memoize a result for a short text (long texts are ignored)."""
+        key = self._key(model_id, text, exact)
+        if key is None:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return overall and per-model hit rates."""
+        with self._lock:
+            models = {}
+            for model_id in set(self._hits) | set(self._misses):
+                hits = self._hits.get(model_id, 0)
+                lookups = hits + self._misses.get(model_id, 0)
+                models[model_id] = {
+                    "hits": hits,
+                    "lookups": lookups,
+                    "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                }
+            hits = sum(self._hits.values())
+            lookups = hits + sum(self._misses.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": hits,
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "models": models,
+            }
+
+
+_memo = ResultMemo(
+    max_entries=int(os.environ.get("RESULT_MEMO_SIZE", DEFAULT_MAX_ENTRIES)),
+    max_chars=int(os.environ.get("RESULT_MEMO_MAX_CHARS", DEFAULT_MAX_CHARS)),
+)
+
+
+def get_memo() -> ResultMemo:
+    """Return the memo shared by every analyzer in this process."""
+    return _memo
+
+
+def get_memo_stats() -> Dict[str, Any]:
+    """Return hit-rate statistics for the shared memo."""
+    return _memo.stats()
+
+
+def seed_from_file(path: str) -> int:
+    """
+    Pre-compute emotion and sentiment results for common utterances.
+
+    Args:
+        path: Text file with one utterance per line; blank lines and lines
+              starting with '#' are ignored.
+
+    Returns:
+        Number of utterances seeded.
+    """
+    from emotion_detector import detect_emotions_per_turn
+    from sentiment_analyzer import EnhancedSentimentAnalyzer
+
+    with open(path, "r", encoding="utf-8") as f:
+        utterances: List[str] = [
+            line.strip() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+    if not utterances:
+        return 0
+
+    # Both analyzers memoize their own results as a side effect
+    detect_emotions_per_turn([{"text": utterance} for utterance in utterances])
+    analyzer = EnhancedSentimentAnalyzer()
+    for utterance in utterances:
+        analyzer.analyze_sentiment(utterance)
+
+    logger.info(f"Seeded result memo with {len(utterances)} utterances from {path}")
+    return len(utterances)
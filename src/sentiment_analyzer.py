@@ -1,11 +1,36 @@
 import logging
-from typing import Dict, List, Any
+import os
+import threading
+import multiprocessing
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import re
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+from result_memo import get_memo
 
 logger = logging.getLogger(__name__)
 
+# Memo namespace for VADER results; keyed on the exact text because
+# indicator spans and char_count refer to it
+MEMO_MODEL_ID = "vader"
+
+BATCH_MODES = ('auto', 'serial', 'thread', 'process')
+
+# VADER and the indicator regexes are pure Python, so threads are serialized
+# by the GIL; "auto" uses worker processes once a batch is large enough to
+# pay for the IPC, and runs serially otherwise
+DEFAULT_PROCESS_MIN_TEXTS = 200
+DEFAULT_CHUNK_SIZE = 64
+
+# Shared pools of analyzer processes by worker count, created on first use
+_pools: Dict[int, concurrent.futures.ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+# Analyzer owned by a pool worker, built once by _init_batch_worker
+_worker_analyzer = None
+
 class EnhancedSentimentAnalyzer:
     """Enhanced sentiment analysis combining VADER scores with text analysis."""
     
@@ -13,20 +38,24 @@ class EnhancedSentimentAnalyzer:
         """Initialize the EnhancedSentimentAnalyzer with VADER and pre-compiled regex patterns."""
         self.vader_analyzer = SentimentIntensityAnalyzer()
         
-        # Pre-compile emotional indicator patterns for better performance
+        # One combined pattern with a named group per category, so the text is
+        # scanned once regardless of how many categories there are
         raw_patterns = {
-            'joy_or_praise': [r'\b(great|excellent|wonderful|amazing|fantastic|perfect|love|happy|excited|pleased)\b'],
-            'gratitude': [r'\b(thank you|thanks|appreciate|grateful)\b'],
-            'agreement': [r'\b(yes|absolutely|definitely|certainly|sure|agreed)\b'],
-            'anger_or_frustration': [r'\b(terrible|awful|horrible|frustrated|angry|mad|furious|upset)\b'],
-            'disappointment_or_worry': [r'\b(disappointed|worried|concerned|anxious|sad|wrong)\b'],
-            'difficulty': [r'\b(problem|issue|trouble|difficult|hard|challenging|broken)\b'],
-            'confusion_or_uncertainty': [r'\b(confused|uncertain|unsure|maybe|perhaps|possibly|how)\b', r'\?']
-        }
-        self.compiled_patterns = {
-            emotion: [re.compile(pattern) for pattern in patterns]
-            for emotion, patterns in raw_patterns.items()
+            'joy_or_praise': [r'\b(?:great|excellent|wonderful|amazing|fantastic|perfect|love|happy|excited|pleased)\b'],
+            'gratitude': [r'\b(?:thank you|thanks|appreciate|grateful)\b'],
+            'agreement': [r'\b(?:yes|absolutely|definitely|certainly|sure|agreed)\b'],
+            'anger_or_frustration': [r'\b(?:terrible|awful|horrible|frustrated|angry|mad|furious|upset)\b'],
+            'disappointment_or_worry': [r'\b(?:disappointed|worried|concerned|anxious|sad|wrong)\b'],
+            'difficulty': [r'\b(?:problem|issue|trouble|difficult|hard|challenging|broken)\b'],
+            'confusion_or_uncertainty': [r'\b(?:confused|uncertain|unsure|maybe|perhaps|possibly|how)\b', r'\?']
         }
+        self.indicator_pattern = re.compile(
+            '|'.join(
+                f"(?P<{emotion}>{'|'.join(patterns)})"
+                for emotion, patterns in raw_patterns.items()
+            ),
+            re.IGNORECASE
+        )
     
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         """
@@ -45,10 +74,16 @@ class EnhancedSentimentAnalyzer:
                 'sentiment_label': 'neutral',
                 'confidence': 'low',
                 'emotional_indicators': [],
+                'indicator_details': {},
                 'text_stats': {'word_count': 0, 'char_count': 0},
                 'summary': "No text to analyze."
             }
             
+        memo = get_memo()
+        cached = memo.get(MEMO_MODEL_ID, text, exact=True)
+        if cached is not None:
+            return cached
+
         try:
             # Get VADER sentiment scores
             vader_scores = self.vader_analyzer.polarity_scores(text)
@@ -57,7 +92,8 @@ class EnhancedSentimentAnalyzer:
             sentiment_label = self._interpret_compound_score(vader_scores['compound'])
             
             # Analyze emotional indicators
-            emotional_indicators = self._extract_emotional_indicators(text)
+            indicator_details = self._match_emotional_indicators(text)
+            emotional_indicators = sorted(indicator_details)
             
             # Calculate confidence level
             confidence = self._calculate_confidence(vader_scores)
@@ -69,7 +105,7 @@ class EnhancedSentimentAnalyzer:
                 'char_count': len(text)
             }
             
-            return {
+            result = {
                 'vader_scores': {
                     'positive': round(vader_scores['pos'], 3),
                     'negative': round(vader_scores['neg'], 3), 
@@ -79,9 +115,12 @@ class EnhancedSentimentAnalyzer:
                 'sentiment_label': sentiment_label,
                 'confidence': confidence,
                 'emotional_indicators': emotional_indicators,
+                'indicator_details': indicator_details,
                 'text_stats': text_stats,
                 'summary': self._generate_sentiment_summary(vader_scores, sentiment_label, emotional_indicators)
             }
+            memo.put(MEMO_MODEL_ID, text, result, exact=True)
+            return result
             
         except Exception as e:
             logger.error(f"Sentiment analysis failed: {e}")
@@ -91,26 +130,92 @@ class EnhancedSentimentAnalyzer:
                 'sentiment_label': 'neutral',
                 'confidence': 'low',
                 'emotional_indicators': [],
+                'indicator_details': {},
                 'text_stats': {'word_count': 0, 'char_count': 0},
                 'summary': "Analysis failed."
             }
 
-    def analyze_batch(self, texts: List[str], max_workers: int = 4) -> List[Dict[str, Any]]:
+    def analyze_batch(self, texts: List[str], max_workers: int = 4, mode: str = 'auto',
+                      chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Perform parallel sentiment analysis on a list of texts.
+        Perform sentiment analysis on a list of texts.
         
         Args:
             texts: A list of text strings to analyze
-            max_workers: Maximum number of worker threads for parallel processing
+            max_workers: Maximum number of worker threads or processes
+            mode: 'serial', 'thread', 'process' (worker processes, each with
+                  its own analyzer) or 'auto' (process for batches of at least
+                  SENTIMENT_PROCESS_MIN_TEXTS texts, serial otherwise)
+            chunk_size: Texts sent to a worker process per task
             
         Returns:
             List of dictionaries containing sentiment analysis results for each text
         """
-        results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Map guarantees the results are returned in the same order as the input
-            results = list(executor.map(self.analyze_sentiment, texts))
-        return results
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown batch mode '{mode}'. Available: {', '.join(BATCH_MODES)}")
+        
+        if mode == 'auto':
+            min_texts = int(os.environ.get('SENTIMENT_PROCESS_MIN_TEXTS', DEFAULT_PROCESS_MIN_TEXTS))
+            mode = 'process' if max_workers > 1 and len(texts) >= min_texts else 'serial'
+        
+        if mode == 'serial':
+            return [self.analyze_sentiment(text) for text in texts]
+        
+        if mode == 'thread':
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Map guarantees the results are returned in the same order as the input
+                return list(executor.map(self.analyze_sentiment, texts))
+        
+        return list(self.iter_batch(texts, max_workers=max_workers, chunk_size=chunk_size))
+    
+    def iter_batch(self, texts: Iterable[str], max_workers: int = 4,
+                   chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream sentiment results for a large backlog, in input order.
+        
+        Texts are read lazily and sent to worker processes in chunks; at most
+        two chunks per worker are in flight, so memory stays bounded however
+        long the input is. Memoized texts are answered without a worker.
+        
+        Args:
+            texts: Any iterable of text strings
+            max_workers: Number of worker processes
+            chunk_size: Texts per worker task (default SENTIMENT_CHUNK_SIZE)
+            
+        Yields:
+            One sentiment result dict per input text
+        """
+        chunk_size = chunk_size or int(os.environ.get('SENTIMENT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+        pool = _get_pool(max_workers)
+        memo = get_memo()
+        
+        pending = []
+        iterator = iter(texts)
+        try:
+            while True:
+                chunk = [text for _, text in zip(range(chunk_size), iterator)]
+                if chunk:
+                    cached = [memo.get(MEMO_MODEL_ID, text, exact=True) if text and str(text).strip() else None
+                              for text in chunk]
+                    misses = [text for text, result in zip(chunk, cached) if result is None]
+                    future = pool.submit(_analyze_chunk, misses) if misses else None
+                    pending.append((chunk, cached, future))
+                
+                # Yield finished chunks while keeping the workers busy
+                while pending and (not chunk or len(pending) > 2 * max_workers):
+                    done_chunk, done_cached, done_future = pending.pop(0)
+                    computed = iter(done_future.result() if done_future else [])
+                    for text, result in zip(done_chunk, done_cached):
+                        if result is None:
+                            result = next(computed)
+                            memo.put(MEMO_MODEL_ID, text, result, exact=True)
+                        yield result
+                
+                if not chunk:
+                    return
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            raise RuntimeError("Sentiment worker process crashed")
     
     def _interpret_compound_score(self, compound_score: float) -> str:
         """Interpret VADER compound score into sentiment categories."""
@@ -127,17 +232,22 @@ class EnhancedSentimentAnalyzer:
     
     def _extract_emotional_indicators(self, text: str) -> List[str]:
         """Extract specific emotional indicators from text using pattern matching."""
-        indicators = set()
-        
-        text_lower = text.lower()
-        
-        for emotion, compiled_patterns in self.compiled_patterns.items():
-            for pattern in compiled_patterns:
-                if pattern.search(text_lower):
-                    indicators.add(emotion)
-                    break
+        return sorted(self._match_emotional_indicators(text))
+    
+    def _match_emotional_indicators(self, text: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Find emotional indicator cues in a single pass over the text.
         
-        return sorted(list(indicators))
+        Returns:
+            {category: {'count': hits, 'spans': [[start, end], ...]}} for each
+            category that matched; spans are character offsets into text
+        """
+        details: Dict[str, Dict[str, Any]] = {}
+        for match in self.indicator_pattern.finditer(text):
+            entry = details.setdefault(match.lastgroup, {'count': 0, 'spans': []})
+            entry['count'] += 1
+            entry['spans'].append([match.start(), match.end()])
+        return details
     
     def _calculate_confidence(self, vader_scores: Dict[str, float]) -> str:
         """Calculate confidence level based on score distribution."""
@@ -175,3 +285,117 @@ class EnhancedSentimentAnalyzer:
             summary += f". Emotional indicators: {indicator_text}"
         
         return summary
+
+
+def _init_batch_worker() -> None:
+    """Build the worker's VADER lexicon and compiled patterns once."""
+    global _worker_analyzer
+    _worker_analyzer = EnhancedSentimentAnalyzer()
+
+
+def _analyze_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    return [_worker_analyzer.analyze_sentiment(text) for text in texts]
+
+
+def _get_pool(max_workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Return the shared analyzer pool with max_workers workers."""
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            # spawn, not fork: the parent is a threaded gunicorn worker
+            pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_batch_worker
+            )
+            _pools[max_workers] = pool
+            logger.info(f"Started sentiment pool with {max_workers} workers")
+        
+        return pool
+
+
+def _reset_pool(pool: concurrent.futures.ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next batch starts a fresh one."""
+    with _pool_lock:
+        for workers, candidate in list(_pools.items()):
+            if candidate is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def build_sentiment_timeline(turns: List[Dict], window: Optional[int] = None,
+                             analyzer: Optional[EnhancedSentimentAnalyzer] = None) -> Dict[str, Any]:
+    """
+    Score every diarized turn and summarize sentiment over time and per speaker.
+    
+    Turns are scored through analyze_batch; smoothing and per-speaker
+    aggregates are then computed in one vectorized pass over the compound
+    score array. The result is columnar (one list per field) so the payload
+    stays small on long calls.
+    
+    Args:
+        turns: Diarized turns with 'speaker', 'text', 'start' and 'end'
+        window: Turns in the trailing rolling mean (default SENTIMENT_TIMELINE_WINDOW)
+        analyzer: Analyzer to reuse (a new one is created otherwise)
+        
+    Returns:
+        Dictionary with 'turn', 'start', 'end', 'speaker' (index into
+        'speakers'), 'compound' and 'rolling_compound' columns for non-empty
+        turns, plus a 'by_speaker' summary
+    """
+    import numpy as np
+    
+    window = max(1, window or int(os.environ.get('SENTIMENT_TIMELINE_WINDOW', 5)))
+    indices = [i for i, turn in enumerate(turns) if str(turn.get('text', '')).strip()]
+    if not indices:
+        return {'window': window, 'speakers': [], 'turn': [], 'start': [], 'end': [],
+                'speaker': [], 'compound': [], 'rolling_compound': [], 'by_speaker': {}}
+    
+    analyzer = analyzer or EnhancedSentimentAnalyzer()
+    results = analyzer.analyze_batch([turns[i]['text'] for i in indices])
+    
+    compound = np.array([r['vader_scores']['compound'] for r in results], dtype=np.float64)
+    start = np.array([float(turns[i].get('start', 0.0)) for i in indices])
+    end = np.array([float(turns[i].get('end', 0.0)) for i in indices])
+    speakers, speaker_idx = np.unique(
+        [str(turns[i].get('speaker', 'Unknown')) for i in indices], return_inverse=True
+    )
+    
+    # Trailing rolling mean from a cumulative sum
+    csum = np.concatenate(([0.0], np.cumsum(compound)))
+    positions = np.arange(1, len(compound) + 1)
+    lower = np.maximum(positions - window, 0)
+    rolling = (csum[positions] - csum[lower]) / (positions - lower)
+    
+    # Per-speaker aggregates
+    n_speakers = len(speakers)
+    durations = np.clip(end - start, 0.0, None)
+    counts = np.bincount(speaker_idx, minlength=n_speakers)
+    sums = np.bincount(speaker_idx, weights=compound, minlength=n_speakers)
+    talk_time = np.bincount(speaker_idx, weights=durations, minlength=n_speakers)
+    weighted = np.bincount(speaker_idx, weights=compound * durations, minlength=n_speakers)
+    positive = np.bincount(speaker_idx, weights=compound >= 0.1, minlength=n_speakers)
+    negative = np.bincount(speaker_idx, weights=compound <= -0.1, minlength=n_speakers)
+    
+    by_speaker = {
+        str(name): {
+            'turns': int(counts[k]),
+            'mean_compound': round(float(sums[k] / counts[k]), 3),
+            'time_weighted_compound': round(float(weighted[k] / talk_time[k]), 3) if talk_time[k] > 0 else None,
+            'positive_share': round(float(positive[k] / counts[k]), 3),
+            'negative_share': round(float(negative[k] / counts[k]), 3),
+        }
+        for k, name in enumerate(speakers)
+    }
+    
+    return {
+        'window': window,
+        'speakers': [str(name) for name in speakers],
+        'turn': indices,
+        'start': np.round(start, 2).tolist(),
+        'end': np.round(end, 2).tolist(),
+        'speaker': speaker_idx.tolist(),
+        'compound': np.round(compound, 3).tolist(),
+        'rolling_compound': np.round(rolling, 3).tolist(),
+        'by_speaker': by_speaker,
+    }
@@ -1,20 +1,70 @@
 """
 Topic & Keyword Extraction Module
 Uses KeyBERT for BERT-based keyword/keyphrase extraction from transcripts.
-Falls back to simple TF-IDF extraction if KeyBERT model fails to load.
+KeyBERT shares the sentence-embedding model from embedding_service and can
+consume embeddings precomputed for the call.
+A model-free TF-IDF path, weighted by corpus document frequencies from
+keyword_index, is used under load or if the KeyBERT model fails to load.
 """
 
 import logging
+import math
+import os
 import re
-from typing import Dict, List, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
 from collections import Counter
 
+from embedding_service import (
+    CallEmbeddings,
+    compute_call_embeddings,
+    get_model as get_embedding_model,
+)
+from keyword_index import get_index, is_index_enabled
+
 logger = logging.getLogger(__name__)
 
 # Lazy-loaded global model instance
 _kw_model = None
 _model_load_attempted = False
 
+KEYWORD_METHODS = ("auto", "keybert", "tfidf")
+
+# In "auto" mode, calls beyond this many concurrent KeyBERT runs use TF-IDF
+DEFAULT_KEYBERT_MAX_INFLIGHT = 2
+_keybert_inflight = 0
+_inflight_lock = threading.Lock()
+
+# Words, plus punctuation so bigrams do not span sentence or clause breaks
+_WORD_RE = re.compile(r"[a-z]+|[.,;:!?]")
+
+# Common English and conversational stop words
+_STOP_WORDS = frozenset({
+    "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you",
+    "your", "yours", "yourself", "yourselves", "he", "him", "his",
+    "himself", "she", "her", "hers", "herself", "it", "its", "itself",
+    "they", "them", "their", "theirs", "themselves", "what", "which",
+    "who", "whom", "this", "that", "these", "those", "am", "is", "are",
+    "was", "were", "be", "been", "being", "have", "has", "had", "having",
+    "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if",
+    "or", "because", "as", "until", "while", "of", "at", "by", "for",
+    "with", "about", "against", "between", "through", "during", "before",
+    "after", "above", "below", "to", "from", "up", "down", "in", "out",
+    "on", "off", "over", "under", "again", "further", "then", "once",
+    "here", "there", "when", "where", "why", "how", "all", "both",
+    "each", "few", "more", "most", "other", "some", "such", "no", "nor",
+    "not", "only", "own", "same", "so", "than", "too", "very", "s", "t",
+    "can", "will", "just", "don", "should", "now", "d", "ll", "m", "o",
+    "re", "ve", "y", "ain", "aren", "couldn", "didn", "doesn", "hadn",
+    "hasn", "haven", "isn", "ma", "mightn", "mustn", "needn", "shan",
+    "shouldn", "wasn", "weren", "won", "wouldn", "also", "would",
+    "could", "might", "shall", "may", "like", "know", "think", "yeah",
+    "okay", "ok", "right", "well", "got", "get", "going", "go", "really",
+    "um", "uh", "oh", "ah", "hmm", "thing", "things", "one", "much",
+    "many", "still", "even", "way", "want", "let", "say", "said",
+    "make", "made", "take", "come", "see", "need", "back", "something",
+})
+
 
 def _get_model():
     """Lazy-load the KeyBERT model on first use."""
@@ -26,8 +76,8 @@ def _get_model():
     _model_load_attempted = True
     try:
         from keybert import KeyBERT
-        logger.info("Loading KeyBERT model (all-MiniLM-L6-v2)...")
-        _kw_model = KeyBERT(model="all-MiniLM-L6-v2")
+        logger.info("Loading KeyBERT on the shared embedding model...")
+        _kw_model = KeyBERT(model=get_embedding_model())
         logger.info("KeyBERT model loaded successfully.")
     except Exception as e:
         logger.error(f"Failed to load KeyBERT model: {e}")
@@ -36,53 +86,140 @@ def _get_model():
     return _kw_model
 
 
-def _fallback_tfidf_keywords(text: str, top_n: int = 10) -> List[Tuple[str, float]]:
+def _term_counts(text: str) -> Counter:
     """
-    Simple TF-based keyword extraction fallback.
-    Extracts the most frequent meaningful words from the text.
+    Count unigrams and bigrams in one tokenization pass.
+
+    Unigrams are 3+ letter non-stop words; bigrams join two adjacent
+    unigrams, so they never span a stop word or punctuation.
     """
-    # Common English stop words
-    stop_words = {
-        "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you",
-        "your", "yours", "yourself", "yourselves", "he", "him", "his",
-        "himself", "she", "her", "hers", "herself", "it", "its", "itself",
-        "they", "them", "their", "theirs", "themselves", "what", "which",
-        "who", "whom", "this", "that", "these", "those", "am", "is", "are",
-        "was", "were", "be", "been", "being", "have", "has", "had", "having",
-        "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if",
-        "or", "because", "as", "until", "while", "of", "at", "by", "for",
-        "with", "about", "against", "between", "through", "during", "before",
-        "after", "above", "below", "to", "from", "up", "down", "in", "out",
-        "on", "off", "over", "under", "again", "further", "then", "once",
-        "here", "there", "when", "where", "why", "how", "all", "both",
-        "each", "few", "more", "most", "other", "some", "such", "no", "nor",
-        "not", "only", "own", "same", "so", "than", "too", "very", "s", "t",
-        "can", "will", "just", "don", "should", "now", "d", "ll", "m", "o",
-        "re", "ve", "y", "ain", "aren", "couldn", "didn", "doesn", "hadn",
-        "hasn", "haven", "isn", "ma", "mightn", "mustn", "needn", "shan",
-        "shouldn", "wasn", "weren", "won", "wouldn", "also", "would",
-        "could", "might", "shall", "may", "like", "know", "think", "yeah",
-        "okay", "ok", "right", "well", "got", "get", "going", "go", "really",
-        "um", "uh", "oh", "ah", "hmm", "thing", "things", "one", "much",
-        "many", "still", "even", "way", "want", "let", "say", "said",
-        "make", "made", "take", "come", "see", "need", "back", "something",
-    }
+    counts: Counter = Counter()
+    previous = None
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) < 3 or word in _STOP_WORDS:
+            previous = None
+            continue
+        counts[word] += 1
+        if previous is not None:
+            counts[f"{previous} {word}"] += 1
+        previous = word
+    return counts
+
 
-    # Tokenize and clean
-    words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-    filtered = [w for w in words if w not in stop_words]
+def _fallback_tfidf_keywords(
+    text: str,
+    top_n: int = 10,
+    counts: Optional[Counter] = None,
+) -> List[Tuple[str, float]]:
+    """
+    TF-IDF keyword extraction over unigrams and bigrams.
 
-    if not filtered:
+    Document frequencies come from the corpus index built from earlier
+    transcripts (keyword_index); with an empty or disabled index this
+    degrades to term frequency. Scores are normalized to the top term.
+    """
+    if counts is None:
+        counts = _term_counts(text)
+    if not counts:
         return []
 
-    # Count frequencies and normalize
-    counts = Counter(filtered)
-    max_count = max(counts.values())
+    n_docs, frequencies = 0, {}
+    if is_index_enabled():
+        try:
+            n_docs, frequencies = get_index().document_frequencies(counts.keys())
+        except Exception as e:
+            logger.warning(f"Keyword index lookup failed, using term frequency: {e}")
+
+    # Sublinear TF with smoothed IDF, as in sklearn's TfidfVectorizer
+    scores = {
+        term: (1.0 + math.log(count)) * (math.log((1 + n_docs) / (1 + frequencies.get(term, 0))) + 1.0)
+        for term, count in counts.items()
+    }
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_n]
+    max_score = top[0][1]
+    return [(term, round(score / max_score, 4)) for term, score in top]
+
+
+def _update_index(text: str, counts: Counter) -> None:
+    """Add this transcript to the corpus document frequencies."""
+    if not is_index_enabled() or not counts:
+        return
+    try:
+        get_index().add_document(counts.keys(), text)
+    except Exception as e:
+        logger.warning(f"Keyword index update failed: {e}")
+
+
+def _resolve_method(method: Optional[str]) -> str:
+    """
+    Pick the extraction method; "auto" uses TF-IDF while KeyBERT is busy.
+
+    When the result is "keybert", an in-flight slot has been reserved in the
+    same locked step as the check; the caller must _release_keybert_slot().
+    """
+    global _keybert_inflight
+
+    method = method or os.environ.get("KEYWORD_METHOD", "auto")
+    if method not in KEYWORD_METHODS:
+        raise ValueError(f"Unknown keyword method '{method}'. Available: {', '.join(KEYWORD_METHODS)}")
+    if method == "tfidf":
+        return method
+
+    max_inflight = int(os.environ.get("KEYWORD_KEYBERT_MAX_INFLIGHT", DEFAULT_KEYBERT_MAX_INFLIGHT))
+    with _inflight_lock:
+        if method == "auto" and _keybert_inflight >= max_inflight:
+            return "tfidf"
+        _keybert_inflight += 1
+        return "keybert"
+
+
+def _release_keybert_slot() -> None:
+    global _keybert_inflight
+    with _inflight_lock:
+        _keybert_inflight -= 1
+
+
+def _keybert_keywords(
+    model,
+    text: str,
+    top_n: int,
+    keyphrase_length: Tuple[int, int],
+    diversity: float,
+    embeddings: Optional[CallEmbeddings],
+    fast: bool,
+    turns: Optional[List[Dict]],
+) -> Tuple[List[Dict], Optional[Dict]]:
+    """Run KeyBERT, embedding the call first on the fast path; returns (keywords, stats)."""
+    if embeddings is None and fast:
+        embeddings = compute_call_embeddings(text, turns, keyphrase_length=keyphrase_length)
+
+    precomputed = {}
+    stats = None
+    if embeddings is not None and tuple(embeddings.keyphrase_length) == tuple(keyphrase_length):
+        if not embeddings.candidates:
+            raise ValueError("No keyword candidates in transcript")
+        precomputed = {
+            "candidates": embeddings.candidates,
+            "doc_embeddings": embeddings.doc_embedding,
+            "word_embeddings": embeddings.candidate_embeddings,
+        }
+        stats = embeddings.stats
+
+    # Use MMR (Maximal Marginal Relevance) for diverse keywords
+    raw_keywords = model.extract_keywords(
+        text,
+        keyphrase_ngram_range=keyphrase_length,
+        stop_words="english",
+        use_mmr=True,
+        diversity=diversity,
+        top_n=top_n,
+        **precomputed,
+    )
     keywords = [
-        (word, round(count / max_count, 4))
-        for word, count in counts.most_common(top_n)
+        {"keyword": kw, "score": round(score, 4)}
+        for kw, score in raw_keywords
     ]
-    return keywords
+    return keywords, stats
 
 
 def extract_keywords(
@@ -90,6 +227,11 @@ def extract_keywords(
     top_n: int = 10,
     keyphrase_length: Tuple[int, int] = (1, 2),
     diversity: float = 0.5,
+    embeddings: Optional[CallEmbeddings] = None,
+    fast: bool = True,
+    method: Optional[str] = None,
+    turns: Optional[List[Dict]] = None,
+    update_index: bool = True,
 ) -> Dict:
     """
     Extract keywords and keyphrases from transcript text.
@@ -99,12 +241,27 @@ def extract_keywords(
         top_n: Number of top keywords to return.
         keyphrase_length: Tuple of (min_ngram, max_ngram) for keyphrases.
         diversity: Diversity of results (0-1). Higher = more diverse keywords.
+        embeddings: Precomputed embeddings for this text (see
+                    embedding_service.compute_call_embeddings); KeyBERT then
+                    skips its own encoder pass.
+        fast: Without precomputed embeddings, prune candidates and encode
+              the text in pooled chunks (see compute_call_embeddings)
+              instead of letting KeyBERT embed every n-gram. Embeddings
+              are only computed when KeyBERT actually runs.
+        method: "keybert", "tfidf" (corpus TF-IDF, no model) or "auto"
+                (KeyBERT unless KEYWORD_KEYBERT_MAX_INFLIGHT calls are
+                already running it). Defaults to the KEYWORD_METHOD env var.
+        turns: Diarized turns of the transcript; the fast path uses them as
+               units for candidate document frequency.
+        update_index: Add the text to the corpus document-frequency index.
+                      Pass False for synthetic or repeated text.
 
     Returns:
         Dictionary with:
         - keywords: List of {keyword, score} dicts
         - top_keywords: List of top keyword strings (for quick display)
         - method: Which extraction method was used
+        - stats: Candidate counts and encode time (fast path only)
     """
     if not text or not text.strip():
         return {
@@ -113,45 +270,51 @@ def extract_keywords(
             "method": "none",
         }
 
-    result_keywords = []
-    method = "keybert"
+    # One tokenization pass feeds both the TF-IDF scores and the corpus index
+    counts = _term_counts(text)
+    resolved = _resolve_method(method)
 
-    model = _get_model()
+    result_keywords = []
+    used_method = resolved
+    stats = None
 
-    if model is not None:
+    model = None
+    if resolved == "keybert":
         try:
-            # Use MMR (Maximal Marginal Relevance) for diverse keywords
-            raw_keywords = model.extract_keywords(
-                text,
-                keyphrase_ngram_range=keyphrase_length,
-                stop_words="english",
-                use_mmr=True,
-                diversity=diversity,
-                top_n=top_n,
-            )
-            result_keywords = [
-                {"keyword": kw, "score": round(score, 4)}
-                for kw, score in raw_keywords
-            ]
+            model = _get_model()
+            if model is not None:
+                result_keywords, stats = _keybert_keywords(
+                    model, text, top_n, keyphrase_length, diversity, embeddings, fast, turns
+                )
         except Exception as e:
             logger.error(f"KeyBERT extraction failed: {e}")
             model = None  # Fall through to fallback
+        finally:
+            _release_keybert_slot()
 
-    # Fallback to TF-IDF-like extraction
+    # TF-IDF when requested, or as a fallback when KeyBERT is unavailable
     if model is None or not result_keywords:
-        method = "tfidf_fallback"
-        logger.info("Using TF-IDF fallback for keyword extraction.")
-        fallback = _fallback_tfidf_keywords(text, top_n)
+        if resolved == "keybert":
+            used_method = "tfidf_fallback"
+            logger.info("Using TF-IDF fallback for keyword extraction.")
+        fallback = _fallback_tfidf_keywords(text, top_n, counts=counts)
         result_keywords = [
             {"keyword": kw, "score": score}
             for kw, score in fallback
         ]
 
+    if update_index:
+        _update_index(text, counts)
+
     # Sort by score descending
     result_keywords.sort(key=lambda x: x["score"], reverse=True)
 
-    return {
+    result = {
         "keywords": result_keywords,
         "top_keywords": [kw["keyword"] for kw in result_keywords],
-        "method": method,
+        "method": used_method,
     }
+    if stats and used_method == "keybert":
+        result["stats"] = stats
+    return result
+
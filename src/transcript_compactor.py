@@ -0,0 +1,250 @@
+"""
+Transcript Compaction Module
+=============================
+Shrinks Whisper transcripts before they are sent to an LLM.
+
+Counselling calls are full of disfluencies ("um", "uh", "you know"),
+stuttered words ("I I I think") and, on long silences, Whisper's
+hallucinated repeat loops ("Thank you. Thank you. Thank you."). None of
+it helps a summary, but all of it costs prompt tokens. Compaction
+removes fillers, collapses immediately repeated words and n-grams, drops
+consecutive duplicate turns, and can replace speaker names with short
+labels plus a one-line legend.
+
+Everything is plain token scanning, linear in transcript length for a
+fixed maximum n-gram size.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for English text, shared with gemini_module
+CHARS_PER_TOKEN = 4
+
+# Longest repeated phrase (in words) that is collapsed; Whisper loops are
+# usually one short sentence
+DEFAULT_MAX_NGRAM = 12
+
+SPEAKER_LABEL_MODES = ("full", "short", "none")
+
+# Stand-alone fillers, with the comma that usually follows them in Whisper output
+# Hyphens count as part of the word so backchannels such as "uh-huh" stay
+# whole; a filler asking a question ("Hmm?") is a turn of its own and is kept
+_FILLER_RE = re.compile(
+    r"(?<![-\w])(?:u+m+|u+h+m*|e+r+m+|h+m+|m+h+m+|m+-h+m+|a+h+)(?![-\w]|\s*\?),?\s*",
+    re.IGNORECASE
+)
+
+# Discourse fillers only when set off by commas ("it was, you know, hard")
+_PHRASE_FILLER_RE = re.compile(r",\s*(?:you know|i mean)\s*(?=[,.?!])", re.IGNORECASE)
+
+_PUNCT_STRIP = ".,!?;:\"'"
+
+# A word ending in a dash is cut off and repeated ("I- I think")
+_STUTTER_MARKS = "-\u2014"
+
+# A single word is only collapsed when it appears this many times in a row
+# (or is a marked stutter); "had had" and "that that" are real English
+DEFAULT_MIN_WORD_REPEATS = 3
+
+_WORD_CHAR_RE = re.compile(r"\w")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about 4 characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def remove_fillers(text: str) -> Tuple[str, int]:
+    """
+    Remove filler words and comma-delimited filler phrases.
+
+    Returns:
+        (cleaned text, number of fillers removed)
+    """
+    text, phrases = _PHRASE_FILLER_RE.subn("", text)
+    text, words = _FILLER_RE.subn("", text)
+    # Tidy up what removal leaves behind: ", ," / " ," / leading commas
+    text = re.sub(r"\s+,", ",", text)
+    text = re.sub(r",(?:\s*,)+", ",", text)
+    text = re.sub(r",\s*([.?!])", r"\1", text)
+    text = re.sub(r"(^|[.?!]\s+),\s*", r"\1", text)
+    # Sentence punctuation of fillers that stood alone ("Hmm. I see. Mm-hmm.")
+    text = re.sub(r"^[\s,.?!]+", "", text)
+    text = re.sub(r"([.?!])(?:\s+[,.?!]+)+", r"\1", text)
+    text = re.sub(r"\s{2,}", " ", text).strip()
+    return text, phrases + words
+
+
+def _merge_copies(first: str, last: str) -> str:
+    """First copy's word and casing, last copy's trailing punctuation."""
+    core = first.rstrip(_PUNCT_STRIP + _STUTTER_MARKS) or first
+    return core + last[len(last.rstrip(_PUNCT_STRIP)):]
+
+
+def collapse_repeats(
+    text: str,
+    max_ngram: int = DEFAULT_MAX_NGRAM,
+    min_word_repeats: int = DEFAULT_MIN_WORD_REPEATS
+) -> Tuple[str, int]:
+    """
+    Collapse immediately repeated words and phrases to a single occurrence.
+
+    "I I I think" becomes "I think", "I- I think" becomes "I think" and
+    "Thank you. Thank you. Thank you." becomes "Thank you." A single word
+    repeated fewer than min_word_repeats times without a stutter mark is
+    kept ("I had had enough"). Words are compared case-insensitively,
+    ignoring surrounding punctuation; the first copy's wording is kept.
+
+    Returns:
+        (collapsed text, number of words removed)
+    """
+    words = text.split()
+    keys = [word.strip(_PUNCT_STRIP + _STUTTER_MARKS).lower() for word in words]
+    kept_words: List[str] = []
+    kept_keys: List[str] = []
+    removed = 0
+
+    i = 0
+    while i < len(words):
+        kept_words.append(words[i])
+        kept_keys.append(keys[i])
+        i += 1
+
+        # Does the tail of the output repeat right away in the input?
+        repeated = True
+        while repeated and i < len(words):
+            repeated = False
+            for n in range(1, min(max_ngram, len(kept_keys)) + 1):
+                if kept_keys[-n] != keys[i] or not kept_keys[-n]:
+                    continue
+                if n == 1:
+                    run = 1
+                    while i + run < len(keys) and keys[i + run] == keys[i]:
+                        run += 1
+                    if run + 1 < min_word_repeats and not kept_words[-1].endswith(tuple(_STUTTER_MARKS)):
+                        continue
+                    # "No, no, no." -> "No."
+                    kept_words[-1] = _merge_copies(kept_words[-1], words[i + run - 1])
+                    i += run
+                    removed += run
+                    repeated = True
+                    break
+                if i + n <= len(keys) and keys[i:i + n] == kept_keys[-n:]:
+                    i += n
+                    removed += n
+                    repeated = True
+                    break
+
+    return " ".join(kept_words), removed
+
+
+def _short_labels(speakers: List[str]) -> Dict[str, str]:
+    """Map speaker names to unique short labels (initials, numbered on clashes)."""
+    labels: Dict[str, str] = {}
+    used = set()
+    for speaker in speakers:
+        if speaker in labels:
+            continue
+        base = "".join(part[0] for part in speaker.split() if part).upper() or "S"
+        label, suffix = base, 2
+        while label in used:
+            label, suffix = f"{base}{suffix}", suffix + 1
+        labels[speaker] = label
+        used.add(label)
+    return labels
+
+
+def compact_transcript(
+    transcript: Optional[str] = None,
+    turns: Optional[List[Dict]] = None,
+    speaker_labels: str = "none",
+    max_ngram: int = DEFAULT_MAX_NGRAM
+) -> Dict[str, Any]:
+    """
+    Compact a transcript for LLM prompts.
+
+    Args:
+        transcript: Plain transcript text, used when no turns are given.
+        turns: Diarized turns ('speaker', 'text', ...); compacted per turn.
+        speaker_labels: With turns, "full" prefixes each line with the
+                        speaker name, "short" with a short label (plus a
+                        legend line), "none" joins the text without labels.
+        max_ngram: Longest repeated phrase, in words, that is collapsed.
+
+    Returns:
+        Dictionary with:
+        - text: Compacted transcript
+        - turns: Compacted copies of the turns (empty turns and consecutive
+          duplicates dropped), or [] for plain text input
+        - stats: input/output token estimates, reduction ratio, fillers and
+          repeated words removed, turns dropped
+    """
+    if speaker_labels not in SPEAKER_LABEL_MODES:
+        raise ValueError(f"Unknown speaker label mode '{speaker_labels}'. "
+                         f"Available: {', '.join(SPEAKER_LABEL_MODES)}")
+
+    fillers = repeats = dropped = 0
+
+    def compact(text: str) -> str:
+        nonlocal fillers, repeats
+        text, n_fillers = remove_fillers(text)
+        text, n_repeats = collapse_repeats(text, max_ngram)
+        fillers += n_fillers
+        repeats += n_repeats
+        return text
+
+    compacted_turns: List[Dict] = []
+    if turns:
+        # Baseline is the same layout without compaction
+        if speaker_labels == "none":
+            input_text = " ".join(turn.get("text", "") for turn in turns)
+        else:
+            input_text = "\n".join(f"{turn.get('speaker', '')}: {turn.get('text', '')}" for turn in turns)
+        for turn in turns:
+            text = compact(turn.get("text", ""))
+            previous = compacted_turns[-1] if compacted_turns else None
+            if not _WORD_CHAR_RE.search(text) or (
+                previous is not None
+                and previous["speaker"] == turn.get("speaker")
+                and previous["text"].lower() == text.lower()
+            ):
+                # Nothing but fillers/punctuation, or a Whisper loop spanning whole turns
+                dropped += 1
+                continue
+            compacted_turns.append({**turn, "text": text})
+
+        if speaker_labels == "none":
+            output_text = " ".join(turn["text"] for turn in compacted_turns)
+        else:
+            labels = (
+                _short_labels([turn["speaker"] for turn in compacted_turns])
+                if speaker_labels == "short" else {}
+            )
+            lines = [f"{labels.get(turn['speaker'], turn['speaker'])}: {turn['text']}" for turn in compacted_turns]
+            if labels:
+                legend = ", ".join(f"{label} = {speaker}" for speaker, label in labels.items())
+                lines.insert(0, f"Speakers: {legend}")
+            output_text = "\n".join(lines)
+    else:
+        input_text = transcript or ""
+        output_text = compact(input_text)
+
+    input_tokens = estimate_tokens(input_text)
+    output_tokens = estimate_tokens(output_text)
+    stats = {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "reduction_ratio": round(1 - output_tokens / input_tokens, 4) if input_tokens else 0.0,
+        "fillers_removed": fillers,
+        "repeated_words_removed": repeats,
+        "turns_dropped": dropped,
+    }
+    logger.info(
+        f"Compacted transcript from ~{input_tokens} to ~{output_tokens} tokens "
+        f"({fillers} fillers, {repeats} repeated words, {dropped} turns removed)"
+    )
+    return {"text": output_text, "turns": compacted_turns, "stats": stats}
@@ -0,0 +1,198 @@
+"""
+Transcription Backends Module
+==============================
+Engines that can run a Whisper model behind whisper_module.
+
+- openai-whisper: the reference PyTorch implementation (fp32 on CPU, or
+  int8 with QUANTIZE_MODELS=1).
+- faster-whisper: CTranslate2 engine, int8-quantized by default, which is
+  considerably faster and lighter on CPU-only machines.
+
+The backend is chosen per call or with the WHISPER_BACKEND env var. Every
+backend returns the same {"text", "segments", "language"} shape.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from quantization import is_quantization_enabled, load_quantized
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "openai-whisper"
+
+# Language detection looks at this much audio, like Whisper's own first window
+LANGUAGE_DETECTION_SAMPLES = 30 * 16000
+
+
+class TranscriptionBackend:
+    """Interface for a Whisper inference engine."""
+
+    name = "base"
+
+    def cache_id(self) -> Dict[str, Any]:
+        """Settings that change the output, used in transcription cache keys."""
+        return {"backend": self.name}
+
+    def load_model(self, model_size: str) -> Any:
+        raise NotImplementedError
+
+    def detect_language(self, model: Any, audio) -> str:
+        """Detect the spoken language from the first 30 seconds of samples."""
+        raise NotImplementedError
+
+    def transcribe(self, model: Any, audio, **options) -> Dict[str, Any]:
+        """
+        Transcribe 16 kHz mono float32 samples.
+
+        Returns:
+            Dictionary with 'text', 'segments' (unrounded start/end/text)
+            and 'language'.
+        """
+        raise NotImplementedError
+
+
+def _empty_whisper(model_size: str) -> Any:
+    """
+    Build a Whisper architecture without reading its fp32 weights.
+
+    The checkpoint is memory-mapped only to read the model dimensions.
+    """
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    download_root = os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "whisper"
+    )
+    checkpoint_file = whisper._download(whisper._MODELS[model_size], download_root, False)
+    checkpoint = torch.load(checkpoint_file, map_location="cpu", mmap=True, weights_only=True)
+    model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_size])
+    return model
+
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    """Reference openai-whisper PyTorch implementation, optionally int8-quantized."""
+
+    name = "openai-whisper"
+
+    def __init__(self, quantize: Optional[bool] = None):
+        self.quantize = is_quantization_enabled() if quantize is None else quantize
+
+    def cache_id(self) -> Dict[str, Any]:
+        return {"backend": self.name, "quantized": self.quantize}
+
+    def load_model(self, model_size: str) -> Any:
+        try:
+            import whisper
+        except ImportError:
+            raise RuntimeError(
+                "openai-whisper is not installed. "
+                "Install it with: pip install openai-whisper"
+            )
+        if self.quantize:
+            return load_quantized(
+                f"whisper-{model_size}-{whisper.__version__}",
+                lambda: whisper.load_model(model_size, device="cpu"),
+                build_empty=lambda: _empty_whisper(model_size)
+            )
+        return whisper.load_model(model_size)
+
+    def detect_language(self, model: Any, audio) -> str:
+        import whisper
+
+        if not model.is_multilingual:
+            return "en"
+        window = whisper.pad_or_trim(audio[:LANGUAGE_DETECTION_SAMPLES])
+        mel = whisper.log_mel_spectrogram(window, n_mels=model.dims.n_mels).to(model.device)
+        _, probs = model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+    def transcribe(self, model: Any, audio, **options) -> Dict[str, Any]:
+        result = model.transcribe(audio, **options)
+        segments: List[Dict] = [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"].strip()}
+            for seg in result.get("segments", [])
+        ]
+        return {
+            "text": result.get("text", "").strip(),
+            "segments": segments,
+            "language": result.get("language", "unknown")
+        }
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 (faster-whisper) engine, int8 on CPU by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self):
+        self.compute_type = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+        self.cpu_threads = int(os.environ.get("WHISPER_CPU_THREADS", "0"))
+
+    def cache_id(self) -> Dict[str, Any]:
+        return {"backend": self.name, "compute_type": self.compute_type}
+
+    def load_model(self, model_size: str) -> Any:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError(
+                "faster-whisper is not installed. "
+                "Install it with: pip install faster-whisper"
+            )
+        return WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads
+        )
+
+    def detect_language(self, model: Any, audio) -> str:
+        # Language detection runs eagerly inside transcribe(); the segment
+        # generator is never iterated, so no decoding happens here
+        _segments, info = model.transcribe(audio[:LANGUAGE_DETECTION_SAMPLES])
+        return info.language or "unknown"
+
+    def transcribe(self, model: Any, audio, **options) -> Dict[str, Any]:
+        # faster-whisper yields segments lazily; decoding happens while iterating
+        raw_segments, info = model.transcribe(audio, **options)
+        segments: List[Dict] = [
+            {"start": seg.start, "end": seg.end, "text": seg.text.strip()}
+            for seg in raw_segments
+        ]
+        return {
+            "text": " ".join(seg["text"] for seg in segments if seg["text"]),
+            "segments": segments,
+            "language": info.language or "unknown"
+        }
+
+
+_BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_available_backends() -> List[str]:
+    """Return the names of all supported transcription backends."""
+    return list(_BACKENDS.keys())
+
+
+def get_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """
+    Return a backend instance by name.
+
+    Args:
+        name: Backend name. Defaults to the WHISPER_BACKEND env var,
+              then to openai-whisper.
+
+    Raises:
+        ValueError: If the name is not a known backend.
+    """
+    name = name or os.environ.get("WHISPER_BACKEND", DEFAULT_BACKEND)
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}'. Available: {get_available_backends()}")
+    return _BACKENDS[name]()
@@ -0,0 +1,203 @@
+"""
+Voice Activity Detection Module
+================================
+Lightweight energy-based silence trimming in front of Whisper.
+
+Frames that are both close to the recording's noise floor and quiet in
+absolute terms, for long enough, are treated as dead air and cut out.
+The noise floor estimate is capped at an absolute level, so a call with
+hardly any pauses (where the quietest frames are speech) or a quiet
+second speaker is left alone rather than trimmed. The remaining speech regions
+are joined with a short gap so Whisper still sees a pause, and a TimeMap
+translates timestamps on the trimmed audio back to the original
+recording, so segment start/end (and the pauses diarization relies on)
+refer to the real call timeline.
+
+This is an energy detector: it removes silence and dead air, but steady
+hold music is loud enough to be kept.
+"""
+
+import bisect
+import logging
+from typing import Any, Dict, List, Tuple
+
+from audio_buffer import SAMPLE_RATE, AudioBuffer
+
+logger = logging.getLogger(__name__)
+
+_FRAME_SECONDS = 0.03
+
+# A frame counts as speech when it is this many dB above the noise floor
+DEFAULT_MARGIN_DB = 10.0
+
+# The noise floor estimate never rises above this level (dBFS), whatever
+# the quietest 10% of frames look like
+DEFAULT_MAX_NOISE_FLOOR_DBFS = -60.0
+
+# Frames louder than this (dBFS) are never silence, even near the floor
+DEFAULT_SILENCE_CEILING_DBFS = -50.0
+
+# Only silences at least this long are removed
+DEFAULT_MIN_SILENCE_SECONDS = 1.0
+
+# Audio kept on each side of a speech region so word edges aren't clipped
+DEFAULT_PADDING_SECONDS = 0.25
+
+# Silence inserted between joined regions so Whisper still sees a pause
+DEFAULT_GAP_SECONDS = 0.3
+
+# Skip trimming entirely when it would remove less than this share of audio
+_MIN_USEFUL_SKIP_RATIO = 0.05
+
+
+class TimeMap:
+    """Maps times on trimmed audio back to times on the original audio."""
+
+    def __init__(self, pieces: List[Tuple[float, float, float]]):
+        """
+        Args:
+            pieces: (trimmed_start, original_start, duration) per kept region,
+                    in order, all in seconds.
+        """
+        self.pieces = pieces
+        self._starts = [piece[0] for piece in pieces]
+
+    @classmethod
+    def identity(cls, duration: float) -> "TimeMap":
+        return cls([(0.0, 0.0, duration)])
+
+    def to_original(self, t: float) -> float:
+        """Translate a trimmed-audio time to the original timeline."""
+        if not self.pieces:
+            return t
+        index = max(0, bisect.bisect_right(self._starts, t) - 1)
+        trimmed_start, original_start, duration = self.pieces[index]
+        # Times inside an inserted gap snap to the end of the previous region
+        return original_start + min(max(t - trimmed_start, 0.0), duration)
+
+
+def detect_speech_regions(
+    samples,
+    margin_db: float = DEFAULT_MARGIN_DB,
+    max_noise_floor_dbfs: float = DEFAULT_MAX_NOISE_FLOOR_DBFS,
+    silence_ceiling_dbfs: float = DEFAULT_SILENCE_CEILING_DBFS,
+    min_silence_seconds: float = DEFAULT_MIN_SILENCE_SECONDS,
+    padding_seconds: float = DEFAULT_PADDING_SECONDS
+) -> List[Tuple[int, int]]:
+    """
+    Find speech regions in 16 kHz mono audio.
+
+    A frame is silent only when it is within margin_db of the noise floor
+    (the 10th-percentile frame energy, capped at max_noise_floor_dbfs) and
+    below silence_ceiling_dbfs.
+
+    Returns:
+        List of (start_sample, end_sample) pairs, sorted and non-overlapping.
+    """
+    import numpy as np
+
+    total = len(samples)
+    frame_len = int(_FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = total // frame_len
+    if n_frames == 0:
+        return [(0, total)]
+
+    frames = np.asarray(samples[:n_frames * frame_len]).reshape(n_frames, frame_len)
+    energy_db = 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / frame_len + 1e-10)
+
+    noise_floor = min(float(np.percentile(energy_db, 10)), max_noise_floor_dbfs)
+    is_silent = (energy_db <= noise_floor + margin_db) & (energy_db < silence_ceiling_dbfs)
+    if not is_silent.any():
+        # No clearly silent frames: nothing to trim
+        return [(0, total)]
+
+    # Boundaries of silent runs: +1 where silence starts, -1 where it ends
+    edges = np.diff(np.concatenate(([0], is_silent.astype(np.int8), [0])))
+    silence_starts = np.flatnonzero(edges == 1)
+    silence_ends = np.flatnonzero(edges == -1)
+
+    min_silence_frames = int(min_silence_seconds / _FRAME_SECONDS)
+    padding = int(padding_seconds * SAMPLE_RATE)
+
+    regions: List[Tuple[int, int]] = []
+    speech_from = 0
+    for start, end in zip(silence_starts, silence_ends):
+        if end - start < min_silence_frames:
+            continue
+        if start > speech_from:
+            regions.append((
+                int(max(0, speech_from * frame_len - padding)),
+                int(min(total, start * frame_len + padding))
+            ))
+        speech_from = end
+    if speech_from < n_frames:
+        regions.append((int(max(0, speech_from * frame_len - padding)), total))
+
+    if not regions:
+        # Nothing but silence: leave it to Whisper rather than return no audio
+        return [(0, total)]
+
+    # Padding can make neighbouring regions touch; merge them
+    merged: List[Tuple[int, int]] = []
+    for start, end in regions:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def trim_silence(
+    audio: AudioBuffer,
+    gap_seconds: float = DEFAULT_GAP_SECONDS,
+    **detect_options: Any
+) -> Tuple[AudioBuffer, TimeMap, Dict[str, Any]]:
+    """
+    Remove long silences from decoded audio.
+
+    Args:
+        audio: Decoded audio.
+        gap_seconds: Silence inserted between kept regions.
+        **detect_options: Passed to detect_speech_regions().
+
+    Returns:
+        (trimmed audio, time map back to the original, stats). When there
+        is little to trim, the original buffer is returned unchanged; the
+        caller should only close the trimmed buffer if it differs.
+    """
+    regions = detect_speech_regions(audio.samples, **detect_options)
+
+    original_seconds = audio.duration
+    kept_samples = sum(end - start for start, end in regions)
+    skipped_seconds = max(0.0, original_seconds - kept_samples / SAMPLE_RATE)
+    stats = {
+        "original_seconds": round(original_seconds, 2),
+        "kept_seconds": round(kept_samples / SAMPLE_RATE, 2),
+        "skipped_seconds": round(skipped_seconds, 2),
+        "skipped_ratio": round(skipped_seconds / original_seconds, 4) if original_seconds else 0.0,
+        "regions": len(regions),
+    }
+
+    if stats["skipped_ratio"] < _MIN_USEFUL_SKIP_RATIO:
+        stats.update(kept_seconds=stats["original_seconds"], skipped_seconds=0.0, skipped_ratio=0.0)
+        return audio, TimeMap.identity(original_seconds), stats
+
+    gap = int(gap_seconds * SAMPLE_RATE)
+    trimmed = AudioBuffer.allocate(
+        kept_samples + gap * (len(regions) - 1),
+        file_backed=audio.path is not None
+    )
+
+    pieces: List[Tuple[float, float, float]] = []
+    cursor = 0
+    for start, end in regions:
+        length = end - start
+        trimmed.samples[cursor:cursor + length] = audio.samples[start:end]
+        pieces.append((cursor / SAMPLE_RATE, start / SAMPLE_RATE, length / SAMPLE_RATE))
+        cursor += length + gap
+
+    logger.info(
+        f"VAD skipped {stats['skipped_seconds']:.0f}s of {original_seconds:.0f}s "
+        f"({stats['skipped_ratio']:.0%}) across {len(regions)} speech regions"
+    )
+    return trimmed, TimeMap(pieces), stats
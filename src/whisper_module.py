@@ -2,18 +2,32 @@
 Whisper Audio Transcription Module
 ===================================
 Uses OpenAI's Whisper model to transcribe audio files locally.
-Supports multiple model sizes for speed/accuracy tradeoffs.
+Supports multiple model sizes for speed/accuracy tradeoffs, and several
+inference backends (see transcription_backends).
 """
 
+import hashlib
 import logging
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional
+
+from audio_buffer import AudioBuffer
+from chunked_transcription import DEFAULT_CHUNK_SECONDS, transcribe_chunked
+from disk_cache import DiskCache, default_cache_dir
+from model_registry import ModelRegistry
+from transcription_backends import TranscriptionBackend, get_backend
+from vad import trim_silence
 
 logger = logging.getLogger(__name__)
 
-# Global model cache to avoid reloading on every request
-_whisper_model = None
-_current_model_size: Optional[str] = None
+# Memory budget for Whisper models held in the registry at once
+DEFAULT_MODEL_MEMORY_MB = 2048
+
+# Persistent transcription cache, keyed by a hash of the decoded audio
+_transcription_cache: Optional[DiskCache] = None
+_transcription_cache_lock = threading.Lock()
+DEFAULT_TRANSCRIPTION_CACHE_MB = 512
 
 
 def get_available_models() -> Dict[str, str]:
@@ -27,44 +41,272 @@ def get_available_models() -> Dict[str, str]:
     }
 
 
-def _load_model(model_size: str = "base"):
+# Approximate on-disk model sizes, used as resident size estimates for
+# backends whose memory use can't be measured from torch parameters
+_NOMINAL_MODEL_MB = {"tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550}
+
+
+def _load_whisper_model(registry_key: str):
+    """Load a model for a 'backend:size' registry key (registry loader, no caching here)."""
+    backend_name, model_size = registry_key.split(":", 1)
+    try:
+        logger.info(f"Loading Whisper '{model_size}' model with {backend_name} (this may take a moment on first run)...")
+        return get_backend(backend_name).load_model(model_size)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to load Whisper model: {e}")
+        raise RuntimeError(f"Failed to load Whisper model: {str(e)}")
+
+
+# Several model sizes can stay resident within WHISPER_MODEL_MEMORY_MB;
+# the least recently used one is evicted when the budget is exceeded.
+_model_registry = ModelRegistry(
+    "whisper",
+    _load_whisper_model,
+    memory_budget_bytes=int(os.environ.get("WHISPER_MODEL_MEMORY_MB", DEFAULT_MODEL_MEMORY_MB)) * 1024 * 1024,
+    fallback_sizes={
+        f"faster-whisper:{size}": mb * 1024 * 1024 for size, mb in _NOMINAL_MODEL_MB.items()
+    }
+)
+
+
+def _load_model(model_size: str = "base", backend: Optional[TranscriptionBackend] = None):
     """
-    Load and cache the Whisper model.
+    Return a cached Whisper model, loading it on first use.
+    
+    Concurrent callers asking for the same size share a single load.
     
     Args:
         model_size: One of 'tiny', 'base', 'small', 'medium', 'large'
+        backend: Engine to load the model for (default WHISPER_BACKEND)
+    """
+    backend = backend or get_backend()
+    return _model_registry.get(f"{backend.name}:{model_size}")
+
+
+def get_model_stats() -> Dict[str, Any]:
+    """Return load time and resident size for each cached Whisper model."""
+    return _model_registry.stats()
+
+
+def _get_transcription_cache() -> Optional[DiskCache]:
+    """
+    Return the shared transcription cache, or None if it is disabled.
+
+    Controlled by TRANSCRIPTION_CACHE_ENABLED (default "1") and
+    TRANSCRIPTION_CACHE_MAX_MB (default 512).
+    """
+    global _transcription_cache
+
+    if os.environ.get("TRANSCRIPTION_CACHE_ENABLED", "1") == "0":
+        return None
+
+    with _transcription_cache_lock:
+        if _transcription_cache is None:
+            max_mb = int(os.environ.get("TRANSCRIPTION_CACHE_MAX_MB", DEFAULT_TRANSCRIPTION_CACHE_MB))
+            _transcription_cache = DiskCache(
+                default_cache_dir("transcriptions"),
+                max_bytes=max_mb * 1024 * 1024,
+                name="transcription"
+            )
+        return _transcription_cache
+
+
+def _audio_fingerprint(audio) -> str:
+    """Hash the decoded PCM samples, so renamed or re-uploaded copies still match."""
+    import numpy as np
+    return hashlib.sha256(np.ascontiguousarray(audio).data).hexdigest()
+
+
+def _resolve_chunking(
+    audio: AudioBuffer,
+    chunked: Optional[bool],
+    chunk_seconds: Optional[float]
+) -> Optional[float]:
+    """
+    Decide whether to use chunked transcription for this audio.
+
+    Chunked mode is enabled per call or with WHISPER_CHUNKED=1, and only
+    kicks in when the audio is noticeably longer than one chunk.
+
+    Returns:
+        The chunk length in seconds, or None for a single-pass decode.
+    """
+    if chunked is None:
+        chunked = os.environ.get("WHISPER_CHUNKED", "0") == "1"
+    if not chunked:
+        return None
+
+    if chunk_seconds is None:
+        chunk_seconds = float(os.environ.get("WHISPER_CHUNK_SECONDS", DEFAULT_CHUNK_SECONDS))
+
+    if audio.duration < chunk_seconds * 1.5:
+        return None
+    return chunk_seconds
+
+
+def _resolve_vad(vad: Optional[bool]) -> bool:
+    """Silence trimming is on unless disabled per call or with WHISPER_VAD=0."""
+    if vad is None:
+        return os.environ.get("WHISPER_VAD", "1") != "0"
+    return vad
+
+
+def _resolve_language(language: Optional[str]) -> Optional[str]:
+    """
+    Return the pinned language code, or None for auto-detection.
+
+    A language can be pinned per call or for the whole deployment with
+    WHISPER_LANGUAGE (e.g. "en"); "auto" or empty means detect it.
     """
-    global _whisper_model, _current_model_size
+    if language is None:
+        language = os.environ.get("WHISPER_LANGUAGE", "auto")
+    language = language.strip().lower()
+    if not language or language == "auto":
+        return None
+    return language
+
+
+def _run_backend(
+    engine: TranscriptionBackend,
+    audio: AudioBuffer,
+    model_size: str,
+    decode_options: Dict[str, Any],
+    chunked: Optional[bool],
+    chunk_seconds: Optional[float],
+    max_workers: Optional[int]
+) -> Dict[str, Any]:
+    """Transcribe decoded audio in one pass or in parallel chunks."""
+    chunk_seconds = _resolve_chunking(audio, chunked, chunk_seconds)
+    if chunk_seconds is not None:
+        return transcribe_chunked(
+            audio, model_size, decode_options,
+            chunk_seconds=chunk_seconds, max_workers=max_workers,
+            backend=engine.name
+        )
+
+    model = _load_model(model_size, engine)
+    logger.info(f"Transcribing audio with {engine.name}... (this may take a while for long files)")
+    return engine.transcribe(model, audio.samples, **decode_options)
+
+
+def _transcribe(
+    filepath: str,
+    model_size: str,
+    use_cache: bool = True,
+    chunked: Optional[bool] = None,
+    chunk_seconds: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    audio: Optional[AudioBuffer] = None,
+    backend: Optional[str] = None,
+    vad: Optional[bool] = None,
+    language: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run Whisper on a file, consulting the transcription cache first.
+
+    The file is decoded here unless the caller passes an already
+    decoded AudioBuffer.
+
+    Returns:
+        Dictionary with 'text', 'segments' and 'language', plus 'vad'
+        stats when silence trimming ran.
+    """
+    if audio is None:
+        with AudioBuffer.from_file(filepath) as owned_audio:
+            return _transcribe(
+                filepath, model_size, use_cache, chunked, chunk_seconds,
+                max_workers, audio=owned_audio, backend=backend, vad=vad,
+                language=language
+            )
+
+    engine = get_backend(backend)
+    decode_options: Dict[str, Any] = {}
+    pinned_language = _resolve_language(language)
+    if pinned_language:
+        decode_options["language"] = pinned_language
+    use_vad = _resolve_vad(vad)
+
+    cache = _get_transcription_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = DiskCache.make_key(
+            _audio_fingerprint(audio.samples), model_size, engine.cache_id(),
+            decode_options, _resolve_chunking(audio, chunked, chunk_seconds), use_vad
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Transcription cache hit for {filepath}")
+            return cached
 
-    # Return cached model if same size is requested
-    if _whisper_model is not None and _current_model_size == model_size:
-        logger.info(f"Using cached Whisper '{model_size}' model")
-        return _whisper_model
+    time_map = None
+    vad_stats = None
+    speech_audio = audio
+    if use_vad:
+        speech_audio, time_map, vad_stats = trim_silence(audio)
 
     try:
-        import whisper
-        logger.info(f"Loading Whisper '{model_size}' model (this may take a moment on first run)...")
-        _whisper_model = whisper.load_model(model_size)
-        _current_model_size = model_size
-        logger.info(f"Whisper '{model_size}' model loaded successfully")
-        return _whisper_model
-    except ImportError:
-        raise RuntimeError(
-            "openai-whisper is not installed. "
-            "Install it with: pip install openai-whisper"
+        if not pinned_language and _resolve_chunking(speech_audio, chunked, chunk_seconds) is None:
+            # Detect once up front and decode everything in that language,
+            # so long calls can't flip mid-call. Chunked mode detects in a
+            # worker instead, so the parent doesn't load a model just for this
+            model = _load_model(model_size, engine)
+            decode_options["language"] = engine.detect_language(model, speech_audio.samples)
+            logger.info(f"Detected language: {decode_options['language']}")
+
+        result = _run_backend(
+            engine, speech_audio, model_size, decode_options,
+            chunked, chunk_seconds, max_workers
         )
-    except Exception as e:
-        logger.error(f"Failed to load Whisper model: {e}")
-        raise RuntimeError(f"Failed to load Whisper model: {str(e)}")
+    finally:
+        if speech_audio is not audio:
+            speech_audio.close()
+
+    # Segment times are mapped back onto the original recording, so gaps
+    # between segments reflect the real pauses that VAD cut out
+    segments: List[Dict] = []
+    for seg in result["segments"]:
+        start, end = seg["start"], seg["end"]
+        if time_map is not None:
+            start, end = time_map.to_original(start), time_map.to_original(end)
+        segments.append({
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": seg["text"]
+        })
+
+    output = {
+        "text": result["text"],
+        "segments": segments,
+        "language": decode_options.get("language") or result["language"]
+    }
+    if vad_stats is not None:
+        output["vad"] = vad_stats
+
+    if cache is not None and cache_key is not None:
+        cache.set(cache_key, output)
+
+    return output
 
 
-def transcribe_audio(filepath: str, model_size: str = "base") -> str:
+def transcribe_audio(
+    filepath: str,
+    model_size: str = "base",
+    use_cache: bool = True,
+    backend: Optional[str] = None,
+    language: Optional[str] = None
+) -> str:
     """
     Transcribe an audio file using OpenAI Whisper.
     
     Args:
         filepath: Path to the audio file
         model_size: Size of the Whisper model to use
+        use_cache: Reuse a stored transcription of identical audio if present
+        backend: Inference engine ('openai-whisper' or 'faster-whisper'),
+                 defaults to the WHISPER_BACKEND env var
+        language: Language code to decode in, or "auto" (default WHISPER_LANGUAGE)
         
     Returns:
         Transcribed text from the audio
@@ -86,13 +328,10 @@ def transcribe_audio(filepath: str, model_size: str = "base") -> str:
             logger.warning(f"Invalid model size '{model_size}', falling back to 'base'")
             model_size = "base"
 
-        # Load model
-        model = _load_model(model_size)
-
         # Transcribe
-        logger.info("Transcribing audio... (this may take a while for long files)")
-        result = model.transcribe(filepath)
-        transcript = result.get("text", "").strip()
+        transcript = _transcribe(
+            filepath, model_size, use_cache=use_cache, backend=backend, language=language
+        )["text"]
 
         if not transcript:
             raise ValueError("Whisper returned an empty transcript")
@@ -108,45 +347,66 @@ def transcribe_audio(filepath: str, model_size: str = "base") -> str:
         raise RuntimeError(f"Transcription failed: {str(e)}")
 
 
-def transcribe_audio_with_segments(filepath: str, model_size: str = "base") -> Dict:
+def transcribe_audio_with_segments(
+    filepath: str,
+    model_size: str = "base",
+    use_cache: bool = True,
+    chunked: Optional[bool] = None,
+    chunk_seconds: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    audio: Optional[AudioBuffer] = None,
+    backend: Optional[str] = None,
+    vad: Optional[bool] = None,
+    language: Optional[str] = None
+) -> Dict:
     """
     Transcribe an audio file and return both full text and timestamped segments.
     
     This is useful for speaker diarization and timeline features later.
+    Results are cached on disk by a hash of the decoded audio, so
+    re-uploads of the same recording skip the Whisper pass entirely.
     
     Args:
         filepath: Path to the audio file
         model_size: Size of the Whisper model to use
+        use_cache: Reuse a stored transcription of identical audio if present
+        chunked: Split long audio at silences and transcribe the chunks in
+                 parallel. Defaults to the WHISPER_CHUNKED env var.
+        chunk_seconds: Target chunk length (default WHISPER_CHUNK_SECONDS or 300)
+        max_workers: Worker processes for chunked mode
+                     (default WHISPER_CHUNK_WORKERS or up to 4)
+        audio: Already decoded audio for this file, to avoid decoding twice
+        backend: Inference engine ('openai-whisper' or 'faster-whisper'),
+                 defaults to the WHISPER_BACKEND env var
+        vad: Cut long silences before transcribing (default on, disable
+             with WHISPER_VAD=0). Timestamps still refer to the original audio.
+        language: Language code to decode in (e.g. "en"), or "auto" to detect
+                  it once from the first 30 seconds. Defaults to WHISPER_LANGUAGE.
         
     Returns:
-        Dictionary with 'text' (full transcript) and 'segments' (list of
-        timestamped segments with start, end, and text)
+        Dictionary with 'text' (full transcript), 'segments' (list of
+        timestamped segments with start, end, and text), 'language', and
+        'vad' (how much audio was skipped) when silence trimming ran
     """
     try:
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Audio file not found: {filepath}")
 
-        model = _load_model(model_size)
-
         logger.info("Transcribing audio with segments...")
-        result = model.transcribe(filepath)
-
-        segments: List[Dict] = []
-        for seg in result.get("segments", []):
-            segments.append({
-                "start": round(seg["start"], 2),
-                "end": round(seg["end"], 2),
-                "text": seg["text"].strip()
-            })
-
-        transcript = result.get("text", "").strip()
-        logger.info(f"Transcription completed. {len(segments)} segments found.")
+        result = _transcribe(
+            filepath, model_size,
+            use_cache=use_cache,
+            chunked=chunked,
+            chunk_seconds=chunk_seconds,
+            max_workers=max_workers,
+            audio=audio,
+            backend=backend,
+            vad=vad,
+            language=language
+        )
+        logger.info(f"Transcription completed. {len(result['segments'])} segments found.")
 
-        return {
-            "text": transcript,
-            "segments": segments,
-            "language": result.get("language", "unknown")
-        }
+        return result
 
     except FileNotFoundError:
         raise
@@ -155,9 +415,22 @@ def transcribe_audio_with_segments(filepath: str, model_size: str = "base") -> D
         raise RuntimeError(f"Segmented transcription failed: {str(e)}")
 
 
+def get_transcription_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and size of the transcription cache."""
+    cache = _get_transcription_cache()
+    if cache is None:
+        return {"name": "transcription", "enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def clear_transcription_cache():
+    """Delete all stored transcriptions."""
+    cache = _get_transcription_cache()
+    if cache is not None:
+        cache.clear()
+
+
 def clear_model_cache():
-    """Clear the cached Whisper model to free memory."""
-    global _whisper_model, _current_model_size
-    _whisper_model = None
-    _current_model_size = None
+    """Clear the cached Whisper models to free memory."""
+    _model_registry.clear()
     logger.info("Whisper model cache cleared")
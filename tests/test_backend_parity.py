@@ -0,0 +1,103 @@
+"""
+faster-whisper must stay in line with the reference openai-whisper output
+before it can replace it as WHISPER_BACKEND.
+
+Needs both backends installed and a short clip of clear English speech.
+A clip at tests/fixtures/parity_speech.wav is used when present; otherwise
+the JFK sample from the openai-whisper test suite is downloaded once into
+the cache directory (the models are downloaded on first use anyway), and
+on an offline machine the clip is synthesized with espeak-ng/espeak.
+"""
+
+import difflib
+import re
+import shutil
+import subprocess
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("whisper")
+pytest.importorskip("faster_whisper")
+
+from audio_buffer import AudioBuffer  # noqa: E402
+from disk_cache import default_cache_dir  # noqa: E402
+from transcription_backends import get_backend  # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "parity_speech.wav"
+SAMPLE_URL = "https://github.com/openai/whisper/raw/main/tests/jfk.flac"
+SPOKEN_TEXT = (
+    "And so my fellow Americans, ask not what your country can do for you, "
+    "ask what you can do for your country."
+)
+MODEL_SIZE = "tiny"
+
+MIN_TEXT_SIMILARITY = 0.9
+MAX_START_OFFSET_SECONDS = 0.5
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _download_sample():
+    target = Path(default_cache_dir("fixtures")) / "jfk.flac"
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(".part")
+        try:
+            with urllib.request.urlopen(SAMPLE_URL, timeout=30) as response:
+                partial.write_bytes(response.read())
+        except OSError:
+            return None
+        partial.replace(target)
+    return target
+
+
+def _synthesize_sample(directory):
+    tts = shutil.which("espeak-ng") or shutil.which("espeak")
+    if tts is None:
+        return None
+    target = directory / "parity_speech.wav"
+    subprocess.run([tts, "-s", "150", "-w", str(target), SPOKEN_TEXT], check=True, capture_output=True)
+    return target
+
+
+@pytest.fixture(scope="module")
+def speech_clip(tmp_path_factory):
+    if FIXTURE.exists():
+        return FIXTURE
+    clip = _download_sample() or _synthesize_sample(tmp_path_factory.mktemp("parity"))
+    if clip is None:
+        pytest.skip("no speech clip: parity fixture missing, download failed and no espeak for synthesis")
+    return clip
+
+
+@pytest.fixture(scope="module")
+def transcripts(speech_clip):
+    results = {}
+    with AudioBuffer.from_file(str(speech_clip)) as audio:
+        for name in ("openai-whisper", "faster-whisper"):
+            engine = get_backend(name)
+            model = engine.load_model(MODEL_SIZE)
+            results[name] = engine.transcribe(model, audio.samples, language="en")
+    return results
+
+
+def test_text_matches_reference(transcripts):
+    reference = _words(transcripts["openai-whisper"]["text"])
+    candidate = _words(transcripts["faster-whisper"]["text"])
+
+    assert reference, "reference transcript is empty; the fixture should contain speech"
+    assert difflib.SequenceMatcher(None, reference, candidate).ratio() >= MIN_TEXT_SIMILARITY
+
+
+def test_segment_starts_match_reference(transcripts):
+    reference = [seg["start"] for seg in transcripts["openai-whisper"]["segments"]]
+    candidate = [seg["start"] for seg in transcripts["faster-whisper"]["segments"]]
+
+    assert candidate
+    # Backends may split segments differently; every reference start needs a close match
+    for start in reference:
+        assert min(abs(start - other) for other in candidate) <= MAX_START_OFFSET_SECONDS
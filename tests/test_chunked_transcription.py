@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import chunked_transcription
+from audio_buffer import SAMPLE_RATE, AudioBuffer
+from chunked_transcription import stitch_segments, transcribe_chunked
+
+
+def test_words_repeated_across_a_seam_are_kept():
+    segments = stitch_segments([
+        (0.0, [{"start": 0.0, "end": 1.0, "text": "Do you agree?"}, {"start": 28.5, "end": 29.8, "text": "yes"}]),
+        (30.0, [{"start": 0.2, "end": 1.5, "text": "yes I agree"}]),
+    ])
+
+    assert [seg["text"] for seg in segments] == ["Do you agree?", "yes", "yes I agree"]
+
+
+def test_segment_times_are_absolute_and_monotonic():
+    segments = stitch_segments([
+        (0.0, [{"start": 0.0, "end": 30.1, "text": "first chunk"}]),
+        (30.0, [{"start": 0.0, "end": 2.0, "text": "second chunk"}, {"start": 2.0, "end": 2.0, "text": "  "}]),
+    ])
+
+    assert segments == [
+        {"start": 0.0, "end": 30.1, "text": "first chunk"},
+        {"start": 30.1, "end": 32.0, "text": "second chunk"},
+    ]
+
+
+@pytest.fixture
+def inline_workers(monkeypatch):
+    """Run the worker entry points on threads and record what they were given."""
+    calls = {"detect": [], "chunks": []}
+
+    def detect(audio_slice, model_size, backend_name):
+        calls["detect"].append(len(audio_slice.load()))
+        return "de"
+
+    def transcribe(audio_slice, model_size, decode_options, backend_name):
+        calls["chunks"].append(dict(decode_options))
+        return {"segments": [{"start": 0.0, "end": 1.0, "text": "hallo"}],
+                "language": decode_options.get("language")}
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(chunked_transcription, "_get_pool", lambda max_workers: pool)
+    monkeypatch.setattr(chunked_transcription, "_detect_language", detect)
+    monkeypatch.setattr(chunked_transcription, "_transcribe_chunk", transcribe)
+    yield calls
+    pool.shutdown()
+
+
+def noise(seconds):
+    return np.random.default_rng(0).normal(0, 0.1, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+def test_language_is_detected_once_in_a_worker(inline_workers):
+    result = transcribe_chunked(AudioBuffer(noise(50)), "tiny", chunk_seconds=10)
+
+    assert inline_workers["detect"] == [30 * SAMPLE_RATE]
+    assert len(inline_workers["chunks"]) > 1
+    assert all(options["language"] == "de" for options in inline_workers["chunks"])
+    assert result["language"] == "de"
+
+
+def test_pinned_language_skips_detection(inline_workers):
+    result = transcribe_chunked(AudioBuffer(noise(50)), "tiny", {"language": "en"}, chunk_seconds=10)
+
+    assert inline_workers["detect"] == []
+    assert all(options["language"] == "en" for options in inline_workers["chunks"])
+    assert result["language"] == "en"
+
+
+def test_chunked_mode_loads_no_model_in_the_parent(inline_workers, monkeypatch):
+    import whisper_module
+
+    def no_parent_model(*args):
+        raise AssertionError("parent process loaded a Whisper model")
+
+    monkeypatch.setattr(whisper_module, "_load_model", no_parent_model)
+
+    result = whisper_module._transcribe(
+        "call.wav", "tiny", use_cache=False, chunked=True, chunk_seconds=10,
+        audio=AudioBuffer(noise(50)), vad=False, language="auto"
+    )
+
+    assert result["language"] == "de"
+    assert len(inline_workers["detect"]) == 1
+
+
+class FakeExecutor:
+    def __init__(self, max_workers, **kwargs):
+        self.max_workers = max_workers
+        self.shut_down = False
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def test_pools_of_different_sizes_coexist(monkeypatch):
+    monkeypatch.setattr(chunked_transcription, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(chunked_transcription, "_pools", {})
+
+    two = chunked_transcription._get_pool(2)
+    three = chunked_transcription._get_pool(3)
+
+    assert two is not three and not two.shut_down
+    assert chunked_transcription._get_pool(2) is two
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    monkeypatch.setattr(chunked_transcription, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(chunked_transcription, "_pools", {})
+    broken = chunked_transcription._get_pool(2)
+    other = chunked_transcription._get_pool(4)
+
+    chunked_transcription._reset_pool(broken)
+
+    assert broken.shut_down and not other.shut_down
+    assert chunked_transcription._get_pool(2) is not broken
+    assert chunked_transcription._get_pool(4) is other
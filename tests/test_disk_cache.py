@@ -0,0 +1,62 @@
+import os
+
+import disk_cache
+from disk_cache import DiskCache
+
+
+def entry_files(cache):
+    return sorted(
+        name for _root, _dirs, files in os.walk(cache.directory) for name in files
+    )
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=350)
+    for i, key in enumerate(["aa", "bb", "cc"]):
+        cache.set(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    assert cache.get("aa") is not None  # refreshes its mtime
+    cache.set("dd", "x" * 100)
+
+    assert cache.get("bb") is None
+    assert all(cache.get(key) is not None for key in ["aa", "cc", "dd"])
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_entries_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    cache = DiskCache(str(tmp_path), max_bytes=10_000, ttl_seconds=60)
+    cache.set("aa", {"answer": 42})
+
+    now[0] += 59
+    assert cache.get("aa") == {"answer": 42}
+
+    now[0] += 1
+    assert cache.get("aa") is None
+    assert cache.stats()["expirations"] == 1
+    assert not os.path.exists(cache._path("aa"))
+
+
+def test_overwrite_replaces_entry_without_temp_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10_000)
+    cache.set("aa", "old")
+    cache.set("aa", "new")
+
+    assert cache.get("aa") == "new"
+    assert entry_files(cache) == ["aa.json"]
+
+
+def test_failed_write_keeps_previous_entry(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=10_000)
+    cache.set("aa", "old")
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(disk_cache.os, "replace", fail_replace)
+    cache.set("aa", "new")
+
+    assert cache.get("aa") == "old"
+    assert entry_files(cache) == ["aa.json"]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+import embedding_service  # noqa: E402
+
+
+def test_turns_are_candidate_units_but_not_encoded(monkeypatch):
+    encoded = []
+
+    def fake_encode(texts, batch_size=None):
+        encoded.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(embedding_service, "encode", fake_encode)
+    turns = [
+        {"speaker": "A", "text": "My anxiety at work is getting worse."},
+        {"speaker": "B", "text": "Tell me more about the anxiety."},
+    ]
+    text = " ".join(turn["text"] for turn in turns)
+
+    embeddings = embedding_service.compute_call_embeddings(text, turns)
+
+    assert not any(turn["text"] in encoded for turn in turns)
+    assert encoded == [text] + embeddings.candidates
+    assert "anxiety" in embeddings.candidates
+    assert embeddings.doc_embedding.shape == (1, 4)
+    assert embeddings.candidate_embeddings.shape == (len(embeddings.candidates), 4)
@@ -0,0 +1,149 @@
+import pytest
+
+import emotion_detector
+from result_memo import get_memo
+
+
+class FakeTokenizer:
+    model_max_length = 512
+
+    def __call__(self, text, **kwargs):
+        offsets, start = [], 0
+        for word in text.split():
+            start = text.index(word, start)
+            offsets.append((start, start + len(word)))
+            start += len(word)
+        return {"offset_mapping": offsets}
+
+
+class FakePipeline:
+    """Scores "okay" as neutral and everything else as joy."""
+
+    tokenizer = FakeTokenizer()
+
+    def __init__(self, fail_batches=False):
+        self.fail_batches = fail_batches
+        self.calls = []
+
+    @staticmethod
+    def _scores(text):
+        if "okay" in text.lower():
+            return [{"label": "neutral", "score": 0.9}, {"label": "joy", "score": 0.1}]
+        return [{"label": "joy", "score": 0.8}, {"label": "neutral", "score": 0.2}]
+
+    def __call__(self, inputs, batch_size=None):
+        self.calls.append(inputs)
+        if isinstance(inputs, str):
+            return [self._scores(inputs)]
+        if self.fail_batches:
+            raise RuntimeError("batch failed")
+        return [self._scores(text) for text in inputs]
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    def install(**kwargs):
+        pipe = FakePipeline(**kwargs)
+        monkeypatch.setattr(emotion_detector, "_emotion_pipeline", pipe)
+        return pipe
+
+    get_memo().clear()
+    monkeypatch.setattr(emotion_detector, "_batcher", None)
+    yield install
+    get_memo().clear()
+
+
+@pytest.mark.parametrize("microbatch", ["0", "1"])
+def test_repeated_turns_all_get_results(fake_pipeline, monkeypatch, microbatch):
+    monkeypatch.setenv("EMOTION_MICROBATCH", microbatch)
+    pipe = fake_pipeline()
+    turns = [
+        {"speaker": "A", "text": "okay"},
+        {"speaker": "B", "text": "I feel great today"},
+        {"speaker": "A", "text": "okay"},
+        {"speaker": "A", "text": "okay "},
+    ]
+
+    emotion_detector.detect_emotions_per_turn(turns)
+
+    assert [turn["emotion"]["primary_emotion"] for turn in turns] == ["neutral", "joy", "neutral", "neutral"]
+    # Repeats are classified once and do not share result objects
+    assert sum(len(call) for call in pipe.calls) == 2
+    assert turns[2]["emotion"] is not turns[0]["emotion"]
+
+    summary = emotion_detector.get_emotion_summary(turns)
+    assert summary["dominant_emotion"] == "neutral"
+
+
+@pytest.mark.parametrize("microbatch", ["0", "1"])
+def test_failing_batch_falls_back_to_single_texts(fake_pipeline, monkeypatch, microbatch):
+    monkeypatch.setenv("EMOTION_MICROBATCH", microbatch)
+    pipe = fake_pipeline(fail_batches=True)
+    turns = [
+        {"speaker": "A", "text": "okay"},
+        {"speaker": "B", "text": "that is wonderful news"},
+        {"speaker": "A", "text": "okay"},
+    ]
+
+    emotion_detector.detect_emotions_per_turn(turns)
+
+    assert [turn["emotion"]["primary_emotion"] for turn in turns] == ["neutral", "joy", "neutral"]
+    assert "error" not in turns[1]["emotion"]
+    assert sorted(call for call in pipe.calls if isinstance(call, str)) == ["okay", "that is wonderful news"]
+
+
+def test_microbatches_are_cut_from_call_wide_length_order(fake_pipeline, monkeypatch):
+    monkeypatch.setenv("EMOTION_MICROBATCH", "1")
+    monkeypatch.setenv("EMOTION_BATCH_SIZE", "2")
+    pipe = fake_pipeline()
+    texts = [
+        "one two three four five six seven eight",
+        "hi",
+        "one two three four five six seven eight nine",
+        "hello there",
+    ]
+    turns = [{"speaker": "A", "text": text} for text in texts]
+
+    emotion_detector.detect_emotions_per_turn(turns)
+
+    assert pipe.calls == [["hi", "hello there"], [texts[0], texts[2]]]
+    assert all(turn["emotion"]["primary_emotion"] == "joy" for turn in turns)
+
+
+def numbered_words(n):
+    return " ".join(f"w{i:04d}" for i in range(n))
+
+
+def test_split_windows_overlap_by_stride(fake_pipeline):
+    fake_pipeline()
+    text = numbered_words(1000)
+    stride = emotion_detector.DEFAULT_WINDOW_STRIDE_TOKENS
+
+    windows, capped = emotion_detector._split_windows(text, max_windows=8)
+
+    assert not capped
+    assert [count for _, count in windows] == [510, 510, 108]
+    first, second, last = (window.split() for window, _ in windows)
+    assert first[-stride:] == second[:stride]
+    assert second[-stride:] == last[:stride]
+    assert first[0] == "w0000" and last[-1] == "w0999"
+
+
+def test_split_windows_short_text_is_one_window(fake_pipeline):
+    fake_pipeline()
+
+    assert emotion_detector._split_windows("I feel fine", max_windows=8) == ([("I feel fine", 3)], False)
+
+
+def test_window_cap_is_reported(fake_pipeline, monkeypatch):
+    fake_pipeline()
+    monkeypatch.setenv("EMOTION_MAX_WINDOWS_PER_TURN", "2")
+    text = numbered_words(1000)
+
+    windows, capped = emotion_detector._split_windows(text, max_windows=2)
+    result = emotion_detector.detect_emotions(text)
+
+    assert capped and len(windows) == 2
+    assert windows[-1][0].split()[-1] == "w0955"
+    assert result["windows"] == 2
+    assert result["window_cap_reached"] is True
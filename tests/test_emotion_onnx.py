@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from emotion_onnx import _pad_token
+
+SCORE_TOLERANCE = 1e-3
+
+BATCHES = [
+    ["okay", "I am so angry about how they treated me at work yesterday, it was humiliating."],
+    ["Thank you.", "yeah", "I don't know what to do anymore, everything keeps going wrong and I can't sleep."],
+    ["That's wonderful news!"] + ["I was scared. " * n for n in (1, 5, 20)],
+]
+
+
+@pytest.mark.parametrize("config", [{"pad_token": "<pad>"}, {"pad_token": {"content": "<pad>", "lstrip": False}}])
+def test_pad_token_comes_from_saved_config(tmp_path, config):
+    (tmp_path / "tokenizer_config.json").write_text(json.dumps(config))
+
+    assert _pad_token(str(tmp_path)) == "<pad>"
+
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory):
+    """Transformers pipeline and ONNX engine for the real emotion model (downloaded on first run)."""
+    for module in ("torch", "transformers", "onnxruntime", "tokenizers"):
+        pytest.importorskip(module)
+
+    from emotion_detector import EMOTION_MODEL_ID, _build_pipeline
+    from emotion_onnx import load_onnx_classifier
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("CALL_ANALYZER_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield _build_pipeline(quantize=False), load_onnx_classifier(EMOTION_MODEL_ID)
+
+
+@pytest.mark.parametrize("texts", BATCHES)
+def test_onnx_matches_transformers_pipeline(engines, texts):
+    reference_pipe, onnx_pipe = engines
+
+    # One padded batch of uneven lengths per engine
+    expected = reference_pipe(texts, batch_size=len(texts))
+    actual = onnx_pipe(texts, batch_size=len(texts))
+
+    assert len(actual) == len(expected)
+    for expected_scores, actual_scores in zip(expected, actual):
+        expected_map = {r["label"]: r["score"] for r in expected_scores}
+        actual_map = {r["label"]: r["score"] for r in actual_scores}
+        assert set(actual_map) == set(expected_map)
+        assert max(actual_map, key=actual_map.get) == max(expected_map, key=expected_map.get)
+        for label, score in expected_map.items():
+            assert actual_map[label] == pytest.approx(score, abs=SCORE_TOLERANCE)
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("dotenv")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers prompts with a scripted responder and records every call."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return FakeResponse(self.respond(prompt))
+
+
+@pytest.fixture
+def gemini(monkeypatch, tmp_path):
+    monkeypatch.setenv("API_KEY", "test-key")
+    monkeypatch.setenv("CALL_ANALYZER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("GEMINI_LIMITER_STATE_FILE", str(tmp_path / "limiter.json"))
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "1")
+
+    import gemini_module
+    import rate_limiter
+
+    monkeypatch.setattr(gemini_module, "_response_cache", None)
+    monkeypatch.setattr(rate_limiter, "_limiter", None)
+    return gemini_module
+
+
+def use_model(monkeypatch, gemini, respond):
+    model = FakeModel(respond)
+    monkeypatch.setattr(gemini, "get_gemini_model", lambda: model)
+    return model
+
+
+TRANSCRIPT = "Student: I am worried about my exams.\nCounsellor: Let's plan your revision."
+VALID = json.dumps({"summary": "S", "sentiment": "M", "suggestions": "1. Listen"})
+
+
+def test_parse_analysis_json_reads_fenced_json(gemini):
+    fields = gemini.parse_analysis_json(f"```json\n{VALID}\n```")
+
+    assert fields == {"summary": "S", "sentiment": "M", "suggestions": "1. Listen"}
+
+
+def test_parse_analysis_json_keeps_only_valid_fields(gemini):
+    text = json.dumps({"summary": "S", "sentiment": "  ", "suggestions": ["Listen", "Ask"]})
+
+    fields = gemini.parse_analysis_json(text)
+
+    assert fields == {"summary": "S", "suggestions": "1. Listen\n2. Ask"}
+
+
+@pytest.mark.parametrize("text", ["not json", "[1, 2]", '{"summary": "S"', ""])
+def test_parse_analysis_json_rejects_invalid_json(gemini, text):
+    assert gemini.parse_analysis_json(text) == {}
+
+
+def test_malformed_combined_response_is_not_cached(gemini, monkeypatch):
+    answers = iter(['{"summary": "S"', VALID])
+    model = use_model(monkeypatch, gemini, lambda prompt: next(answers) if "JSON" in prompt else "separate")
+
+    first, first_meta = gemini.analyze_transcript(TRANSCRIPT, mode="combined")
+    second, second_meta = gemini.analyze_transcript(TRANSCRIPT, mode="combined")
+
+    assert first_meta["fallback_fields"] == list(gemini.ANALYSIS_FIELDS)
+    assert second_meta["fallback_fields"] == []
+    assert second == {"summary": "S", "sentiment": "M", "suggestions": "1. Listen"}
+    assert sum("JSON" in prompt for prompt in model.prompts) == 2
+
+
+def test_valid_combined_response_is_cached(gemini, monkeypatch):
+    model = use_model(monkeypatch, gemini, lambda prompt: VALID)
+
+    gemini.analyze_transcript(TRANSCRIPT, mode="combined")
+    results, _ = gemini.analyze_transcript(TRANSCRIPT, mode="combined")
+
+    assert results["summary"] == "S"
+    assert len(model.prompts) == 1
+
+
+def test_chunk_by_tokens_keeps_turns_whole_within_budget(gemini):
+    turns = ["A: " + "word " * 12, "B: " + "word " * 12, "A: " + "word " * 12]
+
+    chunks = gemini.chunk_by_tokens(turns, max_tokens=20)
+
+    assert len(chunks) == 3
+    assert chunks == turns
+    assert all(gemini.estimate_tokens(chunk) <= 20 for chunk in chunks)
+
+
+def test_chunk_by_tokens_groups_small_turns(gemini):
+    chunks = gemini.chunk_by_tokens(["A: hi", "B: hello", "A: bye"], max_tokens=20)
+
+    assert chunks == ["A: hi\n\nB: hello\n\nA: bye"]
+
+
+def test_chunk_by_tokens_splits_oversized_turn_on_words(gemini):
+    turn = " ".join(f"w{i:02d}" for i in range(40))
+
+    chunks = gemini.chunk_by_tokens([turn], max_tokens=10)
+
+    assert len(chunks) > 1
+    assert all(gemini.estimate_tokens(chunk) <= 10 for chunk in chunks)
+    assert " ".join(chunks).split() == turn.split()
+
+
+def test_failed_map_chunks_are_reported(gemini, monkeypatch):
+    monkeypatch.setenv("GEMINI_MAX_PROMPT_TOKENS", "40")
+    monkeypatch.setenv("GEMINI_CHUNK_TOKENS", "30")
+    monkeypatch.setenv("GEMINI_MAP_CONCURRENCY", "1")
+    monkeypatch.setattr(gemini.time, "sleep", lambda seconds: None)
+    turns = [{"speaker": f"S{i}", "text": "word " * 20} for i in range(3)]
+
+    def respond(prompt):
+        if "part 2 of" in prompt:
+            raise ValueError("invalid argument")
+        return "note" if "Notes:" in prompt else VALID
+
+    use_model(monkeypatch, gemini, respond)
+    results, metadata = gemini.analyze_transcript(
+        "\n".join(f"{t['speaker']}: {t['text']}" for t in turns), use_cache=False, turns=turns
+    )
+
+    assert metadata["chunks"] == 3
+    assert metadata["failed_chunks"] == 1
+    assert results["summary"] == "S"
+
+
+def test_use_cache_false_neither_reads_nor_writes(gemini, monkeypatch):
+    model = use_model(monkeypatch, gemini, lambda prompt: "answer")
+
+    gemini.generate_text_with_retry("prompt", use_cache=True)
+    gemini.generate_text_with_retry("prompt", use_cache=False)
+    gemini.generate_text_with_retry("other", use_cache=False)
+    gemini.generate_text_with_retry("other", use_cache=True)
+
+    assert model.prompts == ["prompt", "prompt", "other", "other"]
+
+
+def test_cached_responses_expire_after_ttl(gemini, monkeypatch):
+    import disk_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache.time, "time", lambda: now[0])
+    monkeypatch.setenv("LLM_CACHE_TTL_HOURS", "1")
+    model = use_model(monkeypatch, gemini, lambda prompt: f"answer {len(model.prompts)}")
+
+    first = gemini.generate_text_with_retry("prompt")
+    now[0] += 3599
+    assert gemini.generate_text_with_retry("prompt") == first
+
+    now[0] += 1
+    assert gemini.generate_text_with_retry("prompt") != first
+    assert len(model.prompts) == 2
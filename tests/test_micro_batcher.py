@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class RecordingModel:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [ValueError(item) if item == "bad" else f"{item}!" for item in items]
+
+
+def test_full_batch_flushes_without_waiting():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait=30)
+
+    started = time.monotonic()
+    results = [f.result(timeout=5) for f in batcher.submit(["a", "b", "c", "d"])]
+
+    assert results == ["a!", "b!", "c!", "d!"]
+    assert model.batches == [["a", "b", "c", "d"]]
+    assert time.monotonic() - started < 5
+    assert batcher.stats()["full_batches"] == 1
+
+
+def test_partial_batch_flushes_after_max_wait():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=100, max_wait=0.05)
+
+    started = time.monotonic()
+    results = batcher.map(["a", "b"])
+
+    assert results == ["a!", "b!"]
+    assert model.batches == [["a", "b"]]
+    assert time.monotonic() - started >= 0.05
+
+
+def test_results_reach_their_own_callers():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait=0.1)
+    results = {}
+    barrier = threading.Barrier(6)
+
+    def caller(n):
+        items = [f"{n}-{i}" for i in range(n + 1)]
+        barrier.wait()
+        results[n] = batcher.map(items)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n in range(6):
+        assert results[n] == [f"{n}-{i}!" for i in range(n + 1)]
+    assert sum(len(batch) for batch in model.batches) == 21
+    assert len(model.batches) < 6
+
+
+def test_item_failure_is_raised_to_its_caller_only():
+    batcher = MicroBatcher(RecordingModel(), max_batch_size=3, max_wait=30)
+
+    good, bad, other = batcher.submit(["a", "bad", "b"])
+
+    assert good.result(timeout=5) == "a!"
+    assert other.result(timeout=5) == "b!"
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
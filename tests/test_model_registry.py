@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from model_registry import ModelRegistry
+
+
+class SlowLoader:
+    """Loader that blocks until released and counts calls per key."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            self.calls.append(key)
+        self.release.wait(timeout=5)
+        if key == "broken":
+            raise ValueError("corrupt checkpoint")
+        return object()
+
+
+def get_concurrently(registry, key, n_threads=8):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(registry.get(key))
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_gets_load_once():
+    loader = SlowLoader()
+    registry = ModelRegistry("test", loader, memory_budget_bytes=100)
+
+    threads, results, _ = get_concurrently(registry, "base")
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == ["base"]
+    assert len(results) == 8
+    assert all(model is results[0] for model in results)
+
+
+def test_load_error_reaches_every_waiter_and_is_not_cached():
+    loader = SlowLoader()
+    registry = ModelRegistry("test", loader, memory_budget_bytes=100)
+
+    threads, results, errors = get_concurrently(registry, "broken")
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == ["broken"]
+    assert results == [] and len(errors) == 8
+    with pytest.raises(ValueError):
+        registry.get("broken")
+    assert loader.calls == ["broken", "broken"]
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return key
+
+    registry = ModelRegistry(
+        "test", loader, memory_budget_bytes=250,
+        fallback_sizes={"small": 100, "base": 100, "large": 100},
+    )
+    registry.get("small")
+    registry.get("base")
+    registry.get("small")  # "base" is now least recently used
+    registry.get("large")
+
+    assert sorted(registry.stats()["models"]) == ["large", "small"]
+    registry.get("base")
+    assert loads == ["small", "base", "large", "base"]
+
+
+def test_model_over_budget_on_its_own_is_kept():
+    registry = ModelRegistry("test", lambda key: key, memory_budget_bytes=50,
+                             fallback_sizes={"small": 10, "large": 100})
+    registry.get("small")
+    registry.get("large")
+
+    assert list(registry.stats()["models"]) == ["large"]
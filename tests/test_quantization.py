@@ -0,0 +1,58 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from quantization import load_quantized  # noqa: E402
+
+
+def _build_fp32():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 4))
+
+
+def test_cached_weights_reload_without_unpickling(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALL_ANALYZER_CACHE_DIR", str(tmp_path))
+    inputs = torch.randn(3, 16)
+
+    fresh = load_quantized("tiny", _build_fp32)
+    [cached_file] = (tmp_path / "quantized").glob("*.state.pt")
+    # Plain tensors only, loadable without unpickling arbitrary objects
+    torch.load(cached_file, weights_only=True)
+
+    reloaded = load_quantized("tiny", _build_fp32)
+
+    assert isinstance(reloaded[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert torch.allclose(fresh(inputs), reloaded(inputs))
+
+
+class _Scaled(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(16, 4)
+        self.norm = torch.nn.LayerNorm(4)
+        # Not in the state_dict, so it must be built for real
+        self.register_buffer("scale", torch.full((4,), 2.0), persistent=False)
+
+    def forward(self, x):
+        return self.norm(self.linear(x)) * self.scale
+
+
+def _build_scaled():
+    torch.manual_seed(0)
+    model = _Scaled()
+    torch.nn.init.normal_(model.norm.weight)
+    return model
+
+
+def test_cached_weights_load_without_building_fp32(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALL_ANALYZER_CACHE_DIR", str(tmp_path))
+    inputs = torch.randn(3, 16)
+    fresh = load_quantized("scaled", _build_scaled)
+
+    def no_fp32():
+        raise AssertionError("fp32 model built for a cached quantized model")
+
+    reloaded = load_quantized("scaled", no_fp32, build_empty=_Scaled)
+
+    assert not any(t.is_meta for t in list(reloaded.parameters()) + list(reloaded.buffers()))
+    assert torch.allclose(fresh(inputs), reloaded(inputs))
@@ -0,0 +1,77 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import CircuitOpenError, SharedRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    return SharedRateLimiter(
+        str(tmp_path / "limiter.json"), rate_per_minute=60, burst=2,
+        failure_threshold=1, recovery_seconds=1.0
+    )
+
+
+def test_open_breaker_fails_fast(limiter, clock):
+    limiter.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(max_wait=5)
+
+
+def test_probe_waits_out_retry_after_longer_than_recovery(limiter, clock):
+    limiter.record_failure(retry_after=2.0)
+    clock.now += 1.5
+
+    # Recovery is over; this caller sleeps out Retry-After and is then the probe
+    limiter.acquire(max_wait=5)
+    assert clock.now >= 1002.0
+    assert limiter.snapshot()["breaker"] == "half_open"
+
+    with pytest.raises(CircuitOpenError, match="probe"):
+        limiter.acquire(max_wait=5)
+
+    limiter.record_success()
+    assert limiter.snapshot()["breaker"] == "closed"
+    limiter.acquire(max_wait=5)
+
+
+def test_failed_probe_reopens_breaker(limiter, clock):
+    limiter.record_failure()
+    clock.now += 1.5
+    limiter.acquire(max_wait=5)
+
+    limiter.record_failure()
+
+    assert limiter.snapshot()["breaker"] == "open"
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(max_wait=5)
+
+
+def test_lost_probe_is_replaced_after_recovery(limiter, clock):
+    limiter.record_failure()
+    clock.now += 1.5
+    limiter.acquire(max_wait=5)
+
+    # The probe never reports back
+    clock.now += 1.5
+    limiter.acquire(max_wait=5)
+    assert limiter.snapshot()["breaker"] == "half_open"
@@ -0,0 +1,28 @@
+from result_memo import ResultMemo
+
+
+def test_normalized_keys_share_whitespace_variants():
+    memo = ResultMemo()
+    memo.put("model", "thank  you ", {"label": "joy"})
+
+    assert memo.get("model", "thank you") == {"label": "joy"}
+
+
+def test_exact_keys_do_not_share_whitespace_variants():
+    memo = ResultMemo()
+    memo.put("model", " thank  you", {"spans": [[1, 12]]}, exact=True)
+
+    assert memo.get("model", "thank you", exact=True) is None
+    assert memo.get("model", " thank  you", exact=True) == {"spans": [[1, 12]]}
+
+
+def test_results_are_copied():
+    memo = ResultMemo()
+    value = {"scores": [1]}
+    memo.put("model", "okay", value)
+    value["scores"].append(2)
+
+    hit = memo.get("model", "okay")
+    hit["scores"].append(3)
+
+    assert memo.get("model", "okay") == {"scores": [1]}
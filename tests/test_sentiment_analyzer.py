@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("vaderSentiment")
+
+from result_memo import get_memo  # noqa: E402
+from sentiment_analyzer import EnhancedSentimentAnalyzer, build_sentiment_timeline  # noqa: E402
+
+
+@pytest.fixture
+def analyzer():
+    get_memo().clear()
+    yield EnhancedSentimentAnalyzer()
+    get_memo().clear()
+
+
+def test_memo_hit_spans_match_callers_text(analyzer):
+    analyzer.analyze_sentiment("Thank you, that helps.")
+    text = "  Thank you,   that helps."
+
+    result = analyzer.analyze_sentiment(text)
+
+    assert result["text_stats"]["char_count"] == len(text)
+    for start, end in result["indicator_details"]["gratitude"]["spans"]:
+        assert text[start:end].lower() == "thank you"
+
+
+class FixedScores:
+    """Analyzer stand-in with a hand-picked compound score per text."""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def analyze_batch(self, texts):
+        return [{"vader_scores": {"compound": self.scores[text]}} for text in texts]
+
+
+def test_timeline_matches_hand_computed_values():
+    turns = [
+        {"speaker": "A", "text": "good", "start": 0.0, "end": 2.0},
+        {"speaker": "B", "text": "  ", "start": 2.0, "end": 2.0},
+        {"speaker": "B", "text": "bad", "start": 2.0, "end": 3.0},
+        {"speaker": "A", "text": "meh", "start": 3.0, "end": 7.0},
+        {"speaker": "A", "text": "great", "start": 7.0, "end": 8.0},
+    ]
+    analyzer = FixedScores({"good": 0.5, "bad": -0.4, "meh": 0.0, "great": 0.9})
+
+    timeline = build_sentiment_timeline(turns, window=2, analyzer=analyzer)
+
+    assert timeline["turn"] == [0, 2, 3, 4]
+    assert timeline["speakers"] == ["A", "B"]
+    assert timeline["speaker"] == [0, 1, 0, 0]
+    assert timeline["compound"] == [0.5, -0.4, 0.0, 0.9]
+    # Trailing mean over the last two scored turns
+    assert timeline["rolling_compound"] == [0.5, 0.05, -0.2, 0.45]
+    assert timeline["by_speaker"] == {
+        "A": {
+            "turns": 3,
+            "mean_compound": 0.467,            # (0.5 + 0.0 + 0.9) / 3
+            "time_weighted_compound": 0.271,   # (0.5*2 + 0.0*4 + 0.9*1) / 7
+            "positive_share": 0.667,
+            "negative_share": 0.0,
+        },
+        "B": {
+            "turns": 1,
+            "mean_compound": -0.4,
+            "time_weighted_compound": -0.4,
+            "positive_share": 0.0,
+            "negative_share": 1.0,
+        },
+    }
+
+
+def test_timeline_without_text_is_empty():
+    timeline = build_sentiment_timeline([{"speaker": "A", "text": ""}], analyzer=FixedScores({}))
+
+    assert timeline["turn"] == [] and timeline["by_speaker"] == {}
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import keyword_index
+import topic_extractor
+
+TRANSCRIPT = (
+    "I have been struggling with anxiety at work. The anxiety gets worse before "
+    "meetings, and my manager keeps adding deadlines. Sleep has been difficult."
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYWORD_INDEX_PATH", str(tmp_path / "df_index.sqlite3"))
+    monkeypatch.setattr(keyword_index, "_index", None)
+    yield
+    if keyword_index._index is not None:
+        keyword_index._index.close()
+
+
+def test_tfidf_skips_embeddings(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("embeddings computed for the TF-IDF path")
+
+    monkeypatch.setattr(topic_extractor, "compute_call_embeddings", fail)
+
+    result = topic_extractor.extract_keywords(TRANSCRIPT, method="tfidf", turns=[{"text": TRANSCRIPT}])
+
+    assert result["method"] == "tfidf"
+    assert "anxiety" in result["top_keywords"]
+
+
+def test_update_index_false_leaves_index_untouched():
+    topic_extractor.extract_keywords(TRANSCRIPT, method="tfidf", update_index=False)
+    assert keyword_index.get_index().stats()["documents"] == 0
+
+    topic_extractor.extract_keywords(TRANSCRIPT, method="tfidf")
+    assert keyword_index.get_index().stats()["documents"] == 1
+
+
+def test_auto_reserves_keybert_slots_atomically(monkeypatch):
+    monkeypatch.setenv("KEYWORD_KEYBERT_MAX_INFLIGHT", "2")
+    n_callers = 16
+    barrier = threading.Barrier(n_callers)
+    methods = []
+
+    def caller():
+        barrier.wait()
+        methods.append(topic_extractor._resolve_method("auto"))
+
+    threads = [threading.Thread(target=caller) for _ in range(n_callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert methods.count("keybert") == 2
+    for _ in range(methods.count("keybert")):
+        topic_extractor._release_keybert_slot()
+    assert topic_extractor._keybert_inflight == 0
+
+
+def test_keybert_slot_released_when_model_unavailable(monkeypatch):
+    monkeypatch.setattr(topic_extractor, "_get_model", lambda: None)
+
+    result = topic_extractor.extract_keywords(TRANSCRIPT, method="keybert", update_index=False)
+
+    assert result["method"] == "tfidf_fallback"
+    assert topic_extractor._keybert_inflight == 0
@@ -0,0 +1,65 @@
+import pytest
+
+from transcript_compactor import collapse_repeats, compact_transcript, remove_fillers
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Mm-hmm.", ""),
+    ("Um.", ""),
+    ("Hmm. Ah, I see. Mm-hmm.", "I see."),
+    ("I was, um, thinking about it.", "I was, thinking about it."),
+    ("Really? Um.", "Really?"),
+    ("Wait... um, okay", "Wait... okay"),
+])
+def test_remove_fillers_leaves_no_stray_punctuation(text, expected):
+    assert remove_fillers(text)[0] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Uh-huh, I see.",
+    "Uh-huh.",
+    "Hmm?",
+    "Um? Sorry, what?",
+])
+def test_remove_fillers_keeps_hyphenated_and_question_backchannels(text):
+    assert remove_fillers(text) == (text, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I had had enough", "I had had enough"),
+    ("bye bye", "bye bye"),
+    ("No, no, no,", "No,"),
+    ("No, no, no.", "No."),
+    ("I I I think", "I think"),
+    ("I- I think", "I think"),
+    ("Thank you. Thank you. Thank you.", "Thank you."),
+])
+def test_collapse_repeats(text, expected):
+    assert collapse_repeats(text)[0] == expected
+
+
+def test_filler_only_turns_are_dropped():
+    turns = [
+        {"speaker": "A", "text": "I feel bad about it."},
+        {"speaker": "B", "text": "Mm-hmm."},
+        {"speaker": "B", "text": "Um."},
+        {"speaker": "A", "text": "It keeps happening."},
+    ]
+
+    result = compact_transcript(turns=turns, speaker_labels="full")
+
+    assert result["text"] == "A: I feel bad about it.\nA: It keeps happening."
+    assert result["stats"]["turns_dropped"] == 2
+
+
+def test_question_backchannel_turn_is_kept():
+    turns = [
+        {"speaker": "A", "text": "I might drop the course."},
+        {"speaker": "B", "text": "Hmm?"},
+        {"speaker": "A", "text": "Uh-huh, the maths one."},
+    ]
+
+    result = compact_transcript(turns=turns, speaker_labels="full")
+
+    assert result["text"] == "A: I might drop the course.\nB: Hmm?\nA: Uh-huh, the maths one."
+    assert result["stats"]["turns_dropped"] == 0
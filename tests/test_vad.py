@@ -0,0 +1,56 @@
+import numpy as np
+
+from audio_buffer import SAMPLE_RATE, AudioBuffer
+from vad import trim_silence
+
+
+def _tone(seconds, dbfs, rng, envelope_hz=0.0):
+    """Noise-like 'speech' at a given RMS level, optionally with a loudness envelope."""
+    n = int(seconds * SAMPLE_RATE)
+    signal = rng.standard_normal(n)
+    if envelope_hz:
+        t = np.arange(n) / SAMPLE_RATE
+        signal *= 0.52 + 0.48 * np.sin(2 * np.pi * envelope_hz * t)
+    signal *= 10 ** (dbfs / 20) / np.sqrt(np.mean(signal ** 2))
+    return signal.astype(np.float32)
+
+
+def _silence(seconds, rng, dbfs=-75.0):
+    return _tone(seconds, dbfs, rng)
+
+
+def test_long_silence_is_trimmed():
+    rng = np.random.default_rng(0)
+    audio = AudioBuffer(np.concatenate([
+        _tone(5, -20, rng, 4.0), _silence(20, rng), _tone(5, -20, rng, 4.0)
+    ]))
+
+    trimmed, time_map, stats = trim_silence(audio)
+
+    assert 0.55 < stats["skipped_ratio"] < 0.7
+    assert stats["regions"] == 2
+    assert abs(time_map.to_original(trimmed.duration) - 30.0) < 0.5
+
+
+def test_quiet_second_speaker_is_kept():
+    rng = np.random.default_rng(1)
+    turns = []
+    for _ in range(10):
+        turns += [_tone(4, -20, rng, 4.0), _tone(4, -40, rng), _silence(0.3, rng)]
+    audio = AudioBuffer(np.concatenate(turns))
+
+    trimmed, _, stats = trim_silence(audio)
+
+    assert trimmed is audio
+    assert stats["skipped_ratio"] == 0.0
+
+
+def test_continuous_modulated_speech_is_kept():
+    rng = np.random.default_rng(2)
+    # Phrases swell and fade over several seconds
+    audio = AudioBuffer(_tone(60, -25, rng, 0.2))
+
+    trimmed, _, stats = trim_silence(audio)
+
+    assert trimmed is audio
+    assert stats["skipped_ratio"] == 0.0